@@ -2,9 +2,192 @@
 项目配置文件
 """
 
+import os
+from pathlib import Path
+
+from dotenv import dotenv_values, load_dotenv
+
+ENV_FILE = Path(__file__).parent.parent / ".env"
+# 启动前已存在的环境变量（优先于 .env 中的同名设置）
+_PROCESS_ENV = set(os.environ)
+
+# 从项目根目录的 .env 读取环境变量（如 MYMEDIA_PROFILE），已存在的环境变量优先
+load_dotenv(ENV_FILE)
+
 # 下载配置
 DOWNLOAD_CONFIG = {
     "timeout": 30,          # 超时时间（秒）
     "retry_attempts": 3,    # 重试次数
-    "delay_between_requests": 1  # 请求间隔（秒）
-}
\ No newline at end of file
+    "delay_between_requests": 1,  # 请求间隔（秒）
+    "buffer_size": 1024 * 1024,   # 下载读写缓冲区大小（字节）
+    "preallocate": True           # 按Content-Length预分配文件空间（posix_fallocate）
+}
+
+# HTTP连接池配置（进程内所有请求共享）
+HTTP_CONFIG = {
+    "pool_connections": 16,   # 缓存连接池的域名数
+    "pool_maxsize": 32        # 每个域名保持的最大连接数（不低于性能档位的并发上限）
+}
+
+# 短链接解析配置
+SHORT_LINK_CONFIG = {
+    "hosts": ["xhslink.com"],                  # 需要解析的短链接域名
+    "cache_file": ".cache/short_links.json",   # 短链接缓存文件
+    "ttl": 7 * 24 * 3600,                      # 缓存有效期（秒）
+    "max_hops": 10                             # 最多跟随的重定向次数
+}
+
+# 带宽整形默认配置
+BANDWIDTH_DEFAULTS = {
+    "max_bytes_per_second": 0,        # 全局带宽上限（字节/秒），0表示不限
+    "per_host_bytes_per_second": 0,   # 单个域名默认带宽上限（字节/秒），0表示不限
+    "host_limits": {}                 # 指定域名的带宽上限，如 {"xhscdn.com": 2 * 1024 * 1024}
+}
+
+
+def load_bandwidth_config() -> dict:
+    """
+    读取带宽配置：默认值，由环境变量或 .env 中的 MYMEDIA_MAX_BYTES_PER_SECOND、
+    MYMEDIA_PER_HOST_BYTES_PER_SECOND、MYMEDIA_HOST_LIMITS（如 xhscdn.com=2097152,mmbiz.qpic.cn=1048576）覆盖。
+    每次调用都重新读取 .env，修改后可通过 SIGHUP 信号或 reload_bandwidth_config() 在运行时生效
+
+    Returns:
+        dict: 带宽配置
+    """
+    file_values = dotenv_values(ENV_FILE) if ENV_FILE.exists() else {}
+
+    def env(name):
+        return os.environ.get(name) if name in _PROCESS_ENV else file_values.get(name)
+
+    config = dict(BANDWIDTH_DEFAULTS, host_limits=dict(BANDWIDTH_DEFAULTS["host_limits"]))
+    for key in ("max_bytes_per_second", "per_host_bytes_per_second"):
+        if env(f"MYMEDIA_{key.upper()}"):
+            config[key] = int(env(f"MYMEDIA_{key.upper()}"))
+    for pair in (env("MYMEDIA_HOST_LIMITS") or "").split(","):
+        host, _, limit = pair.partition("=")
+        if host.strip() and limit.strip():
+            config["host_limits"][host.strip()] = int(limit)
+    return config
+
+
+# 带宽整形配置（重新加载时原地更新）
+BANDWIDTH_CONFIG = load_bandwidth_config()
+
+# 下载预检配置
+PREFLIGHT_CONFIG = {
+    "enabled": False,                          # 是否默认启用预检
+    "allowed_types": ["image/"],               # 允许下载的Content-Type前缀
+    "min_bytes": 2 * 1024,                     # 小于该大小的视为图标/追踪像素（字节）
+    "max_bytes": 50 * 1024 * 1024,             # 大于该大小的不下载（字节），0表示不限
+    "sniff_bytes": 32,                         # 无法从响应头判断类型时读取的文件头字节数
+    "etag_index_file": ".cache/etag_index.json"  # 已下载资源的ETag索引
+}
+
+# 图片URL规范化配置
+CANONICAL_URL_CONFIG = {
+    "xhs_origin_host": "sns-img-bd.xhscdn.com",            # 小红书原图域名
+    "xhs_image_host_prefixes": ["sns-webpic", "sns-img", "ci."],  # 需要改写为原图的小红书图片域名前缀
+    "wechat_keep_params": ["wx_fmt"]                       # 微信图片URL中需要保留的参数
+}
+
+
+# 提取规则目录（每个平台一个JSON文件，修改后无需改代码）
+EXTRACTION_RULES_DIR = str(Path(__file__).parent / "extraction_rules")
+
+# 角色与Prompt库配置
+ROLE_LIBRARY_CONFIG = {
+    "roles_dir": str(Path(__file__).parent.parent / "docs" / "roles"),     # 角色设定目录
+    "sop_dir": str(Path(__file__).parent.parent / "docs" / "SOP沉淀"),     # SOP目录
+    "reload_interval": 2,   # 检查文件变化的最小间隔（秒）
+    # 角色Prompt模板：{}中的角色字段在加载时填入，$task 等变量在渲染时替换
+    "prompt_template": (
+        "你是「{title}」。\n\n"
+        "## 核心身份\n{identity}\n\n"
+        "## 技能\n{skills}\n\n"
+        "## 内容规则\n{rules}\n\n"
+        "## 本次任务\n$task\n"
+    )
+}
+
+# 多进程抓取队列配置
+CRAWL_QUEUE_CONFIG = {
+    "queue_dir": ".queue",        # 队列状态目录（位于归档根目录下，可放在NFS上供多台主机共享）
+    "lease_seconds": 300,         # 租约时长（秒），worker失联超过该时间后条目重新分配
+    "heartbeat_interval": 60,     # worker续租间隔（秒）
+    "batch_size": 2,              # 每次租用的条目数
+    "max_attempts": 3,            # 单个条目最多尝试次数
+    "poll_interval": 1,           # 队列暂时无可租条目时的等待间隔（秒）
+    "compact_lines": 1000         # 追加日志超过该行数（且超过条目数）时压缩为新快照
+}
+
+# 性能档位：按域名自适应调整并发数（AIMD），出现429/5xx或延迟明显升高时减半，否则逐步增加
+PERFORMANCE_PROFILES = {
+    "conservative": {
+        "initial_concurrency": 2,   # 每个域名的初始并发数
+        "min_concurrency": 1,       # 并发下限
+        "max_concurrency": 4,       # 并发上限
+        "increase": 1,              # 每轮成功后增加的并发数（加性增）
+        "backoff_factor": 0.5,      # 出错时并发数乘以该系数（乘性减）
+        "latency_tolerance": 2.0,   # 延迟超过基线的倍数时视为拥塞
+        "host_overrides": {}        # 指定域名（含子域名）的覆盖值，如 {"xiaohongshu.com": {"max_concurrency": 2}}
+    },
+    "bulk": {
+        "initial_concurrency": 4,
+        "min_concurrency": 2,
+        "max_concurrency": 32,
+        "increase": 2,
+        "backoff_factor": 0.7,
+        "latency_tolerance": 3.0,
+        "host_overrides": {
+            "xiaohongshu.com": {"max_concurrency": 4},   # 笔记页面比CDN图片更容易触发限流
+            "mp.weixin.qq.com": {"max_concurrency": 4}
+        }
+    }
+}
+
+# 当前档位，可在 .env 中设置 MYMEDIA_PROFILE=bulk；MYMEDIA_MIN_CONCURRENCY / MYMEDIA_MAX_CONCURRENCY 可单独覆盖上下限
+PERFORMANCE_PROFILE = os.getenv("MYMEDIA_PROFILE", "conservative")
+CONCURRENCY_CONFIG = dict(PERFORMANCE_PROFILES.get(PERFORMANCE_PROFILE, PERFORMANCE_PROFILES["conservative"]))
+for _key in ("min_concurrency", "max_concurrency"):
+    if os.getenv(f"MYMEDIA_{_key.upper()}"):
+        CONCURRENCY_CONFIG[_key] = int(os.getenv(f"MYMEDIA_{_key.upper()}"))
+
+# 收件箱监听配置
+WATCH_CONFIG = {
+    "socket_path": ".cache/watch.sock",   # 本地Unix套接字路径
+    "poll_interval": 0.2,                 # 检查收件箱文件/目录的间隔（秒）
+    "workers": 2,                         # 抓取线程数
+    "recent": 20,                         # 状态中保留的最近结果数
+    "dedupe_seconds": 600,                # 该时长内重复收到的链接视为重复（之后再次收到会重新抓取）
+    "dedupe_max": 10000                   # 去重时保留的最近链接数上限
+}
+
+# 流式页面抓取配置
+PAGE_FETCH_CONFIG = {
+    "max_bytes": 5 * 1024 * 1024,   # 单个页面最多读取的字节数，超过后停止读取（保护内存）
+    "chunk_size": 16 * 1024,        # 每次读取的字节数
+    "early_stop": True,             # 需要的区块（页面状态JSON、正文、og元信息）到齐后停止读取
+    "drain_bytes": 32 * 1024        # 区块到齐时剩余字节不超过该值则读完，连接可放回连接池复用
+}
+
+# 页面快照配置
+SNAPSHOT_CONFIG = {
+    "enabled": True,          # 是否保存抓取到的原始页面
+    "dir": ".snapshots",      # 快照目录（位于归档根目录下）
+    "compression": "gzip",    # 压缩格式：gzip（快）或 lzma（压缩率更高）
+    "level": 6                # 压缩级别（gzip 1-9，lzma 0-9）
+}
+
+# 归档完整性校验配置
+INTEGRITY_CONFIG = {
+    "read_size": 1024 * 1024,   # 计算哈希时每次读取的字节数
+    "batch_size": 32,           # 每个校验进程任务包含的文件数
+    "repair_workers": 4         # 重新下载损坏文件的线程数上限（实际并发仍受域名自适应限制）
+}
+
+# 公众号文章批量导入配置
+WECHAT_BATCH_CONFIG = {
+    "fetch_workers": 4,      # 抓取文章页面的线程数上限（实际并发仍受域名自适应限制）
+    "parse_workers": 2,      # 解析文章页面的进程数，0表示在抓取线程中解析
+    "download_workers": 8    # 所有文章共享的图片下载线程数上限
+}
@@ -0,0 +1,232 @@
+"""
+内容归档分析
+增量扫描 文案生成 目录下的 raw_content.json，只重新解析自上次运行以来有变化的帖子，
+并把每篇帖子的关键字段以列式结构缓存，常用报表直接在缓存上计算
+"""
+
+import csv
+import gzip
+import json
+import os
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# 缓存文件版本，字段变化时递增以强制重建
+CACHE_VERSION = 1
+
+# 列式缓存中的列
+COLUMNS = ("path", "size", "mtime_ns", "platform", "account", "post_id",
+           "title", "author", "week", "image_count", "tags")
+
+
+def iso_week(timestamp: Optional[str], fallback_ns: Optional[int] = None) -> str:
+    """把提取时间转换为ISO周（如 2025-W43），无法解析时使用文件修改时间（或当前时间）"""
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d_%H:%M:%S"):
+        try:
+            when = datetime.strptime(timestamp, fmt)
+            break
+        except (TypeError, ValueError):
+            continue
+    else:
+        when = datetime.fromtimestamp(fallback_ns / 1e9) if fallback_ns else datetime.now()
+    year, week, _ = when.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+class ArchiveAnalytics:
+    """归档分析类"""
+
+    def __init__(self, root: str = "文案生成", cache_file: Optional[str] = None):
+        """
+        初始化归档分析
+
+        Args:
+            root: 归档根目录（其下为 平台/账号/帖子 三级目录）
+            cache_file: 列式缓存文件路径，默认在根目录的 .analytics 下
+        """
+        self.root = Path(root)
+        self.cache_file = Path(cache_file) if cache_file else self.root / ".analytics" / "posts.json.gz"
+        self.columns: Dict[str, list] = {name: [] for name in COLUMNS}
+        self.last_refresh = {"scanned": 0, "parsed": 0, "removed": 0}
+
+    def __len__(self) -> int:
+        return len(self.columns["path"])
+
+    def _load_cache(self) -> None:
+        """读取列式缓存"""
+        try:
+            with gzip.open(self.cache_file, 'rt', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == CACHE_VERSION and set(data.get("columns", {})) == set(COLUMNS):
+            self.columns = data["columns"]
+
+    def _save_cache(self) -> None:
+        """写出列式缓存（先写临时文件再替换）"""
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_file.with_name(self.cache_file.name + f".{os.getpid()}.tmp")
+        with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=5) as f:
+            json.dump({"version": CACHE_VERSION, "columns": self.columns},
+                      f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, self.cache_file)
+
+    def _scan(self) -> Dict[str, os.stat_result]:
+        """用 os.scandir 遍历 平台/账号/帖子 目录，收集所有 raw_content.json 的状态"""
+        found = {}
+        for platform in _subdirs(self.root):
+            for account in _subdirs(platform.path):
+                for post in _subdirs(account.path):
+                    raw_path = os.path.join(post.path, "raw_content.json")
+                    try:
+                        found[os.path.relpath(raw_path, self.root)] = os.stat(raw_path)
+                    except OSError:
+                        continue
+        return found
+
+    def _parse(self, rel_path: str, stat: os.stat_result) -> Optional[dict]:
+        """解析单篇帖子，返回一行记录"""
+        try:
+            with open(self.root / rel_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        platform, account = Path(rel_path).parts[:2]
+        tags = data.get("tags") or []
+        if isinstance(tags, str):
+            tags = [t for t in tags.replace('#', ' ').split() if t]
+        return {
+            "path": rel_path,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "platform": platform,
+            "account": account,
+            "post_id": data.get("note_id") or data.get("article_id") or "",
+            "title": data.get("title", ""),
+            "author": data.get("author", ""),
+            "week": iso_week(data.get("extraction_time"), stat.st_mtime_ns),
+            "image_count": len(data.get("image_urls") or []),
+            "tags": tags,
+        }
+
+    def refresh(self) -> dict:
+        """
+        增量刷新缓存：新增和变化（大小或修改时间不同）的帖子重新解析，已删除的帖子移除
+
+        Returns:
+            dict: 本次扫描、解析、移除的帖子数
+        """
+        self._load_cache()
+        found = self._scan()
+
+        cols = self.columns
+        deleted = sum(1 for path in cols["path"] if path not in found)
+        keep_rows = []
+        for row, path in enumerate(cols["path"]):
+            stat = found.get(path)
+            if stat is not None and stat.st_size == cols["size"][row] and stat.st_mtime_ns == cols["mtime_ns"][row]:
+                keep_rows.append(row)
+                del found[path]
+
+        dropped = len(cols["path"]) - len(keep_rows)
+        if dropped:
+            self.columns = cols = {name: [values[row] for row in keep_rows] for name, values in cols.items()}
+
+        parsed = 0
+        for rel_path, stat in found.items():
+            record = self._parse(rel_path, stat)
+            if record is None:
+                continue
+            for name in COLUMNS:
+                cols[name].append(record[name])
+            parsed += 1
+
+        self.last_refresh = {"scanned": len(keep_rows) + len(found), "parsed": parsed, "removed": deleted}
+        if parsed or dropped:
+            self._save_cache()
+        return self.last_refresh
+
+    def _filtered_rows(self, platform: Optional[str] = None, account: Optional[str] = None) -> List[int]:
+        """按平台/账号筛选行号"""
+        cols = self.columns
+        return [i for i in range(len(self))
+                if (platform is None or cols["platform"][i] == platform)
+                and (account is None or cols["account"][i] == account)]
+
+    def posts_per_account(self, platform: Optional[str] = None) -> List[dict]:
+        """各账号帖子数"""
+        counter = Counter((self.columns["platform"][i], self.columns["account"][i])
+                          for i in self._filtered_rows(platform))
+        return [{"platform": p, "account": a, "posts": n} for (p, a), n in counter.most_common()]
+
+    def tag_frequency(self, top: Optional[int] = None, platform: Optional[str] = None,
+                      account: Optional[str] = None) -> List[dict]:
+        """标签出现频次"""
+        counter = Counter(tag for i in self._filtered_rows(platform, account) for tag in self.columns["tags"][i])
+        return [{"tag": t, "posts": n} for t, n in counter.most_common(top)]
+
+    def author_frequency(self, top: Optional[int] = None, platform: Optional[str] = None,
+                         account: Optional[str] = None) -> List[dict]:
+        """作者出现频次"""
+        counter = Counter(self.columns["author"][i] for i in self._filtered_rows(platform, account))
+        return [{"author": a, "posts": n} for a, n in counter.most_common(top)]
+
+    def images_per_week(self, platform: Optional[str] = None, account: Optional[str] = None) -> List[dict]:
+        """每周帖子数和图片数"""
+        posts, images = Counter(), Counter()
+        for i in self._filtered_rows(platform, account):
+            week = self.columns["week"][i]
+            posts[week] += 1
+            images[week] += self.columns["image_count"][i]
+        return [{"week": w, "posts": posts[w], "images": images[w]} for w in sorted(posts)]
+
+
+def _subdirs(path) -> list:
+    """列出目录下的子目录（跳过隐藏目录）"""
+    try:
+        with os.scandir(path) as it:
+            return [entry for entry in it if entry.is_dir() and not entry.name.startswith('.')]
+    except OSError:
+        return []
+
+
+def export_rows(rows: List[dict], output_path: str, fmt: str = "csv") -> Path:
+    """
+    导出报表
+
+    Args:
+        rows: 报表行
+        output_path: 输出文件路径
+        fmt: 格式（csv / json）
+
+    Returns:
+        Path: 输出文件路径
+    """
+    path = Path(output_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if fmt == "json":
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+    else:
+        # utf-8-sig 便于 Excel 直接打开中文
+        with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else [])
+            writer.writeheader()
+            writer.writerows(rows)
+    return path
+
+
+def format_table(rows: List[dict]) -> str:
+    """把报表行格式化为对齐的文本表格"""
+    if not rows:
+        return "（无数据）"
+    headers = list(rows[0])
+    widths = [max(len(str(h)), *(len(str(r[h])) for r in rows)) for h in headers]
+    lines = ["  ".join(str(h).ljust(w) for h, w in zip(headers, widths))]
+    lines.append("  ".join("-" * w for w in widths))
+    for row in rows:
+        lines.append("  ".join(str(row[h]).ljust(w) for h, w in zip(headers, widths)))
+    return "\n".join(lines)
@@ -6,7 +6,22 @@
 import os
 from pathlib import Path
 from datetime import datetime
-from typing import List
+from typing import List, Optional
+
+from .records import ArticleRecord, NoteRecord
+
+
+def clean_name(text: str) -> str:
+    """
+    清理用作目录名的文本，只保留文字、数字、空格、- 和 _（去掉路径分隔符等非法字符）
+    
+    Args:
+        text: 原始文本
+        
+    Returns:
+        str: 清理后的文本，可能为空
+    """
+    return "".join(c for c in text if c.isalnum() or c in (' ', '-', '_')).strip()
 
 
 class ContentManager:
@@ -35,16 +50,25 @@ class ContentManager:
             Path: 创建的目录路径
         """
         # 清理标题中的非法字符
-        clean_title = "".join(c for c in title if c.isalnum() or c in (' ', '-', '_')).rstrip()
+        clean_title = clean_name(title)
         # 添加时间戳确保唯一性
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         dir_name = f"{clean_title}_{timestamp}"
         
         # 构建完整路径
-        post_dir = self.base_path / account_name / dir_name
+        account_dir = self.base_path / account_name
+        account_dir.mkdir(parents=True, exist_ok=True)
         
-        # 创建目录结构
-        post_dir.mkdir(parents=True, exist_ok=True)
+        # 独占创建帖子目录：多个进程同一秒保存同名帖子时依次追加序号，互不覆盖
+        post_dir = account_dir / dir_name
+        suffix = 1
+        while True:
+            try:
+                post_dir.mkdir()
+                break
+            except FileExistsError:
+                suffix += 1
+                post_dir = account_dir / f"{dir_name}_{suffix}"
         
         # 创建子目录
         (post_dir / "downloads").mkdir(exist_ok=True)
@@ -54,29 +78,30 @@ class ContentManager:
         
         return post_dir
     
-    def save_post_info(self, post_dir: Path, post_info: dict) -> Path:
+    def save_post_info(self, post_dir: Path, record: NoteRecord, publish_time: Optional[str] = None) -> Path:
         """
         保存帖子信息到Markdown文件
         
         Args:
             post_dir: 帖子目录路径
-            post_info: 帖子信息字典
+            record: 帖子提取结果
+            publish_time: 发布时间，默认为当前时间
             
         Returns:
             Path: 保存的文件路径
         """
         info_content = f"""# 小红书帖子信息
 
-- **作品标题**: {post_info.get('title', '')}
-- **作品ID**: {post_info.get('post_id', '')}
-- **作品链接**: {post_info.get('url', '')}
-- **作者昵称**: {post_info.get('author', '')}
-- **发布时间**: {post_info.get('publish_time', '')}
-- **标签**: {post_info.get('tags', '')}
+- **作品标题**: {record.title}
+- **作品ID**: {record.note_id}
+- **作品链接**: {record.url}
+- **作者昵称**: {record.author}
+- **发布时间**: {publish_time or datetime.now().strftime("%Y-%m-%d_%H:%M:%S")}
+- **标签**: {' '.join(f'#{tag}' for tag in record.tags)}
 
 ## 内容描述
 
-{post_info.get('description', '')}
+{record.content}
 """
         
         info_path = post_dir / "帖子信息.md"
@@ -84,6 +109,33 @@ class ContentManager:
             f.write(info_content)
         
         return info_path
+    
+    def save_article_info(self, post_dir: Path, record: ArticleRecord) -> Path:
+        """
+        保存公众号文章信息到Markdown文件
+        
+        Args:
+            post_dir: 文章目录路径
+            record: 文章提取结果
+            
+        Returns:
+            Path: 保存的文件路径
+        """
+        info_content = f"""# 微信公众号文章信息
+
+- **文章标题**: {record.title}
+- **文章ID**: {record.article_id}
+- **文章链接**: {record.url}
+- **公众号**: {record.author}
+- **提取时间**: {record.extraction_time}
+- **图片数量**: {len(record.image_urls)}
+"""
+        
+        info_path = post_dir / "文章信息.md"
+        with open(info_path, 'w', encoding='utf-8') as f:
+            f.write(info_content)
+        
+        return info_path
 
 
 def create_xhs_post(post_id: str, title: str, account_name: str = "AI知识账号") -> Path:
@@ -99,4 +151,34 @@ def create_xhs_post(post_id: str, title: str, account_name: str = "AI知识账
         Path: 创建的目录路径
     """
     manager = ContentManager()
-    return manager.create_post_directory(post_id, title, account_name)
\ No newline at end of file
+    return manager.create_post_directory(post_id, title, account_name)
+
+
+def find_raw_files(root, platform: Optional[str] = None) -> List[str]:
+    """
+    遍历 平台/账号/帖子 目录，收集所有 raw_content.json
+
+    Args:
+        root: 归档根目录
+        platform: 只处理指定平台目录，如 小红书自媒体帖子
+
+    Returns:
+        List[str]: raw_content.json 的路径
+    """
+    def subdirs(path):
+        try:
+            with os.scandir(path) as it:
+                return [entry for entry in it if entry.is_dir() and not entry.name.startswith('.')]
+        except OSError:
+            return []
+
+    found = []
+    for platform_dir in subdirs(root):
+        if platform and platform_dir.name != platform:
+            continue
+        for account in subdirs(platform_dir.path):
+            for post in subdirs(account.path):
+                raw_path = os.path.join(post.path, "raw_content.json")
+                if os.path.isfile(raw_path):
+                    found.append(raw_path)
+    return found
@@ -0,0 +1,304 @@
+"""
+抓取队列
+多个worker进程（可以分布在共享同一NFS归档目录的多台主机上）协同消费同一个URL列表。
+队列状态保存在归档根目录下，所有读改写都在文件锁内完成；worker以租约形式领取条目，
+租约到期未续租（worker崩溃或失联）的条目会被重新分配。
+
+状态由两部分组成：<队列>.json 快照和 <队列>.<代>.log 追加日志（每行一个变化后的条目，见 utils.journal）。
+每次租用、续租、完成只向日志追加变化的条目，各进程在内存中缓存状态，只读取上次之后新增的日志；
+日志行数超过条目数时压缩成新一代快照。内存中另外维护待处理条目的有序集合和按租约到期时间排序的堆，
+租用时只查看这两处，不遍历已完成和已失败的条目，平均每次操作的开销与队列长度无关
+"""
+
+import heapq
+import os
+import socket
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from config.settings import CRAWL_QUEUE_CONFIG
+from src.utils.file_lock import locked
+from src.utils.journal import Journal
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+
+def worker_id() -> str:
+    """当前进程的worker标识（主机名:进程号）"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class CrawlQueue:
+    """基于文件锁的租约队列"""
+
+    def __init__(self, root: str = "文案生成", name: str = "default",
+                 lease_seconds: Optional[float] = None, max_attempts: Optional[int] = None):
+        """
+        初始化抓取队列
+
+        Args:
+            root: 归档根目录
+            name: 队列名称，不同的抓取任务可以使用不同的队列
+            lease_seconds: 租约时长（秒），默认读取配置
+            max_attempts: 单个条目最多尝试次数，默认读取配置
+        """
+        self.path = Path(root) / CRAWL_QUEUE_CONFIG["queue_dir"] / f"{name}.json"
+        self.lease_seconds = lease_seconds or CRAWL_QUEUE_CONFIG["lease_seconds"]
+        self.max_attempts = max_attempts or CRAWL_QUEUE_CONFIG["max_attempts"]
+        self._journal = Journal(self.path, CRAWL_QUEUE_CONFIG["compact_lines"])
+        # 内存中的状态及其索引：待处理的URL（按进入待处理状态的顺序）和 (到期时间, URL) 堆
+        self._items = {}
+        self._pending = {}
+        self._expiry = []
+
+    def _load(self, state: dict) -> None:
+        """用快照内容重置内存状态并重建索引"""
+        self._items = state.get("items", {})
+        self._pending = {url: None for url, item in self._items.items() if item["status"] == PENDING}
+        self._expiry = [(item.get("expires", 0), url) for url, item in self._items.items()
+                        if item["status"] == LEASED]
+        heapq.heapify(self._expiry)
+
+    def _replay(self, record: dict) -> None:
+        """应用一条日志记录（变化后的条目）"""
+        url = record.pop("url")
+        self._items[url] = record
+        self._index(url)
+
+    def _index(self, url: str) -> None:
+        """按条目的当前状态更新索引；堆中过时的记录在租用时跳过"""
+        item = self._items[url]
+        if item["status"] == PENDING:
+            self._pending[url] = None
+        else:
+            self._pending.pop(url, None)
+            if item["status"] == LEASED:
+                heapq.heappush(self._expiry, (item.get("expires", 0), url))
+
+    def _sync(self) -> dict:
+        """
+        把内存中的状态更新到磁盘上的最新状态（调用方需持有锁）
+
+        Returns:
+            dict: URL -> 条目
+        """
+        self._journal.sync(self._load, self._replay)
+        return self._items
+
+    def _append(self, urls: Iterable[str]) -> None:
+        """更新变化条目的索引并追加到日志（调用方需持有独占锁，并已调用 _sync）"""
+        urls = list(urls)
+        for url in urls:
+            self._index(url)
+        self._journal.append(({"url": url, **self._items[url]} for url in urls), len(self._items),
+                             lambda: {"items": self._items})
+        # 续租和完成在堆中留下的过时记录过多时重建堆（均摊开销为常数）
+        if len(self._expiry) > max(1024, 2 * len(self._items)):
+            self._expiry = [(item.get("expires", 0), url) for url, item in self._items.items()
+                            if item["status"] == LEASED]
+            heapq.heapify(self._expiry)
+
+    def add(self, urls: Iterable[str]) -> int:
+        """
+        向队列添加URL（已存在的URL忽略）
+
+        Args:
+            urls: URL列表
+
+        Returns:
+            int: 新增的条目数
+        """
+        added = []
+        with locked(self.path):
+            items = self._sync()
+            for url in urls:
+                url = url.strip()
+                if url and url not in items:
+                    items[url] = {"status": PENDING, "attempts": 0}
+                    added.append(url)
+            if added:
+                self._append(added)
+        return len(added)
+
+    def lease(self, worker: str, count: int = 1) -> List[str]:
+        """
+        租用若干条目：待处理的条目和租约已过期的条目都可以被租用
+
+        Args:
+            worker: worker标识
+            count: 最多租用的条目数
+
+        Returns:
+            List[str]: 租到的URL
+        """
+        now = time.time()
+        leased = []
+        changed = []
+        with locked(self.path):
+            items = self._sync()
+            # 先回收租约已过期的条目（堆顶），再按顺序租用待处理的条目
+            while len(leased) < count and self._expiry and self._expiry[0][0] < now:
+                expires, url = heapq.heappop(self._expiry)
+                item = items[url]
+                if item["status"] != LEASED or item.get("expires", 0) != expires:
+                    continue
+                changed.append(url)
+                if item["attempts"] >= self.max_attempts:
+                    item.update(status=FAILED, error=f"租约过期（{item.get('worker')}）")
+                    item.pop("expires", None)
+                    continue
+                item.update(worker=worker, expires=now + self.lease_seconds, attempts=item["attempts"] + 1)
+                leased.append(url)
+            while len(leased) < count and self._pending:
+                url = next(iter(self._pending))
+                del self._pending[url]
+                item = items[url]
+                item.update(status=LEASED, worker=worker, expires=now + self.lease_seconds,
+                            attempts=item["attempts"] + 1)
+                changed.append(url)
+                leased.append(url)
+            if changed:
+                self._append(changed)
+        return leased
+
+    def renew(self, worker: str, urls: Iterable[str]) -> List[str]:
+        """
+        为仍在处理的条目续租
+
+        Args:
+            worker: worker标识
+            urls: 需要续租的URL
+
+        Returns:
+            List[str]: 续租成功的URL（租约已被其他worker接管的不在其中）
+        """
+        renewed = []
+        with locked(self.path):
+            items = self._sync()
+            expires = time.time() + self.lease_seconds
+            for url in urls:
+                item = items.get(url)
+                if item and item["status"] == LEASED and item.get("worker") == worker:
+                    item["expires"] = expires
+                    renewed.append(url)
+            if renewed:
+                self._append(renewed)
+        return renewed
+
+    def release(self, worker: str, urls: Iterable[str]) -> int:
+        """
+        归还尚未开始处理的条目（不计入尝试次数）
+
+        Args:
+            worker: worker标识
+            urls: 需要归还的URL
+
+        Returns:
+            int: 归还的条目数
+        """
+        released = []
+        with locked(self.path):
+            items = self._sync()
+            for url in urls:
+                item = items.get(url)
+                if item and item["status"] == LEASED and item.get("worker") == worker:
+                    item.update(status=PENDING, attempts=max(0, item["attempts"] - 1))
+                    item.pop("expires", None)
+                    released.append(url)
+            if released:
+                self._append(released)
+        return len(released)
+
+    def complete(self, worker: str, url: str, result: Optional[str] = None) -> bool:
+        """
+        标记条目完成
+
+        Args:
+            worker: worker标识
+            url: URL
+            result: 结果（如保存目录）
+
+        Returns:
+            bool: 该worker是否仍持有租约（False表示条目已被其他worker接管，结果可能重复）
+        """
+        return self._finish(worker, url, DONE, result=result)
+
+    def fail(self, worker: str, url: str, error: str) -> bool:
+        """
+        标记条目失败：未达到最大尝试次数时放回队列，否则标记为失败
+
+        Args:
+            worker: worker标识
+            url: URL
+            error: 错误信息
+
+        Returns:
+            bool: 该worker是否仍持有租约
+        """
+        return self._finish(worker, url, FAILED, error=error)
+
+    def _finish(self, worker: str, url: str, status: str, **fields) -> bool:
+        """在锁内更新条目的最终状态"""
+        with locked(self.path):
+            item = self._sync().get(url)
+            if item is None or item["status"] == DONE:
+                return False
+            owned = item["status"] == LEASED and item.get("worker") == worker
+            # 租约已被其他worker接管时，失败不影响对方；成功则直接记为完成，避免重复处理
+            if status == FAILED and not owned and item["status"] == LEASED:
+                return False
+            if status == FAILED and item["attempts"] < self.max_attempts:
+                status = PENDING
+            item.update(status=status, worker=worker, finished=time.time(), **fields)
+            item.pop("expires", None)
+            self._append([url])
+        return owned
+
+    def retry_failed(self) -> int:
+        """
+        把失败的条目重新放回队列
+
+        Returns:
+            int: 重新放回的条目数
+        """
+        with locked(self.path):
+            items = self._sync()
+            failed = [url for url, item in items.items() if item["status"] == FAILED]
+            for url in failed:
+                items[url].update(status=PENDING, attempts=0)
+            if failed:
+                self._append(failed)
+        return len(failed)
+
+    def stats(self) -> dict:
+        """
+        各状态的条目数（已过期的租约计入 expired）
+
+        Returns:
+            dict: 状态 -> 条目数
+        """
+        now = time.time()
+        with locked(self.path, shared=True):
+            counter = Counter(
+                "expired" if item["status"] == LEASED and item.get("expires", 0) < now else item["status"]
+                for item in self._sync().values())
+        return {status: counter.get(status, 0) for status in (PENDING, LEASED, "expired", DONE, FAILED)}
+
+    def items(self, status: Optional[str] = None) -> List[dict]:
+        """
+        列出条目
+
+        Args:
+            status: 只列出指定状态的条目
+
+        Returns:
+            List[dict]: 条目列表（包含url）
+        """
+        with locked(self.path, shared=True):
+            return [{"url": url, **item} for url, item in self._sync().items()
+                    if status is None or item["status"] == status]
@@ -0,0 +1,289 @@
+"""
+归档完整性校验
+遍历 平台/账号/帖子/downloads 下的文件，多进程计算哈希并检查文件头、结束标记和下载时记录的大小；
+校验结果按 (大小, 修改时间, inode) 缓存在清单中，未变化的文件不再重新读取，
+损坏的文件写入修复队列，供定向重新下载
+"""
+
+import gzip
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from config.settings import INTEGRITY_CONFIG
+from src.utils.download_images_from_urls import load_download_sources
+from src.utils.preflight import sniff_content_type
+
+# 清单文件版本，字段变化时递增以强制全部重新校验
+MANIFEST_VERSION = 1
+
+# 文件头和结束标记检查读取的字节数
+EDGE_BYTES = 32
+
+
+def structural_problem(head: bytes, tail: bytes, size: int, mime: Optional[str]) -> Optional[str]:
+    """
+    根据文件头和文件尾判断图片是否残缺（不解码图片）
+
+    Args:
+        head: 文件开头的字节
+        tail: 文件末尾的字节
+        size: 文件大小
+        mime: 根据文件头识别出的类型
+
+    Returns:
+        Optional[str]: 问题描述，文件完整时返回None
+    """
+    if size == 0:
+        return "空文件"
+    if mime is None:
+        return "无法识别的文件头"
+    if mime == 'image/jpeg' and b'\xff\xd9' not in tail:
+        return "JPEG缺少结束标记"
+    if mime == 'image/png' and b'IEND' not in tail:
+        return "PNG缺少IEND块"
+    if mime == 'image/gif' and not tail.endswith(b'\x3b'):
+        return "GIF缺少结束标记"
+    if mime == 'image/webp' and int.from_bytes(head[4:8], 'little') + 8 != size:
+        return "WebP大小与文件头不一致"
+    if size >= EDGE_BYTES and not tail.strip(b'\x00'):
+        return "文件末尾为0填充"
+    return None
+
+
+def check_files(paths: List[str], read_size: int) -> List[dict]:
+    """
+    计算一批文件的哈希并检查结构（在校验子进程中运行）
+
+    Args:
+        paths: 文件绝对路径
+        read_size: 每次读取的字节数
+
+    Returns:
+        List[dict]: 每个文件的 sha256、类型和问题
+    """
+    buffer = memoryview(bytearray(read_size))
+    results = []
+    for path in paths:
+        digest = hashlib.sha256()
+        head, tail, size = b"", b"", 0
+        try:
+            with open(path, 'rb', buffering=0) as f:
+                while True:
+                    n = f.readinto(buffer)
+                    if not n:
+                        break
+                    digest.update(buffer[:n])
+                    if size < EDGE_BYTES:
+                        head += bytes(buffer[:min(n, EDGE_BYTES - size)])
+                    tail = (tail + bytes(buffer[max(0, n - EDGE_BYTES):n]))[-EDGE_BYTES:]
+                    size += n
+        except OSError as e:
+            results.append({"sha256": None, "type": None, "problem": f"读取失败: {e}"})
+            continue
+        mime = sniff_content_type(head)
+        results.append({"sha256": digest.hexdigest(), "type": mime,
+                        "problem": structural_problem(head, tail, size, mime)})
+    return results
+
+
+class ArchiveVerifier:
+    """归档完整性校验类"""
+
+    def __init__(self, root: str = "文案生成", manifest_file: Optional[str] = None):
+        """
+        初始化校验器
+
+        Args:
+            root: 归档根目录（其下为 平台/账号/帖子 三级目录）
+            manifest_file: 校验清单路径，默认在根目录的 .analytics 下
+        """
+        self.root = Path(root)
+        self.manifest_file = Path(manifest_file) if manifest_file else self.root / ".analytics" / "integrity.json.gz"
+        self.repair_file = self.manifest_file.with_name("repair_queue.json")
+        self.entries: Dict[str, dict] = {}
+
+    def _load(self) -> None:
+        """读取校验清单"""
+        try:
+            with gzip.open(self.manifest_file, 'rt', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == MANIFEST_VERSION:
+            self.entries = data["entries"]
+
+    def _save(self) -> None:
+        """写出校验清单（先写临时文件再替换）"""
+        self.manifest_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_file.with_name(self.manifest_file.name + f".{os.getpid()}.tmp")
+        with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=5) as f:
+            json.dump({"version": MANIFEST_VERSION, "entries": self.entries},
+                      f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, self.manifest_file)
+
+    def _scan(self) -> Dict[str, os.stat_result]:
+        """用 os.scandir 遍历 平台/账号/帖子/downloads 目录，收集所有下载文件的状态"""
+        found = {}
+        for platform in _subdirs(self.root):
+            for account in _subdirs(platform.path):
+                for post in _subdirs(account.path):
+                    try:
+                        with os.scandir(os.path.join(post.path, "downloads")) as it:
+                            for entry in it:
+                                if entry.name.startswith('.') or not entry.is_file():
+                                    continue
+                                found[os.path.relpath(entry.path, self.root)] = entry.stat()
+                    except OSError:
+                        continue
+        return found
+
+    def verify(self, jobs: Optional[int] = None, full: bool = False,
+               on_progress: Optional[Callable[[int, int], None]] = None) -> dict:
+        """
+        增量校验归档
+
+        Args:
+            jobs: 校验进程数，默认为CPU核数
+            full: 忽略清单，重新读取所有文件（可发现内容静默损坏）
+            on_progress: 每校验完一批文件时回调，参数为该批文件数和需要读取的文件总数
+
+        Returns:
+            dict: 文件数、本次读取数、跳过数、读取字节数、移除数、缺失数、损坏数
+        """
+        self._load()
+        found = self._scan()
+        stats = {"files": len(found), "hashed": 0, "unchanged": 0, "bytes_hashed": 0,
+                 "removed": 0, "missing": 0, "broken": 0}
+
+        # 帖子目录仍在但文件不见了的视为缺失，整篇帖子被删除的直接移出清单
+        for rel in list(self.entries):
+            if rel in found:
+                continue
+            if (self.root / rel).parent.is_dir():
+                if self.entries[rel].get("problem") != "文件缺失":
+                    self.entries[rel] = {**self.entries[rel], "problem": "文件缺失"}
+            else:
+                del self.entries[rel]
+                stats["removed"] += 1
+
+        todo = []
+        for rel, st in found.items():
+            old = self.entries.get(rel)
+            if not full and old and (old["size"], old["mtime_ns"], old["ino"]) == \
+                    (st.st_size, st.st_mtime_ns, st.st_ino):
+                stats["unchanged"] += 1
+                continue
+            todo.append(rel)
+            stats["hashed"] += 1
+            stats["bytes_hashed"] += st.st_size
+
+        batch_size = INTEGRITY_CONFIG["batch_size"]
+        batches = [todo[i:i + batch_size] for i in range(0, len(todo), batch_size)]
+        sources = {}
+        if batches:
+            # 使用spawn启动子进程，避免fork继承事件输出线程等状态
+            with ProcessPoolExecutor(jobs or os.cpu_count(),
+                                     mp_context=multiprocessing.get_context("spawn")) as executor:
+                futures = {executor.submit(check_files, [str(self.root / rel) for rel in batch],
+                                           INTEGRITY_CONFIG["read_size"]): batch for batch in batches}
+                for future in as_completed(futures):
+                    batch = futures[future]
+                    for rel, result in zip(batch, future.result()):
+                        self._record(rel, found[rel], result, sources)
+                    if on_progress:
+                        on_progress(len(batch), len(todo))
+
+        broken = self.broken()
+        stats["missing"] = sum(1 for item in broken if item["problem"] == "文件缺失")
+        stats["broken"] = len(broken) - stats["missing"]
+        self._save()
+        self._write_repair_queue(broken)
+        return stats
+
+    def _record(self, rel: str, st: os.stat_result, result: dict, sources: dict) -> None:
+        """写入单个文件的校验结果，并与下载时记录的大小和上次的哈希比较"""
+        old = self.entries.get(rel)
+        problem = result["problem"]
+        if problem is None:
+            downloads_dir = str(Path(rel).parent)
+            if downloads_dir not in sources:
+                sources[downloads_dir] = load_download_sources(self.root / downloads_dir)
+            source = sources[downloads_dir].get(Path(rel).name)
+            expected = source.bytes if source else None
+            if expected is not None and expected != st.st_size:
+                problem = f"大小与下载记录不一致: {st.st_size}/{expected} 字节"
+            elif old and old.get("sha256") and old["sha256"] != result["sha256"] and \
+                    (old["size"], old["mtime_ns"], old["ino"]) == (st.st_size, st.st_mtime_ns, st.st_ino):
+                # 大小和修改时间都没变而内容变了，通常是磁盘静默损坏；保留清单中的哈希以便下次仍能发现
+                problem = "内容与清单中的哈希不一致"
+                result = {**result, "sha256": old["sha256"]}
+        self.entries[rel] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "ino": st.st_ino,
+                             "sha256": result["sha256"], "type": result["type"], "problem": problem}
+
+    def broken(self) -> List[dict]:
+        """
+        清单中有问题的文件
+
+        Returns:
+            List[dict]: 每个文件的路径、问题和来源URL（无法确定时为None）
+        """
+        items = []
+        for rel, entry in sorted(self.entries.items()):
+            if entry.get("problem"):
+                items.append({"path": rel, "problem": entry["problem"], "url": self.source_url(rel)})
+        return items
+
+    def source_url(self, rel: str) -> Optional[str]:
+        """
+        查找文件的来源URL：优先使用下载记录，否则按文件名中的序号对应 raw_content.json 的 image_urls
+
+        Args:
+            rel: 文件相对归档根目录的路径
+
+        Returns:
+            Optional[str]: 来源URL
+        """
+        path = self.root / rel
+        source = load_download_sources(path.parent).get(path.name)
+        if source:
+            return source.url
+        match = re.search(r'(\d+)$', path.stem)
+        try:
+            with open(path.parent.parent / "raw_content.json", 'r', encoding='utf-8') as f:
+                image_urls = json.load(f).get("image_urls") or []
+        except (OSError, ValueError):
+            return None
+        if match and 1 <= int(match.group(1)) <= len(image_urls):
+            return image_urls[int(match.group(1)) - 1]
+        return None
+
+    def _write_repair_queue(self, broken: List[dict]) -> None:
+        """写出修复队列（先写临时文件再替换）"""
+        self.repair_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.repair_file.with_name(self.repair_file.name + f".{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(broken, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.repair_file)
+
+    def repair_queue(self) -> List[dict]:
+        """读取上次校验写出的修复队列"""
+        try:
+            with open(self.repair_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+
+def _subdirs(path) -> list:
+    """列出目录下的子目录（跳过隐藏目录）"""
+    try:
+        with os.scandir(path) as it:
+            return [entry for entry in it if entry.is_dir() and not entry.name.startswith('.')]
+    except OSError:
+        return []
@@ -0,0 +1,143 @@
+"""
+记录模型
+提取结果、图片和下载结果使用带 __slots__ 的数据类，在提取、保存、下载各环节之间直接传递同一个对象，
+不再反复拷贝成不同键名的字典；批量模式下每条记录比等价的字典少占约40%–70%内存（见 benchmark_records.py）
+"""
+
+from dataclasses import dataclass, field, fields
+from typing import List, Optional, Tuple
+
+
+# 每个记录类的 (字段名, 元组字段名)，首次使用时计算
+_field_info = {}
+
+
+def _fields_of(cls) -> tuple:
+    """记录类的字段名（按定义顺序）和以元组保存的字段名"""
+    info = _field_info.get(cls)
+    if info is None:
+        info = _field_info[cls] = (tuple(f.name for f in fields(cls)),
+                                   frozenset(f.name for f in fields(cls) if f.default == ()))
+    return info
+
+
+class Record:
+    """记录基类：与JSON兼容的字典互相转换"""
+
+    __slots__ = ()
+
+    # 值为None时不写入JSON的可选字段
+    OPTIONAL_FIELDS: Tuple[str, ...] = ()
+
+    def to_dict(self) -> dict:
+        """
+        转换为可直接 json.dump 的字典（元组转为列表，值为None的可选字段省略）
+
+        Returns:
+            dict: 记录内容
+        """
+        names, tuple_fields = _fields_of(type(self))
+        data = {}
+        for name in names:
+            value = getattr(self, name)
+            if value is None and name in self.OPTIONAL_FIELDS:
+                continue
+            data[name] = list(value) if name in tuple_fields else value
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """
+        从字典创建记录（忽略未知字段，列表转为元组保存）
+
+        Args:
+            data: 记录内容，如读取的 raw_content.json
+
+        Returns:
+            Record: 记录
+        """
+        names, tuple_fields = _fields_of(cls)
+        values = {name: data[name] for name in names if name in data}
+        for name in tuple_fields & values.keys():
+            values[name] = tuple(values[name] or ())
+        return cls(**values)
+
+
+@dataclass(slots=True)
+class ImageRef(Record):
+    """一张已下载的图片：来源URL、保存的文件名和字节数"""
+
+    url: str
+    filename: str = ""
+    bytes: int = 0
+
+
+@dataclass(slots=True)
+class NoteRecord(Record):
+    """小红书笔记提取结果（raw_content.json 的内容）"""
+
+    OPTIONAL_FIELDS = ("snapshot", "reextraction_time", "error")
+
+    note_id: str = ""
+    title: str = ""
+    content: str = ""
+    image_urls: Tuple[str, ...] = ()
+    tags: Tuple[str, ...] = ()
+    author: str = ""
+    url: str = ""
+    original_url: str = ""
+    extraction_time: str = ""
+    snapshot: Optional[dict] = None
+    reextraction_time: Optional[str] = None
+    error: Optional[str] = None
+
+    @classmethod
+    def failure(cls, error: str) -> "NoteRecord":
+        """提取失败的记录"""
+        return cls(error=error)
+
+
+@dataclass(slots=True)
+class ArticleRecord(Record):
+    """微信公众号文章提取结果"""
+
+    OPTIONAL_FIELDS = ("snapshot", "reextraction_time", "content_file", "image_url_file")
+
+    title: str = ""
+    content: str = ""
+    image_urls: Tuple[str, ...] = ()
+    url: str = ""
+    article_id: str = ""
+    author: str = ""
+    extraction_time: str = ""
+    snapshot: Optional[dict] = None
+    reextraction_time: Optional[str] = None
+    content_file: Optional[str] = None
+    image_url_file: Optional[str] = None
+
+
+@dataclass(slots=True)
+class DownloadResult(Record):
+    """批量下载结果"""
+
+    total: int = 0
+    success: int = 0
+    failed: int = 0
+    skipped: int = 0
+    failed_urls: List[str] = field(default_factory=list)
+    skipped_urls: List[str] = field(default_factory=list)
+    files: List[ImageRef] = field(default_factory=list)
+    concurrency: List[dict] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        """转换为字典（图片转为字典列表）"""
+        data = super(DownloadResult, self).to_dict()
+        data["files"] = [ref.to_dict() for ref in self.files]
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DownloadResult":
+        """从字典创建下载结果"""
+        result = super(DownloadResult, cls).from_dict(data)
+        result.files = [ImageRef.from_dict(ref) for ref in result.files]
+        return result
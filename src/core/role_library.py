@@ -0,0 +1,319 @@
+"""
+角色与Prompt库
+把 docs/roles 下的角色设定和 docs/SOP沉淀 下的SOP解析为结构化对象，
+按 (修改时间, 大小) 和内容哈希缓存，长时间运行的进程中文件变化后自动重新加载，
+为帖子渲染Prompt只是一次内存中的字符串替换
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from string import Template
+from typing import Dict, List, Optional, Tuple
+
+from config.settings import ROLE_LIBRARY_CONFIG
+
+_HEADING = re.compile(r'^(#{1,6})\s*(.+?)\s*$')
+
+# 角色文件中各部分标题的关键词
+ROLE_SECTION_KEYWORDS = {
+    "identity": ("core identity", "身份"),
+    "skills": ("skills", "技能"),
+    "rules": ("rules", "规则"),
+    "image": ("人物形象", "形象设计", "image"),
+}
+
+
+def parse_sections(text: str) -> List[Tuple[int, str, str]]:
+    """
+    按标题切分Markdown
+
+    Args:
+        text: Markdown文本
+
+    Returns:
+        List[Tuple[int, str, str]]: (标题级别, 标题, 正文) 列表，第一个标题之前的内容级别为0
+    """
+    sections = []
+    level, heading, body = 0, "", []
+    for line in text.splitlines():
+        match = _HEADING.match(line)
+        if match:
+            sections.append((level, heading, "\n".join(body).strip()))
+            level, heading, body = len(match.group(1)), match.group(2), []
+        else:
+            body.append(line)
+    sections.append((level, heading, "\n".join(body).strip()))
+    return [s for s in sections if s[1] or s[2]]
+
+
+def _section_kind(heading: str) -> Optional[str]:
+    """判断角色文件中某个标题属于哪一部分"""
+    lowered = heading.lower()
+    for kind, keywords in ROLE_SECTION_KEYWORDS.items():
+        if any(keyword in lowered for keyword in keywords):
+            return kind
+    return None
+
+
+_LIST_MARKER = re.compile(r'^\s*(?:[-*+]|\d+[.、)])\s+')
+
+
+def _lines(text: str) -> List[str]:
+    """非空行列表（去掉列表符号）"""
+    return [_LIST_MARKER.sub('', line).strip() for line in text.splitlines() if line.strip()]
+
+
+class Role:
+    """角色设定"""
+
+    __slots__ = ("name", "path", "title", "identity", "skills", "style_rules", "image", "prompt_template")
+
+    def __init__(self, path: Path, text: str):
+        """
+        解析角色设定文件
+
+        Args:
+            path: 文件路径
+            text: 文件内容
+        """
+        self.name = path.stem
+        self.path = path
+        self.title = self.name
+        parts = {"identity": [], "skills": [], "rules": [], "image": []}
+        current = None
+        for level, heading, body in parse_sections(text):
+            kind = _section_kind(heading) if heading else None
+            if level == 1 and kind is None:
+                self.title = heading
+                current = None
+            elif kind:
+                current = kind
+            if current and body:
+                parts[current].append(body)
+
+        self.identity = "\n".join(parts["identity"])
+        self.skills = _lines("\n".join(parts["skills"]))
+        self.style_rules = _lines("\n".join(parts["rules"]))
+        self.image = "\n".join(parts["image"])
+
+        # 角色部分在加载时就填好，渲染时只替换任务相关的变量
+        filled = ROLE_LIBRARY_CONFIG["prompt_template"].format(
+            title=self.title.replace("$", "$$"),
+            identity=self.identity.replace("$", "$$"),
+            skills="\n".join(f"- {s}" for s in self.skills).replace("$", "$$"),
+            rules="\n".join(f"- {r}" for r in self.style_rules).replace("$", "$$"),
+        )
+        self.prompt_template = Template(filled)
+
+    def render(self, task: str, **variables) -> str:
+        """
+        渲染该角色的Prompt
+
+        Args:
+            task: 本次创作任务
+            **variables: 模板中的其他变量
+
+        Returns:
+            str: Prompt文本
+        """
+        return self.prompt_template.safe_substitute(task=task, **variables)
+
+
+class SopDocument:
+    """SOP文档，每个步骤可带工具和提示词模板"""
+
+    __slots__ = ("name", "path", "title", "steps")
+
+    def __init__(self, path: Path, text: str):
+        """
+        解析SOP文件
+
+        Args:
+            path: 文件路径
+            text: 文件内容
+        """
+        self.name = path.stem
+        self.path = path
+        self.title = self.name
+        self.steps: List[dict] = []
+        step = None
+        for level, heading, body in parse_sections(text):
+            if level == 1:
+                self.title = heading
+            elif level == 2:
+                step = {"title": heading, "tool": "", "prompt": "", "notes": body}
+                self.steps.append(step)
+            elif level >= 3 and step is not None:
+                label, _, value = heading.partition("：") if "：" in heading else heading.partition(":")
+                label = label.strip()
+                if "提示词" in label:
+                    step["prompt"] = body or value.strip()
+                elif "工具" in label:
+                    step["tool"] = value.strip()
+                elif body:
+                    step["notes"] = "\n".join(filter(None, [step["notes"], f"{heading}\n{body}"]))
+
+    @property
+    def prompts(self) -> Dict[str, str]:
+        """步骤标题到提示词的映射"""
+        return {s["title"]: s["prompt"] for s in self.steps if s["prompt"]}
+
+    def prompt(self, step: str) -> Optional[str]:
+        """按步骤标题（支持部分匹配）查找提示词"""
+        for title, prompt in self.prompts.items():
+            if step == title or step in title:
+                return prompt
+        return None
+
+
+class RoleLibrary:
+    """角色与SOP库，带缓存和热加载"""
+
+    def __init__(self, roles_dir: Optional[str] = None, sop_dir: Optional[str] = None,
+                 reload_interval: Optional[float] = None):
+        """
+        初始化角色库
+
+        Args:
+            roles_dir: 角色设定目录
+            sop_dir: SOP目录
+            reload_interval: 检查文件变化的最小间隔（秒），0表示每次访问都检查
+        """
+        self.dirs = {
+            Role: Path(roles_dir or ROLE_LIBRARY_CONFIG["roles_dir"]),
+            SopDocument: Path(sop_dir or ROLE_LIBRARY_CONFIG["sop_dir"]),
+        }
+        self.reload_interval = (ROLE_LIBRARY_CONFIG["reload_interval"]
+                                if reload_interval is None else reload_interval)
+        self._lock = threading.Lock()
+        # 文件路径 -> (mtime_ns, size, sha256, 解析结果)
+        self._entries: Dict[str, tuple] = {}
+        self._roles: Dict[str, Role] = {}
+        self._sops: Dict[str, SopDocument] = {}
+        self._last_check = 0.0
+        self.refresh()
+
+    def refresh(self) -> int:
+        """
+        检查文件变化并重新解析变化的文件
+
+        修改时间和大小都未变化的文件直接跳过；变化的文件先比较内容哈希，内容相同则不重新解析
+
+        Returns:
+            int: 本次重新解析的文件数
+        """
+        parsed = 0
+        with self._lock:
+            seen = set()
+            for cls, directory in self.dirs.items():
+                try:
+                    entries = [e for e in os.scandir(directory) if e.is_file() and e.name.endswith(".md")]
+                except OSError:
+                    continue
+                for entry in entries:
+                    seen.add(entry.path)
+                    stat = entry.stat()
+                    cached = self._entries.get(entry.path)
+                    if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+                        continue
+                    data = Path(entry.path).read_bytes()
+                    digest = hashlib.sha256(data).hexdigest()
+                    if cached and cached[2] == digest:
+                        self._entries[entry.path] = (stat.st_mtime_ns, stat.st_size, digest, cached[3])
+                        continue
+                    document = cls(Path(entry.path), data.decode("utf-8"))
+                    self._entries[entry.path] = (stat.st_mtime_ns, stat.st_size, digest, document)
+                    parsed += 1
+
+            for path in [p for p in self._entries if p not in seen]:
+                del self._entries[path]
+
+            documents = [entry[3] for entry in self._entries.values()]
+            self._roles = {d.name: d for d in documents if isinstance(d, Role)}
+            self._sops = {d.name: d for d in documents if isinstance(d, SopDocument)}
+            self._last_check = time.monotonic()
+        return parsed
+
+    def _maybe_refresh(self) -> None:
+        """距离上次检查超过间隔时检查文件变化"""
+        if time.monotonic() - self._last_check >= self.reload_interval:
+            self.refresh()
+
+    @property
+    def roles(self) -> Dict[str, Role]:
+        """所有角色"""
+        self._maybe_refresh()
+        return self._roles
+
+    @property
+    def sops(self) -> Dict[str, SopDocument]:
+        """所有SOP"""
+        self._maybe_refresh()
+        return self._sops
+
+    def get_role(self, name: str) -> Role:
+        """
+        按名称获取角色（文件名或标题，支持部分匹配）
+
+        Args:
+            name: 角色名
+
+        Returns:
+            Role: 角色
+
+        Raises:
+            KeyError: 找不到角色
+        """
+        roles = self.roles
+        if name in roles:
+            return roles[name]
+        for role in roles.values():
+            if name in role.name or name in role.title:
+                return role
+        raise KeyError(f"未找到角色: {name}")
+
+    def get_sop(self, name: str) -> SopDocument:
+        """按名称获取SOP（支持部分匹配），找不到时抛出KeyError"""
+        sops = self.sops
+        if name in sops:
+            return sops[name]
+        for sop in sops.values():
+            if name in sop.name or name in sop.title:
+                return sop
+        raise KeyError(f"未找到SOP: {name}")
+
+    def render(self, role: str, task: str, sop: Optional[str] = None, step: Optional[str] = None,
+               **variables) -> str:
+        """
+        为一次创作渲染Prompt
+
+        Args:
+            role: 角色名
+            task: 创作任务；同时指定sop和step时，SOP步骤的提示词会追加在任务之后
+            sop: SOP名称
+            step: SOP步骤标题
+            **variables: 模板中的其他变量
+
+        Returns:
+            str: Prompt文本
+        """
+        if sop and step:
+            step_prompt = self.get_sop(sop).prompt(step)
+            if step_prompt:
+                task = f"{task}\n\n{step_prompt}" if task else step_prompt
+        return self.get_role(role).render(task, **variables)
+
+
+_library = None
+
+
+def get_role_library() -> RoleLibrary:
+    """获取进程内共享的角色库"""
+    global _library
+    if _library is None:
+        _library = RoleLibrary()
+    return _library
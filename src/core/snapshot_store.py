@@ -0,0 +1,167 @@
+"""
+页面快照库
+把抓取到的原始页面按内容哈希压缩保存（相同页面只存一份），
+改进提取规则后可以在本地快照上重新提取，不再需要重新访问网站
+"""
+
+import gzip
+import hashlib
+import json
+import lzma
+import os
+import time
+from pathlib import Path
+from typing import Iterator, Optional
+
+from config.settings import SNAPSHOT_CONFIG
+from src.utils.file_lock import locked
+
+# 压缩格式 -> (扩展名, 打开函数)
+COMPRESSORS = {
+    "gzip": (".gz", lambda path, mode, level: gzip.open(path, mode, compresslevel=level)),
+    "lzma": (".xz", lambda path, mode, level: lzma.open(path, mode, preset=level)),
+}
+
+
+class SnapshotStore:
+    """按内容寻址的压缩快照库"""
+
+    def __init__(self, root: str = "文案生成", compression: Optional[str] = None, level: Optional[int] = None):
+        """
+        初始化快照库
+
+        Args:
+            root: 归档根目录，快照保存在其下的 .snapshots 目录
+            compression: 压缩格式（gzip / lzma），默认读取配置
+            level: 压缩级别，默认读取配置
+        """
+        self.path = Path(root) / SNAPSHOT_CONFIG["dir"]
+        self.index_file = self.path / "index.jsonl"
+        self.compression = compression or SNAPSHOT_CONFIG["compression"]
+        self.level = SNAPSHOT_CONFIG["level"] if level is None else level
+
+    def _object_path(self, digest: str, compression: str) -> Path:
+        """快照文件路径（按哈希前两位分目录）"""
+        return self.path / "objects" / digest[:2] / f"{digest}.html{COMPRESSORS[compression][0]}"
+
+    def put(self, body: bytes, url: str, final_url: str = "", platform: str = "",
+            encoding: Optional[str] = None) -> dict:
+        """
+        保存一个页面快照
+
+        Args:
+            body: 页面原始字节
+            url: 请求的链接
+            final_url: 重定向后的链接
+            platform: 平台（xhs / wechat）
+            encoding: 页面文本编码
+
+        Returns:
+            dict: 快照引用 {"sha256", "encoding", "platform"}，写入 raw_content.json 以便重新提取
+        """
+        digest = hashlib.sha256(body).hexdigest()
+        stored = self.find(digest)
+        if stored is None:
+            stored = self._object_path(digest, self.compression)
+            stored.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = stored.with_name(f"{stored.name}.{os.getpid()}.tmp")
+            with COMPRESSORS[self.compression][1](tmp_path, 'wb', self.level) as f:
+                f.write(body)
+            os.replace(tmp_path, stored)
+
+        record = {"sha256": digest, "url": url, "final_url": final_url or url, "platform": platform,
+                  "encoding": encoding, "size": len(body), "stored_size": stored.stat().st_size,
+                  "fetched_at": time.strftime("%Y-%m-%d %H:%M:%S")}
+        with locked(self.index_file):
+            with open(self.index_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return {"sha256": digest, "encoding": encoding, "platform": platform}
+
+    def find(self, digest: str) -> Optional[Path]:
+        """查找快照文件（任一压缩格式），不存在时返回None"""
+        for compression in COMPRESSORS:
+            path = self._object_path(digest, compression)
+            if path.exists():
+                return path
+        return None
+
+    def get(self, digest: str) -> bytes:
+        """
+        读取快照
+
+        Args:
+            digest: 页面sha256
+
+        Returns:
+            bytes: 页面原始字节
+
+        Raises:
+            FileNotFoundError: 快照不存在
+        """
+        path = self.find(digest)
+        if path is None:
+            raise FileNotFoundError(f"快照不存在: {digest}")
+        compression = "lzma" if path.suffix == ".xz" else "gzip"
+        with COMPRESSORS[compression][1](path, 'rb', self.level) as f:
+            return f.read()
+
+    def get_text(self, snapshot: dict) -> str:
+        """按快照引用读取页面文本"""
+        return self.get(snapshot["sha256"]).decode(snapshot.get("encoding") or "utf-8", errors="replace")
+
+    def records(self) -> Iterator[dict]:
+        """遍历快照索引中的抓取记录"""
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+        except FileNotFoundError:
+            return
+
+    def stats(self) -> dict:
+        """
+        快照库统计
+
+        Returns:
+            dict: 抓取次数、去重后的快照数、原始和压缩后的字节数
+        """
+        fetches, unique = 0, {}
+        for record in self.records():
+            fetches += 1
+            unique[record["sha256"]] = record
+        return {"fetches": fetches, "snapshots": len(unique),
+                "raw_bytes": sum(r["size"] for r in unique.values()),
+                "stored_bytes": sum(r["stored_size"] for r in unique.values())}
+
+
+_stores = {}
+
+
+def get_snapshot_store(root: str = "文案生成") -> SnapshotStore:
+    """获取进程内共享的快照库"""
+    key = str(Path(root).resolve())
+    if key not in _stores:
+        _stores[key] = SnapshotStore(root)
+    return _stores[key]
+
+
+def snapshot_page(page, url: str, platform: str, root: str = "文案生成") -> Optional[dict]:
+    """
+    把抓取到的页面保存为快照（配置中未启用时不保存）
+
+    Args:
+        page: 抓取到的页面（FetchedPage，流式抓取提前停止时只包含已读取的部分）
+        url: 请求的链接
+        platform: 平台（xhs / wechat）
+        root: 归档根目录
+
+    Returns:
+        dict: 快照引用，未启用时返回None
+
+    Raises:
+        OSError: 写入快照失败
+    """
+    if not SNAPSHOT_CONFIG["enabled"]:
+        return None
+    return get_snapshot_store(root).put(page.content, url, page.url, platform, page.encoding)
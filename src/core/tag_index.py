@@ -0,0 +1,232 @@
+"""
+标签索引
+在保存每篇帖子时增量维护 标签 -> 帖子 倒排索引、标签共现矩阵和按周统计，
+用于话题研究时即时查询“本周上升的标签”和“与某标签一起出现的标签”。
+索引保存为快照 + 追加日志：每索引一篇帖子只追加一行，定期压缩成新快照
+"""
+
+import threading
+from collections import Counter
+from datetime import date, timedelta
+from itertools import combinations
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from src.utils.file_lock import locked
+from src.utils.journal import Journal
+
+from .analytics import ArchiveAnalytics, iso_week
+
+INDEX_VERSION = 1
+
+
+def normalize_tag(tag: str) -> str:
+    """规范化标签（去掉#和首尾空白）"""
+    return tag.strip().lstrip('#').strip()
+
+
+class TagIndex:
+    """标签索引类"""
+
+    def __init__(self, root: str = "文案生成", index_file: Optional[str] = None):
+        """
+        初始化标签索引
+
+        Args:
+            root: 归档根目录
+            index_file: 索引文件路径，默认在根目录的 .analytics 下
+        """
+        self.root = Path(root)
+        self.index_file = Path(index_file) if index_file else self.root / ".analytics" / "tag_index.json"
+        self._lock = threading.Lock()
+        self._journal = Journal(self.index_file)
+        with locked(self.index_file, shared=True), self._lock:
+            self._sync()
+
+    def _load(self, data: dict) -> None:
+        """用快照内容重置内存中的索引"""
+        if data.get("version") != INDEX_VERSION:
+            data = {}
+        self.posts = data.get("posts", {})
+        self.postings = {tag: set(keys) for tag, keys in data.get("postings", {}).items()}
+        self.cooccurrence = {tag: Counter(others) for tag, others in data.get("cooccurrence", {}).items()}
+        self.weekly = {tag: Counter(weeks) for tag, weeks in data.get("weekly", {}).items()}
+
+    def _state(self) -> dict:
+        """快照内容"""
+        return {
+            "version": INDEX_VERSION,
+            "posts": self.posts,
+            "postings": {tag: sorted(keys) for tag, keys in self.postings.items()},
+            "cooccurrence": {tag: dict(others) for tag, others in self.cooccurrence.items()},
+            "weekly": {tag: dict(weeks) for tag, weeks in self.weekly.items()},
+        }
+
+    def _sync(self) -> None:
+        """读取其他进程追加的变化（调用方需持有文件锁和 self._lock）"""
+        self._journal.sync(self._load, self._replay)
+
+    def _replay(self, record: dict) -> None:
+        """应用一条日志记录：{"post": 帖子键, "entry": 帖子信息}，entry 为 null 表示移除"""
+        post_key = record["post"]
+        old = self.posts.pop(post_key, None)
+        if old:
+            self._apply(post_key, old["tags"], old["week"], -1)
+        entry = record.get("entry")
+        if entry:
+            self._apply(post_key, entry["tags"], entry["week"], 1)
+            self.posts[post_key] = entry
+
+    def _record(self, record: dict) -> None:
+        """在内存中应用一条变化并追加到日志（调用方需持有文件锁和 self._lock，并已调用 _sync）"""
+        self._replay(record)
+        self._journal.append([record], len(self.posts), self._state)
+
+    def save(self) -> None:
+        """把整个索引写成新快照（压缩日志）"""
+        with locked(self.index_file), self._lock:
+            self._journal.compact(self._state())
+
+    def _apply(self, post_key: str, tags: List[str], week: str, sign: int) -> None:
+        """把一篇帖子的标签计入（sign=1）或移出（sign=-1）索引"""
+        for tag in tags:
+            keys = self.postings.setdefault(tag, set())
+            if sign > 0:
+                keys.add(post_key)
+            else:
+                keys.discard(post_key)
+            weeks = self.weekly.setdefault(tag, Counter())
+            weeks[week] += sign
+            if weeks[week] <= 0:
+                del weeks[week]
+        for a, b in combinations(tags, 2):
+            for x, y in ((a, b), (b, a)):
+                others = self.cooccurrence.setdefault(x, Counter())
+                others[y] += sign
+                if others[y] <= 0:
+                    del others[y]
+        # 清理已经没有帖子的标签
+        for tag in tags:
+            if not self.postings.get(tag):
+                self.postings.pop(tag, None)
+                self.weekly.pop(tag, None)
+                self.cooccurrence.pop(tag, None)
+
+    def add_post(self, post_key: str, tags: Iterable[str], extraction_time: Optional[str] = None, **meta) -> None:
+        """
+        索引一篇帖子（重复索引同一帖子会先撤销旧的统计）
+
+        Args:
+            post_key: 帖子唯一键，如 "小红书自媒体帖子:<笔记ID>"
+            tags: 标签列表
+            extraction_time: 提取时间，用于按周统计
+            **meta: 附加信息（标题、账号、目录等）
+        """
+        tags = sorted({normalize_tag(t) for t in tags if normalize_tag(t)})
+        entry = {"tags": tags, "week": iso_week(extraction_time), **meta}
+        # 多个worker进程共享同一索引，先读取其他进程追加的变化，再追加本次变化
+        with locked(self.index_file), self._lock:
+            self._sync()
+            self._record({"post": post_key, "entry": entry})
+
+    def remove_post(self, post_key: str) -> None:
+        """从索引中移除一篇帖子"""
+        with locked(self.index_file), self._lock:
+            self._sync()
+            if post_key in self.posts:
+                self._record({"post": post_key, "entry": None})
+
+    def posts_for(self, tag: str) -> List[dict]:
+        """
+        查询包含某标签的帖子
+
+        Args:
+            tag: 标签（可带#）
+
+        Returns:
+            List[dict]: 帖子信息列表
+        """
+        keys = self.postings.get(normalize_tag(tag), ())
+        return [{"post": key, **self.posts.get(key, {})} for key in sorted(keys)]
+
+    def cooccurring(self, tag: str, top: Optional[int] = 20) -> List[dict]:
+        """
+        查询与某标签共同出现的标签
+
+        Args:
+            tag: 标签（可带#）
+            top: 返回前N项
+
+        Returns:
+            List[dict]: 按共现次数排序的标签
+        """
+        others = self.cooccurrence.get(normalize_tag(tag), Counter())
+        return [{"tag": other, "posts": count} for other, count in others.most_common(top)]
+
+    def rising_tags(self, week: Optional[str] = None, top: Optional[int] = 20, min_posts: int = 2) -> List[dict]:
+        """
+        查询某一周相对上一周增长最快的标签
+
+        Args:
+            week: ISO周（如 2025-W43），默认为本周
+            top: 返回前N项
+            min_posts: 本周至少出现的帖子数
+
+        Returns:
+            List[dict]: 包含本周、上周帖子数和增长率的标签列表
+        """
+        week = week or iso_week(None)
+        year, number = week.split("-W")
+        previous_monday = date.fromisocalendar(int(year), int(number), 1) - timedelta(weeks=1)
+        prev_year, prev_week, _ = previous_monday.isocalendar()
+        previous = f"{prev_year}-W{prev_week:02d}"
+
+        rows = []
+        for tag, weeks in self.weekly.items():
+            current = weeks.get(week, 0)
+            if current < min_posts:
+                continue
+            before = weeks.get(previous, 0)
+            rows.append({"tag": tag, "this_week": current, "last_week": before,
+                         "growth": round((current - before) / max(before, 1), 2)})
+        rows.sort(key=lambda r: (r["growth"], r["this_week"]), reverse=True)
+        return rows[:top] if top else rows
+
+    def rebuild(self, analytics: Optional[ArchiveAnalytics] = None) -> int:
+        """
+        从归档中重建索引（用于索引丢失或首次启用时）
+
+        Args:
+            analytics: 归档分析对象，默认新建并刷新
+
+        Returns:
+            int: 索引的帖子数
+        """
+        if analytics is None:
+            analytics = ArchiveAnalytics(str(self.root))
+            analytics.refresh()
+
+        with self._lock:
+            self.posts, self.postings, self.cooccurrence, self.weekly = {}, {}, {}, {}
+        cols = analytics.columns
+        for i in range(len(analytics)):
+            post_key = f"{cols['platform'][i]}:{cols['post_id'][i] or cols['path'][i]}"
+            tags = sorted({normalize_tag(t) for t in cols["tags"][i] if normalize_tag(t)})
+            with self._lock:
+                self._apply(post_key, tags, cols["week"][i], 1)
+                self.posts[post_key] = {"tags": tags, "week": cols["week"][i], "title": cols["title"][i],
+                                        "account": cols["account"][i],
+                                        "path": str(Path(cols["path"][i]).parent)}
+        self.save()
+        return len(self.posts)
+
+
+_indexes = {}
+
+
+def get_tag_index(root: str = "文案生成") -> TagIndex:
+    """获取进程内共享的标签索引"""
+    key = str(Path(root).resolve())
+    if key not in _indexes:
+        _indexes[key] = TagIndex(root)
+    return _indexes[key]
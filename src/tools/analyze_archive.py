@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+内容归档分析工具
+增量统计 文案生成 目录下的帖子：各账号帖子数、标签频次、作者频次、每周图片数
+"""
+
+import sys
+import os
+import time
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.core.analytics import ArchiveAnalytics, export_rows, format_table
+from src.utils import events, profiling
+
+REPORTS = {
+    "accounts": lambda a, args: a.posts_per_account(args.platform),
+    "tags": lambda a, args: a.tag_frequency(args.top, args.platform, args.account),
+    "authors": lambda a, args: a.author_frequency(args.top, args.platform, args.account),
+    "images-per-week": lambda a, args: a.images_per_week(args.platform, args.account),
+}
+
+
+def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='内容归档分析工具')
+    parser.add_argument('report', choices=sorted(REPORTS), help='报表类型')
+    parser.add_argument('--root', default='文案生成', help='归档根目录，默认为文案生成')
+    parser.add_argument('--platform', help='只统计指定平台目录，如 小红书自媒体帖子')
+    parser.add_argument('--account', help='只统计指定账号')
+    parser.add_argument('--top', type=int, help='只显示前N项')
+    parser.add_argument('--format', '-f', choices=['table', 'csv', 'json'], default='table',
+                       help='输出格式，默认为table')
+    parser.add_argument('--output', '-o', help='导出文件路径（csv/json格式时使用）')
+    events.add_event_arguments(parser)
+    profiling.add_profile_arguments(parser)
+
+    args = parser.parse_args()
+    events.configure_from_args(args)
+    profiling.start_profiling_from_args(args)
+
+    started = time.perf_counter()
+    analytics = ArchiveAnalytics(args.root)
+    with profiling.profile_stage("refresh"):
+        stats = analytics.refresh()
+    with profiling.profile_stage("report"):
+        rows = REPORTS[args.report](analytics, args)
+    elapsed = time.perf_counter() - started
+
+    # 报表直接输出到标准输出时，统计信息降为调试级别，避免混入CSV/JSON
+    machine_stdout = args.format != 'table' and not args.output
+    events.emit(events.DEBUG if machine_stdout else events.INFO, "refreshed",
+                f"📊 共 {len(analytics)} 篇帖子，本次解析 {stats['parsed']} 篇，"
+                f"移除 {stats['removed']} 篇，用时 {elapsed:.3f} 秒",
+                posts=len(analytics), elapsed=round(elapsed, 3), **stats)
+
+    if args.output:
+        path = export_rows(rows, args.output, args.format)
+        events.info("exported", f"💾 报表已导出到: {path}", path=str(path), rows=len(rows))
+        return 0
+
+    # 报表是命令的输出，直接写到标准输出，不受 --quiet / --json-log 影响
+    events.debug("report", report=args.report, rows=len(rows))
+    events.flush()
+    if args.format == 'table':
+        print(format_table(rows))
+    else:
+        if args.format == 'json':
+            import json
+            print(json.dumps(rows, ensure_ascii=False, indent=2))
+        else:
+            import csv
+            writer = csv.DictWriter(sys.stdout, fieldnames=list(rows[0]) if rows else [])
+            writer.writeheader()
+            writer.writerows(rows)
+
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+下载写入路径基准测试
+在本地 http.server 上提供测试文件，分别用 逐块iter_content、整体读入内存 和 大缓冲区readinto
+三种方式下载，每种方式在独立子进程中运行，比较每MB的CPU时间和峰值内存（RSS）
+"""
+
+import sys
+import os
+import json
+import resource
+import subprocess
+import tempfile
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import requests
+
+from src.core.analytics import format_table
+from src.utils import events, profiling
+from src.utils.download_images_from_urls import write_response_to_file
+
+
+def _download_iter_content(url: str, filepath: Path) -> int:
+    """原实现：8KB逐块迭代写入"""
+    written = 0
+    with requests.get(url, stream=True, timeout=30) as response:
+        response.raise_for_status()
+        with open(filepath, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=8192):
+                if chunk:
+                    f.write(chunk)
+                    written += len(chunk)
+    return written
+
+
+def _download_whole_body(url: str, filepath: Path) -> int:
+    """原微信图片实现：整个响应体读入内存后写入"""
+    response = requests.get(url, timeout=30)
+    response.raise_for_status()
+    with open(filepath, 'wb') as f:
+        f.write(response.content)
+    return len(response.content)
+
+
+def _download_readinto(url: str, filepath: Path) -> int:
+    """新实现：可复用大缓冲区 readinto + 预分配"""
+    with requests.get(url, stream=True, timeout=30) as response:
+        response.raise_for_status()
+        return write_response_to_file(response, filepath, url)
+
+
+MODES = {
+    "iter_content": _download_iter_content,
+    "whole_body": _download_whole_body,
+    "readinto": _download_readinto,
+}
+
+
+def run_worker(mode: str, url: str, output_dir: str, repeat: int) -> dict:
+    """
+    子进程中执行一种下载方式并测量资源占用
+
+    Args:
+        mode: 下载方式
+        url: 测试文件URL
+        output_dir: 输出目录
+        repeat: 重复下载次数
+
+    Returns:
+        dict: 字节数、CPU时间、耗时和峰值RSS
+    """
+    download = MODES[mode]
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # 预热一次，CPU时间不计入首次连接和延迟导入的开销
+    download(url, Path(output_dir) / f"{mode}_warmup.bin")
+    usage_before = resource.getrusage(resource.RUSAGE_SELF)
+    started = time.perf_counter()
+    total = 0
+    for i in range(repeat):
+        total += download(url, Path(output_dir) / f"{mode}_{i}.bin")
+    elapsed = time.perf_counter() - started
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    cpu = (usage.ru_utime - usage_before.ru_utime) + (usage.ru_stime - usage_before.ru_stime)
+    return {"bytes": total, "cpu": cpu, "elapsed": elapsed,
+            "rss_before_kb": rss_before, "rss_peak_kb": usage.ru_maxrss}
+
+
+def _serve(directory: str) -> ThreadingHTTPServer:
+    """在后台线程中启动本地静态文件服务器"""
+    class QuietHandler(SimpleHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(QuietHandler, directory=directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='下载写入路径基准测试')
+    parser.add_argument('--size-mb', type=int, default=64, help='测试文件大小（MB），默认64')
+    parser.add_argument('--repeat', type=int, default=3, help='每种方式重复下载次数，默认3')
+    parser.add_argument('--modes', nargs='+', choices=sorted(MODES), default=list(MODES),
+                        help='参与比较的下载方式')
+    parser.add_argument('--worker', nargs=3, metavar=('MODE', 'URL', 'DIR'), help=argparse.SUPPRESS)
+    events.add_event_arguments(parser)
+    profiling.add_profile_arguments(parser)
+
+    args = parser.parse_args()
+
+    if args.worker:
+        mode, url, output_dir = args.worker
+        print(json.dumps(run_worker(mode, url, output_dir, args.repeat)))
+        return 0
+
+    events.configure_from_args(args)
+    profiling.start_profiling_from_args(args)
+
+    rows = []
+    with tempfile.TemporaryDirectory() as serve_dir, tempfile.TemporaryDirectory() as output_dir:
+        with open(os.path.join(serve_dir, "payload.bin"), 'wb') as f:
+            f.write(os.urandom(args.size_mb * 1024 * 1024))
+        server = _serve(serve_dir)
+        url = f"http://127.0.0.1:{server.server_address[1]}/payload.bin"
+        events.info("bench_start", f"🏁 测试文件 {args.size_mb} MB，每种方式下载 {args.repeat} 次",
+                    size_mb=args.size_mb, repeat=args.repeat)
+
+        try:
+            for mode in args.modes:
+                with profiling.profile_stage(mode):
+                    result = subprocess.run(
+                        [sys.executable, os.path.abspath(__file__), '--worker', mode, url, output_dir,
+                         '--repeat', str(args.repeat)],
+                        capture_output=True, text=True, check=True)
+                stats = json.loads(result.stdout.strip().splitlines()[-1])
+                mb = stats["bytes"] / (1024 * 1024)
+                rows.append({
+                    "mode": mode,
+                    "cpu_ms_per_mb": round(stats["cpu"] * 1000 / mb, 2),
+                    "mb_per_s": round(mb / stats["elapsed"], 1),
+                    "peak_rss_mb": round(stats["rss_peak_kb"] / 1024, 1),
+                    "rss_growth_mb": round((stats["rss_peak_kb"] - stats["rss_before_kb"]) / 1024, 1),
+                })
+                events.debug("bench_mode", f"✅ {mode} 完成", mode=mode, **stats)
+        except subprocess.CalledProcessError as e:
+            events.error("bench_failed", f"❌ 子进程失败: {e.stderr.strip()}", error=e.stderr)
+            return 1
+        finally:
+            server.shutdown()
+
+    events.info("report", format_table(rows), rows=rows)
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+记录模型内存基准测试
+分别用原来的字典和 __slots__ 记录保存同样内容的笔记、图片和下载结果，
+用 tracemalloc 统计每条记录本身（不含共享的字段字符串）占用的内存，并比较与JSON互转的耗时
+"""
+
+import sys
+import os
+import json
+import time
+import tracemalloc
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.core.analytics import format_table
+from src.core.records import DownloadResult, ImageRef, NoteRecord
+from src.utils import events, profiling
+
+
+def _note_values(i: int) -> dict:
+    """第i条笔记的字段（图片和标签数取批量抓取中的常见值）"""
+    return {
+        "note_id": f"{i:024x}",
+        "title": f"标题{i}",
+        "content": f"正文{i}",
+        "image_urls": [f"https://sns-img-bd.xhscdn.com/{i}-{n}" for n in range(6)],
+        "tags": [f"标签{n}" for n in range(5)],
+        "author": "作者",
+        "url": f"https://www.xiaohongshu.com/explore/{i:024x}",
+        "original_url": f"http://xhslink.com/{i}",
+        "extraction_time": "2025-10-20 15:31:53",
+    }
+
+
+# 每种记录：(名称, 原字典构造, 记录构造)，构造函数只创建容器，字段值提前生成
+CASES = {
+    "note": (
+        lambda v: {**v, "image_urls": list(v["image_urls"]), "tags": list(v["tags"])},
+        lambda v: NoteRecord(v["note_id"], v["title"], v["content"], tuple(v["image_urls"]), tuple(v["tags"]),
+                             v["author"], v["url"], v["original_url"], v["extraction_time"]),
+    ),
+    "image": (
+        lambda v: {"url": v["image_urls"][0], "filename": "image_01.jpg", "bytes": 123456},
+        lambda v: ImageRef(v["image_urls"][0], "image_01.jpg", 123456),
+    ),
+    "download": (
+        lambda v: {"total": 6, "success": 6, "failed": 0, "skipped": 0, "failed_urls": [], "skipped_urls": [],
+                   "files": [{"url": u, "filename": f"image_{n:02d}.jpg", "bytes": 123456}
+                             for n, u in enumerate(v["image_urls"], 1)]},
+        lambda v: DownloadResult(6, 6, 0, 0, files=[ImageRef(u, f"image_{n:02d}.jpg", 123456)
+                                                    for n, u in enumerate(v["image_urls"], 1)]),
+    ),
+}
+
+
+def measure(build, values: list) -> float:
+    """构造全部记录，返回每条记录占用的字节数"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    items = [build(v) for v in values]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # 减去保存记录的列表本身
+    return (after - before - sys.getsizeof(items)) / len(items)
+
+
+def roundtrip_us(values: list) -> dict:
+    """笔记记录与 raw_content.json 文本互转的耗时（微秒/条）"""
+    dicts = [CASES["note"][0](v) for v in values]
+    records = [CASES["note"][1](v) for v in values]
+
+    started = time.perf_counter()
+    texts = [json.dumps(d, ensure_ascii=False) for d in dicts]
+    _ = [json.loads(t) for t in texts]
+    dict_us = (time.perf_counter() - started) / len(values) * 1e6
+
+    started = time.perf_counter()
+    texts = [json.dumps(r.to_dict(), ensure_ascii=False) for r in records]
+    _ = [NoteRecord.from_dict(json.loads(t)) for t in texts]
+    record_us = (time.perf_counter() - started) / len(values) * 1e6
+    return {"dict_us": round(dict_us, 2), "record_us": round(record_us, 2)}
+
+
+def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='记录模型内存基准测试')
+    parser.add_argument('--count', '-n', type=int, default=100000, help='记录条数，默认100000')
+    events.add_event_arguments(parser)
+    profiling.add_profile_arguments(parser)
+
+    args = parser.parse_args()
+    events.configure_from_args(args)
+    profiling.start_profiling_from_args(args)
+
+    values = [_note_values(i) for i in range(args.count)]
+    events.info("bench_start", f"🏁 每种记录构造 {args.count} 条", count=args.count)
+
+    rows = []
+    for name, (build_dict, build_record) in CASES.items():
+        with profiling.profile_stage(name):
+            dict_bytes = measure(build_dict, values)
+            record_bytes = measure(build_record, values)
+        rows.append({"record": name, "dict_bytes": round(dict_bytes), "slots_bytes": round(record_bytes),
+                     "saved": f"{(1 - record_bytes / dict_bytes) * 100:.0f}%",
+                     "saved_mb": round((dict_bytes - record_bytes) * args.count / 1024 / 1024, 1)})
+
+    timing = roundtrip_us(values[:20000])
+    events.info("bench_done", f"\n📊 每条记录占用的内存（字节，不含字段字符串）:\n{format_table(rows)}\n"
+                f"\n⏱️ 笔记JSON序列化+解析: 字典 {timing['dict_us']} 微秒/条，记录 {timing['record_us']} 微秒/条",
+                rows=rows, **timing)
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
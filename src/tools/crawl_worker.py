@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+多进程抓取工具
+把URL列表放入归档根目录下的共享队列，再在一台或多台主机（共享同一NFS归档目录）上启动任意数量的worker
+协同抓取。worker以租约方式领取条目并定期续租，崩溃的worker持有的条目在租约过期后自动重新分配
+"""
+
+import sys
+import os
+import threading
+import time
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from config.settings import CRAWL_QUEUE_CONFIG
+from src.core.analytics import format_table
+from src.core.crawl_queue import CrawlQueue, worker_id
+from src.tools.get_xhs_content import extract_xhs_content, save_xhs_content
+from src.utils import events, profiling
+from src.utils.bandwidth import install_reload_signal
+
+
+def process_url(url, args):
+    """
+    抓取并保存单个链接
+
+    Args:
+        url: 小红书链接
+        args: 命令行参数
+
+    Returns:
+        str: 保存目录
+
+    Raises:
+        RuntimeError: 提取或保存失败
+    """
+    record = extract_xhs_content(url, args.root)
+    if record.error:
+        raise RuntimeError(record.error)
+    save_dir = save_xhs_content(record, args.account, not args.no_download, args.preflight, args.root)
+    if save_dir is None:
+        raise RuntimeError("保存失败")
+    return str(save_dir)
+
+
+def run_worker(args) -> dict:
+    """
+    worker主循环：租用条目、处理、标记结果，直到队列中没有待处理和处理中的条目
+
+    Args:
+        args: 命令行参数
+
+    Returns:
+        dict: 本worker完成、失败的条目数和耗时
+    """
+    queue = CrawlQueue(args.root, args.queue)
+    wid = worker_id()
+    held = set()
+    held_lock = threading.Lock()
+    stop = threading.Event()
+
+    def heartbeat():
+        # 定期为正在处理的条目续租，处理耗时超过租约时长也不会被其他worker抢走
+        while not stop.wait(CRAWL_QUEUE_CONFIG["heartbeat_interval"]):
+            with held_lock:
+                urls = list(held)
+            if urls:
+                queue.renew(wid, urls)
+
+    threading.Thread(target=heartbeat, name="lease-heartbeat", daemon=True).start()
+    counts = {"worker": wid, "done": 0, "failed": 0}
+    started = time.perf_counter()
+    try:
+        while True:
+            urls = queue.lease(wid, args.batch)
+            if not urls:
+                stats = queue.stats()
+                if not (stats["pending"] or stats["leased"] or stats["expired"]):
+                    break
+                # 其他worker仍在处理，等待它们完成或租约过期
+                time.sleep(CRAWL_QUEUE_CONFIG["poll_interval"])
+                continue
+
+            with held_lock:
+                held.update(urls)
+            for url in urls:
+                try:
+                    with profiling.profile_item():
+                        save_dir = process_url(url, args)
+                    queue.complete(wid, url, save_dir)
+                    counts["done"] += 1
+                    events.info("item_done", f"✅ [{wid}] {url}", url=url, worker=wid, path=save_dir)
+                except Exception as e:
+                    queue.fail(wid, url, str(e))
+                    counts["failed"] += 1
+                    events.warning("item_failed", f"❌ [{wid}] {url}: {e}", url=url, worker=wid, error=str(e))
+                finally:
+                    with held_lock:
+                        held.discard(url)
+    finally:
+        stop.set()
+
+    counts["elapsed"] = round(time.perf_counter() - started, 2)
+    events.info("worker_done", f"🏁 worker {wid} 完成 {counts['done']} 条，失败 {counts['failed']} 条，"
+                f"用时 {counts['elapsed']} 秒", **counts)
+    return counts
+
+
+def _worker_process(args, index):
+    """子进程入口：重新配置事件输出和性能分析后运行worker"""
+    events.configure_from_args(args)
+    if args.profile:
+        args.profile = os.path.join(args.profile, f"worker-{index}")
+        profiling.start_profiling_from_args(args)
+    run_worker(args)
+    events.flush()
+
+
+def main():
+    """主函数"""
+    import argparse
+    import multiprocessing
+
+    parser = argparse.ArgumentParser(description='多进程抓取工具')
+    parser.add_argument('--root', default='文案生成', help='归档根目录（队列状态也保存在这里），默认为文案生成')
+    parser.add_argument('--queue', default='default', help='队列名称，默认为default')
+    events.add_event_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    add = subparsers.add_parser('add', help='向队列添加链接')
+    add.add_argument('files', nargs='+', help='链接列表文件（每行一个，#开头为注释），-表示标准输入')
+
+    work = subparsers.add_parser('work', help='启动worker消费队列')
+    work.add_argument('--processes', '-p', type=int, default=1, help='本机启动的worker进程数，默认1')
+    work.add_argument('--batch', type=int, default=CRAWL_QUEUE_CONFIG["batch_size"], help='每次租用的条目数')
+    work.add_argument('--account', '-a', default='AI知识账号', help='账号名称，默认为AI知识账号')
+    work.add_argument('--no-download', action='store_true', help='不下载图片，仅提取内容')
+    work.add_argument('--preflight', action='store_true', default=None,
+                      help='下载前预检图片类型、大小并按ETag去重')
+
+    status = subparsers.add_parser('status', help='查看队列状态')
+    status.add_argument('--list', choices=['pending', 'leased', 'done', 'failed'], help='列出指定状态的条目')
+
+    subparsers.add_parser('retry-failed', help='把失败的条目重新放回队列')
+
+    args = parser.parse_args()
+    events.configure_from_args(args)
+    queue = CrawlQueue(args.root, args.queue)
+
+    if args.command == 'add':
+        urls = []
+        for name in args.files:
+            with (sys.stdin if name == '-' else open(name, 'r', encoding='utf-8')) as f:
+                urls.extend(line.strip() for line in f if line.strip() and not line.startswith('#'))
+        added = queue.add(urls)
+        events.info("queued", f"📥 新增 {added} 条，忽略重复 {len(urls) - added} 条", added=added, total=len(urls))
+        return 0
+
+    if args.command == 'status':
+        if args.list:
+            rows = [{"url": item["url"], "worker": item.get("worker", ""), "attempts": item["attempts"],
+                     "info": item.get("error") or item.get("result") or ""} for item in queue.items(args.list)]
+            events.debug("queue_items", rows=len(rows))
+        else:
+            stats = queue.stats()
+            rows = [stats]
+            events.debug("queue_status", **stats)
+        # 状态表是命令的输出，直接写到标准输出，不受 --quiet / --json-log 影响
+        events.flush()
+        print(format_table(rows))
+        return 0
+
+    if args.command == 'retry-failed':
+        count = queue.retry_failed()
+        events.info("requeued", f"🔁 重新放回 {count} 条", count=count)
+        return 0
+
+    install_reload_signal()
+    started = time.perf_counter()
+    if args.processes <= 1:
+        profiling.start_profiling_from_args(args)
+        run_worker(args)
+    else:
+        # 使用spawn启动子进程，避免fork继承事件输出线程等状态
+        context = multiprocessing.get_context("spawn")
+        workers = [context.Process(target=_worker_process, args=(args, i), name=f"crawl-worker-{i}")
+                   for i in range(args.processes)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+    stats = queue.stats()
+    elapsed = time.perf_counter() - started
+    events.info("fleet_done", f"\n📊 队列状态（用时 {elapsed:.1f} 秒）:\n{format_table([stats])}",
+                elapsed=round(elapsed, 2), **stats)
+    return 0 if not stats["failed"] else 1
+
+if __name__ == "__main__":
+    exit(main())
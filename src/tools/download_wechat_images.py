@@ -6,8 +6,19 @@
 import requests
 from bs4 import BeautifulSoup
 import os
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urljoin
 import re
+import sys
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.tools.get_wechat_article import WECHAT_PAGE_BLOCKS, wechat_image_extension
+from src.utils import events, profiling
+from src.utils.download_images_from_urls import download_file
+from src.utils.page_fetch import fetch_page
+from src.utils.url_canonical import dedupe_image_urls
 
 def download_wechat_images(url, output_dir='docs'):
     """
@@ -27,82 +38,83 @@ def download_wechat_images(url, output_dir='docs'):
     
     try:
         # 获取文章页面
-        print(f'正在获取文章页面: {url}')
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
+        events.info('page_fetch', f'正在获取文章页面: {url}', url=url)
+        with profiling.profile_stage('fetch'):
+            # 正文容器到齐后停止读取（其后的图片是页脚二维码等，不需要下载）
+            page = fetch_page(url, WECHAT_PAGE_BLOCKS, headers=headers, timeout=30)
         
-        soup = BeautifulSoup(response.content, 'html.parser')
+        with profiling.profile_stage('parse'):
+            soup = BeautifulSoup(page.content, 'html.parser')
         
         # 查找所有图片
         images = soup.find_all('img')
-        print(f'找到 {len(images)} 张图片')
+        events.info('images_found', f'找到 {len(images)} 张图片', count=len(images))
+        
+        # 优先使用data-src（懒加载的真实图片），src往往只是占位图
+        image_urls = []
+        for img in images:
+            img_url = img.get('data-src') or img.get('src')
+            if img_url and not img_url.startswith('data:'):
+                # 处理相对路径
+                image_urls.append(urljoin(url, img_url))
+        
+        # 规范化为原图URL并去重，同一张图片只下载一次
+        image_urls = dedupe_image_urls(image_urls, platform="wechat")
+        events.info('images_deduped', f'去重后共 {len(image_urls)} 张图片', count=len(image_urls))
         
         downloaded_count = 0
         
         # 下载图片
-        for i, img in enumerate(images):
-            img_url = img.get('src') or img.get('data-src')
-            if img_url:
-                # 处理相对路径
-                img_url = urljoin(url, img_url)
-                
-                # 获取图片扩展名
-                parsed_url = urlparse(img_url)
-                ext = os.path.splitext(parsed_url.path)[1]
-                if not ext or len(ext) > 5:  # 如果扩展名不存在或过长，默认为.jpg
-                    ext = '.jpg'
-                
-                # 生成文件名
-                filename = f'wechat_article_image_{i+1}{ext}'
-                filepath = os.path.join(output_dir, filename)
-                
-                try:
-                    # 下载图片
-                    img_response = requests.get(img_url, headers=headers, timeout=30)
-                    img_response.raise_for_status()
-                    
-                    # 保存图片
-                    with open(filepath, 'wb') as f:
-                        f.write(img_response.content)
+        with events.progress(len(image_urls), '下载') as progress:
+            for i, img_url in enumerate(image_urls):
+                if img_url:
+                    # 生成文件名（微信图片的格式在wx_fmt参数中）
+                    filename = f'wechat_article_image_{i+1}.{wechat_image_extension(img_url)}'
+                    filepath = os.path.join(output_dir, filename)
                     
-                    file_size = len(img_response.content)
-                    print(f'已下载: {filename} ({file_size} bytes)')
-                    downloaded_count += 1
-                    
-                except Exception as e:
-                    print(f'下载失败 {filename}: {e}')
+                    # 流式写入文件，不在内存中缓存整张图片（批量模式下按采样比例分析）
+                    with profiling.profile_item(), profiling.profile_stage('download_file'):
+                        downloaded = download_file(img_url, Path(filepath), timeout=30, headers=headers)
+                    if downloaded:
+                        downloaded_count += 1
+                
+                progress.advance()
         
-        print(f'\n下载完成！成功下载 {downloaded_count} 张图片到 {output_dir} 目录')
+        events.info('batch_done', f'\n下载完成！成功下载 {downloaded_count} 张图片到 {output_dir} 目录',
+                    success=downloaded_count, total=len(image_urls), output_dir=output_dir)
         
         # 列出下载的图片文件
         image_files = [f for f in os.listdir(output_dir) if f.startswith('wechat_article_image_')]
         if image_files:
-            print('\n下载的图片文件:')
-            for img_file in sorted(image_files):
-                print(f'  - {img_file}')
+            events.debug('files_listed', '\n下载的图片文件:\n' + '\n'.join(f'  - {f}' for f in sorted(image_files)))
         
         return downloaded_count
         
     except requests.RequestException as e:
-        print(f'获取页面失败: {e}')
+        events.error('page_failed', f'获取页面失败: {e}', url=url, error=str(e))
         return 0
     except Exception as e:
-        print(f'发生错误: {e}')
+        events.error('unexpected_error', f'发生错误: {e}', url=url, error=str(e))
         return 0
 
 if __name__ == '__main__':
-    # 微信公众号文章URL
-    wechat_url = '替换为实际的微信公众号文章URL'
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='微信公众号图片下载工具')
+    parser.add_argument('url', nargs='?', default='替换为实际的微信公众号文章URL', help='微信公众号文章URL')
+    parser.add_argument('--output', '-o', default='docs', help='输出目录，默认为docs')
+    events.add_event_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    args = parser.parse_args()
+    events.configure_from_args(args)
+    profiling.start_profiling_from_args(args)
     
-    print('=== 微信公众号图片下载工具 ===')
-    print(f'目标URL: {wechat_url}')
-    print(f'输出目录: docs')
-    print('=' * 40)
+    events.info('start', f'=== 微信公众号图片下载工具 ===\n目标URL: {args.url}\n输出目录: {args.output}\n' + '=' * 40)
     
     # 下载图片
-    count = download_wechat_images(wechat_url, 'docs')
+    count = download_wechat_images(args.url, args.output)
     
     if count > 0:
-        print(f'\n✅ 成功下载 {count} 张图片！')
+        events.info('done', f'\n✅ 成功下载 {count} 张图片！', count=count)
     else:
-        print('\n❌ 未能下载任何图片')
\ No newline at end of file
+        events.error('done', '\n❌ 未能下载任何图片', count=0)
@@ -5,112 +5,317 @@ import requests
 from bs4 import BeautifulSoup
 import re
 import os
-from urllib.parse import urljoin
+import sys
+import json
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urljoin, urlparse, parse_qs, parse_qsl, urlencode
 
-def get_wechat_article(url, output_dir="."):
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.core.content_manager import ContentManager, clean_name
+from src.core.records import ArticleRecord
+from src.core.snapshot_store import snapshot_page
+from src.utils import events, profiling
+from src.utils.page_fetch import PageBlock, fetch_page
+from src.utils.url_canonical import dedupe_image_urls
+
+# 解析需要的页面区块：<head>中的og元信息，以及正文容器 #js_content（标题在它之前）
+WECHAT_PAGE_BLOCKS = (
+    PageBlock("head", end=rb"</head\s*>"),
+    PageBlock("js_content", start=rb"<div[^>]*\bid=[\"']js_content[\"']", tag="div"),
+)
+
+# 请求头
+WECHAT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
+    "Accept-Language": "zh-CN,zh;q=0.8,zh-TW;q=0.7,zh-HK;q=0.5,en-US;q=0.3,en;q=0.2",
+}
+
+# 文章保存的平台目录（位于归档根目录下）
+WECHAT_PLATFORM_DIR = "微信公众号帖子"
+
+# 长链接中标识文章的参数
+_ARTICLE_PARAMS = ("__biz", "mid", "idx", "sn")
+
+
+def canonicalize_article_url(url):
+    """
+    规范化文章URL：短链接 /s/<ID> 去掉参数，长链接只保留标识文章的参数（去掉 chksm、scene 和 #rd 等）
+    
+    Args:
+        url: 文章URL
+    
+    Returns:
+        str: 规范化后的URL
+    """
+    parsed = urlparse(url.strip())
+    if parsed.path.startswith('/s/'):
+        return f"{parsed.scheme}://{parsed.netloc}{parsed.path}"
+    # 参数值解码后重新编码，__biz 中的 +、/、= 等字符保持原义
+    query = {}
+    for name, value in parse_qsl(parsed.query, keep_blank_values=True):
+        query.setdefault(name, value)
+    kept = [(name, query[name]) for name in _ARTICLE_PARAMS if name in query]
+    return f"{parsed.scheme}://{parsed.netloc}{parsed.path}?{urlencode(kept)}" if kept else url.strip()
+
+
+def extract_article_id(url):
+    """
+    从文章URL中提取文章ID（短链接取 /s/ 后的部分，长链接取 __biz_mid_idx）
+    
+    Args:
+        url: 文章URL
+    
+    Returns:
+        str: 文章ID，无法识别时返回空字符串
+    """
+    parsed = urlparse(url)
+    if parsed.path.startswith('/s/'):
+        return parsed.path[3:].strip('/')
+    query = parse_qs(parsed.query)
+    if all(name in query for name in ("__biz", "mid", "idx")):
+        return "_".join(query[name][0] for name in ("__biz", "mid", "idx"))
+    return query.get("sn", [""])[0]
+
+
+def wechat_image_extension(url):
+    """微信图片的扩展名（格式在wx_fmt参数中），无法判断时为jpg"""
+    parsed_url = urlparse(url)
+    wx_fmt = parse_qs(parsed_url.query).get('wx_fmt', [''])[0]
+    ext = wx_fmt or os.path.splitext(parsed_url.path)[1].lstrip('.')
+    # 扩展名不存在或过长时默认为jpg
+    return ext if ext and len(ext) <= 4 else 'jpg'
+
+def parse_wechat_html(html, url):
+    """
+    解析微信公众号文章页面（不访问网络，也用于在快照上重新提取）
+    
+    Args:
+        html: 页面HTML
+        url: 文章URL（用于补全相对图片路径）
+    
+    Returns:
+        ArticleRecord: 文章标题、内容和图片URL，未找到正文时返回None
+    """
+    with profiling.profile_stage('parse'):
+        soup = BeautifulSoup(html, 'html.parser')
+    
+    # 获取文章标题
+    title = soup.find('h1', class_='rich_media_title')
+    if title:
+        title_text = title.get_text(strip=True)
+    else:
+        title = soup.find('title')
+        title_text = title.get_text(strip=True) if title else ''
+    
+    # 公众号名称（位于正文之前），没有时使用og作者
+    author = soup.find(id='js_name')
+    if author:
+        author_text = author.get_text(strip=True)
+    else:
+        author = soup.find('meta', attrs={'property': 'og:article:author'})
+        author_text = author.get('content', '').strip() if author else ''
+    
+    # 获取文章内容
+    content_div = soup.find('div', class_='rich_media_content')
+    if not content_div:
+        # 尝试其他可能的class名称
+        content_div = soup.find('div', id='js_content')
+    if not content_div:
+        return None
+    
+    # 提取纯文本内容
+    content_text = content_div.get_text(separator='\n', strip=True)
+    
+    # 提取图片
+    image_urls = []
+    for img in content_div.find_all('img'):
+        # 优先使用data-src（懒加载的真实图片），src往往只是占位图
+        img_url = img.get('data-src') or img.get('src')
+        if img_url and not img_url.startswith('data:'):
+            # 处理相对路径
+            if not img_url.startswith(('http://', 'https://')):
+                img_url = urljoin(url, img_url)
+            image_urls.append(img_url)
+    
+    # 规范化为原图URL并去重
+    image_urls = dedupe_image_urls(image_urls, platform="wechat")
+    
+    return ArticleRecord(
+        title=title_text,
+        content=content_text,
+        image_urls=tuple(image_urls),
+        url=url,
+        article_id=extract_article_id(url),
+        author=author_text,
+        extraction_time=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    )
+
+def fetch_wechat_page(url, archive_root="文案生成", timeout=30):
+    """
+    流式抓取文章页面并保存原始页面快照
+    
+    Args:
+        url: 文章URL
+        archive_root: 归档根目录（原始页面快照保存在这里）
+        timeout: 超时时间（秒）
+    
+    Returns:
+        tuple: (FetchedPage, 快照引用)，快照保存失败时引用为None
+    
+    Raises:
+        requests.RequestException: 请求失败
+    """
+    with profiling.profile_stage('fetch'):
+        # 流式读取，正文容器到齐后停止，不再下载后面的内联脚本
+        page = fetch_page(url, WECHAT_PAGE_BLOCKS, headers=WECHAT_HEADERS, timeout=timeout, encoding='utf-8')
+    if page.truncated:
+        events.warning("page_truncated", f"⚠️ 页面超过 {len(page.content)} 字节，只解析已读取的部分",
+                       url=url, bytes=len(page.content))
+    
+    # 保存原始页面快照，改进解析逻辑后可离线重新提取
+    snapshot = None
+    try:
+        with profiling.profile_stage('snapshot'):
+            snapshot = snapshot_page(page, url, "wechat", archive_root)
+    except OSError as e:
+        events.warning("snapshot_failed", f"⚠️ 保存页面快照失败: {e}", url=url, error=str(e))
+    return page, snapshot
+
+def generate_article_markdown(article):
+    """生成Markdown格式的文章内容（article 为 ArticleRecord）"""
+    lines = [
+        f"# {article.title or '微信公众号文章'}",
+        "",
+        "## 基本信息",
+        f"- **文章ID**: {article.article_id or '未知'}",
+        f"- **公众号**: {article.author or '未知公众号'}",
+        f"- **原文链接**: {article.url}",
+        f"- **提取时间**: {article.extraction_time}",
+        f"- **图片数量**: {len(article.image_urls)}",
+        "",
+        "## 正文",
+        "",
+        article.content,
+        "",
+    ]
+    return "\n".join(lines)
+
+def save_wechat_article(article, account_name=None, archive_root="文案生成", post_dir=None):
+    """
+    把文章保存到归档的 微信公众号帖子/<公众号>/<文章> 目录（不下载图片）
+    
+    Args:
+        article: 提取结果（ArticleRecord）
+        account_name: 账号目录名，默认为文章所属公众号
+        archive_root: 归档根目录
+        post_dir: 已有的文章目录，指定时覆盖其中的文件（重新导入），不再新建目录
+    
+    Returns:
+        Path: 文章目录路径
+    """
+    with profiling.profile_stage('save'):
+        manager = ContentManager(str(Path(archive_root) / WECHAT_PLATFORM_DIR))
+        if post_dir is None:
+            title = article.title or f"公众号文章_{article.article_id or 'unknown'}"
+            # 公众号名称来自页面，和标题一样清理后才能用作目录名
+            account = account_name or clean_name(article.author or "") or "未知公众号"
+            post_dir = manager.create_post_directory(article.article_id, title, account)
+        else:
+            post_dir = Path(post_dir)
+            (post_dir / "downloads").mkdir(exist_ok=True)
+        
+        manager.save_article_info(post_dir, article)
+        # 原始内容与小红书帖子格式一致，统计、离线重新提取和完整性校验都能识别
+        with open(post_dir / "raw_content.json", 'w', encoding='utf-8') as f:
+            json.dump(article.to_dict(), f, ensure_ascii=False, indent=2)
+        with open(post_dir / "content.md", 'w', encoding='utf-8') as f:
+            f.write(generate_article_markdown(article))
+    return post_dir
+
+def get_wechat_article(url, output_dir=".", archive_root="文案生成"):
     """
     获取微信公众号文章内容和图片
     
     Args:
         url: 微信公众号文章URL
         output_dir: 输出目录
+        archive_root: 归档根目录（原始页面快照保存在这里）
     
     Returns:
-        dict: 包含文章标题、内容和图片路径的字典
+        ArticleRecord: 文章标题、内容、图片URL和保存的文件路径，失败时返回None
     """
-    # 设置请求头
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
-        "Accept-Language": "zh-CN,zh;q=0.8,zh-TW;q=0.7,zh-HK;q=0.5,en-US;q=0.3,en;q=0.2",
-    }
-    
     # 创建输出目录
     os.makedirs(output_dir, exist_ok=True)
     
     try:
         # 获取文章内容
-        response = requests.get(url, headers=headers)
-        response.encoding = 'utf-8'
+        page, snapshot = fetch_wechat_page(url, archive_root)
         
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # 获取文章标题
-        title = soup.find('h1', class_='rich_media_title')
-        if title:
-            title_text = title.get_text(strip=True)
-        else:
-            title_text = soup.find('title').get_text(strip=True)
+        article = parse_wechat_html(page.text, url)
+        if not article:
+            events.error("article_not_found", f"❌ 未找到文章内容: {url}", url=url)
+            return None
+        article.snapshot = snapshot
         
-        print(f"文章标题: {title_text}")
+        title_text = article.title
+        content_text = article.content
+        image_urls = article.image_urls
+        events.info("extracted", f"📝 文章标题: {title_text}\n文章内容长度: {len(content_text)} 字符\n"
+                    f"发现 {len(image_urls)} 张图片",
+                    title=title_text, chars=len(content_text), images=len(image_urls))
         
-        # 获取文章内容
-        content_div = soup.find('div', class_='rich_media_content')
-        if not content_div:
-            # 尝试其他可能的class名称
-            content_div = soup.find('div', id='js_content')
+        # 保存内容到文件
+        content_file = os.path.join(output_dir, f"{re.sub(r'[\\/:*?\"<>|]', '_', title_text)}_content.txt")
+        with open(content_file, 'w', encoding='utf-8') as f:
+            f.write(f"标题: {title_text}\n\n")
+            f.write(content_text)
+        article.content_file = content_file
+        events.debug("content_saved", f"💾 文章内容已保存到: {content_file}", path=content_file)
         
-        if content_div:
-            # 提取纯文本内容
-            content_text = content_div.get_text(separator='\n', strip=True)
-            print(f"文章内容长度: {len(content_text)} 字符")
-            
-            # 提取图片
-            images = content_div.find_all('img')
-            image_urls = []
-            
-            for img in images:
-                if 'src' in img.attrs:
-                    img_url = img['src']
-                    # 处理相对路径
-                    if not img_url.startswith(('http://', 'https://')):
-                        img_url = urljoin(url, img_url)
-                    image_urls.append(img_url)
-                # 处理data-src属性
-                elif 'data-src' in img.attrs:
-                    img_url = img['data-src']
-                    if not img_url.startswith(('http://', 'https://')):
-                        img_url = urljoin(url, img_url)
-                    image_urls.append(img_url)
-            
-            print(f"发现 {len(image_urls)} 张图片")
+        # 保存图片URL到文件
+        if image_urls:
+            image_url_file = os.path.join(output_dir, f"{re.sub(r'[\\/:*?\"<>|]', '_', title_text)}_images.txt")
+            with open(image_url_file, 'w', encoding='utf-8') as f:
+                for i, img_url in enumerate(image_urls, 1):
+                    f.write(f"图片 {i}: {img_url}\n")
+            article.image_url_file = image_url_file
+            events.debug("image_urls_saved", f"💾 图片URL已保存到: {image_url_file}", path=image_url_file)
             
-            # 保存内容到文件
-            content_file = os.path.join(output_dir, f"{re.sub(r'[\\/:*?\"<>|]', '_', title_text)}_content.txt")
-            with open(content_file, 'w', encoding='utf-8') as f:
-                f.write(f"标题: {title_text}\n\n")
-                f.write(content_text)
-            print(f"文章内容已保存到: {content_file}")
-            
-            # 保存图片URL到文件
-            if image_urls:
-                image_url_file = os.path.join(output_dir, f"{re.sub(r'[\\/:*?\"<>|]', '_', title_text)}_images.txt")
-                with open(image_url_file, 'w', encoding='utf-8') as f:
-                    for i, img_url in enumerate(image_urls, 1):
-                        f.write(f"图片 {i}: {img_url}\n")
-                print(f"图片URL已保存到: {image_url_file}")
-                
-            return {
-                "title": title_text,
-                "content": content_text,
-                "image_urls": image_urls,
-                "content_file": content_file,
-                "image_url_file": image_url_file if image_urls else None
-            }
-        else:
-            print("未找到文章内容")
-            return None
+        return article
             
     except Exception as e:
-        print(f"获取文章失败: {e}")
+        events.error("fetch_failed", f"❌ 获取文章失败: {e}", url=url, error=str(e))
         return None
 
-if __name__ == "__main__":
-    article_url = "https://mp.weixin.qq.com/s/WGFR_Rk037Wlk8cJmWI-vw"
-    output_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "output")
+def main():
+    """主函数"""
+    import argparse
     
-    result = get_wechat_article(article_url, output_dir)
-    if result:
-        print("\n获取文章成功!")
-    else:
-        print("\n获取文章失败")
\ No newline at end of file
+    default_output_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "output")
+    parser = argparse.ArgumentParser(description='微信公众号文章获取工具')
+    parser.add_argument('url', nargs='?', default="https://mp.weixin.qq.com/s/WGFR_Rk037Wlk8cJmWI-vw",
+                        help='微信公众号文章URL')
+    parser.add_argument('--output', '-o', default=default_output_dir, help='输出目录')
+    events.add_event_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    args = parser.parse_args()
+    events.configure_from_args(args)
+    profiling.start_profiling_from_args(args)
+    
+    result = get_wechat_article(args.url, args.output)
+    if not result:
+        return 1
+    
+    # 保存的文件路径是命令的输出，直接写到标准输出
+    events.flush()
+    print(result.content_file)
+    if result.image_url_file:
+        print(result.image_url_file)
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
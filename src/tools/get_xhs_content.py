@@ -18,17 +18,35 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from src.core.content_manager import ContentManager
+from src.core.records import NoteRecord
+from src.core.snapshot_store import snapshot_page
+from src.core.tag_index import get_tag_index
 from src.utils.download_images_from_urls import download_multiple_files
+from src.utils import events
+from src.utils import profiling
+from src.utils.bandwidth import install_reload_signal
+from src.utils.page_fetch import PageBlock, fetch_page
+from src.utils.short_link_resolver import is_short_link, resolve_short_link
+from src.utils.extraction_rules import get_rule_set
+from src.utils.url_canonical import canonicalize_image_url, dedupe_image_urls
  
-def extract_xhs_content(url):
+# 解析需要的页面区块：<head>中的og元信息、标题和关键词，以及页面状态JSON（图片列表）。
+# 页面状态JSON位于正文之后，其后只剩大段内联脚本，读到这里即可停止
+XHS_PAGE_BLOCKS = (
+    PageBlock("head", end=rb"</head\s*>"),
+    PageBlock("state", start=rb"window\.__INITIAL_STATE__\s*=", end=rb"</script\s*>"),
+)
+
+def extract_xhs_content(url, archive_root="文案生成"):
     """
     提取小红书链接内容
     
     Args:
         url: 小红书链接（支持短链接和原始链接）
+        archive_root: 归档根目录（原始页面快照保存在这里）
     
     Returns:
-        dict: 包含标题、内容、图片URL等信息的字典
+        NoteRecord: 提取结果，失败时 error 为错误信息
     """
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -46,24 +64,67 @@ def extract_xhs_content(url):
     }
     
     try:
-        # 处理短链接重定向
-        print(f"正在解析链接: {url}")
-        response = requests.get(url, headers=headers, allow_redirects=True, timeout=30)
-        response.raise_for_status()
+        # 处理短链接重定向（仅跟随响应头，结果缓存到磁盘）
+        events.info("resolve_start", f"正在解析链接: {url}", url=url)
+        with profiling.profile_stage("fetch"):
+            page_url = url
+            if is_short_link(url):
+                page_url = resolve_short_link(url, headers=headers, is_resolved=extract_note_id)
+            
+            # 流式获取页面内容（只请求一次规范链接），需要的区块到齐后停止读取
+            page = fetch_page(page_url, XHS_PAGE_BLOCKS, headers=headers, timeout=30)
         
         # 获取最终重定向的URL
-        final_url = response.url
-        print(f"重定向到: {final_url}")
+        final_url = page.url
+        events.info("resolved", f"重定向到: {final_url}", url=url, final_url=final_url)
+        events.debug("page_fetched", f"📄 读取页面 {len(page.content)} 字节"
+                     f"{'' if page.complete else '（区块已到齐，提前停止）'}",
+                     url=final_url, bytes=len(page.content), complete=page.complete, blocks=page.blocks)
+        if page.truncated:
+            events.warning("page_truncated", f"⚠️ 页面超过 {len(page.content)} 字节，只解析已读取的部分",
+                           url=final_url, bytes=len(page.content))
         
-        # 解析小红书笔记ID
-        note_id = extract_note_id(final_url)
-        if not note_id:
-            return {"error": "无法解析小红书笔记ID"}
+        # 保存原始页面快照，改进提取规则后可离线重新提取
+        snapshot = None
+        try:
+            with profiling.profile_stage("snapshot"):
+                snapshot = snapshot_page(page, url, "xhs", archive_root)
+        except OSError as e:
+            events.warning("snapshot_failed", f"⚠️ 保存页面快照失败: {e}", url=url, error=str(e))
         
-        print(f"解析到笔记ID: {note_id}")
+        record = parse_xhs_html(page.text, final_url, url)
+        if record.error:
+            return record
         
+        events.info("note_id", f"解析到笔记ID: {record.note_id}", note_id=record.note_id)
+        record.snapshot = snapshot
+        return record
+        
+    except requests.RequestException as e:
+        return NoteRecord.failure(f"网络请求失败: {str(e)}")
+    except Exception as e:
+        return NoteRecord.failure(f"解析失败: {str(e)}")
+
+def parse_xhs_html(html, final_url, original_url=None):
+    """
+    解析小红书笔记页面（不访问网络，也用于在快照上重新提取）
+    
+    Args:
+        html: 页面HTML
+        final_url: 重定向后的笔记链接
+        original_url: 原始链接
+    
+    Returns:
+        NoteRecord: 提取结果，失败时 error 为错误信息
+    """
+    # 解析小红书笔记ID
+    note_id = extract_note_id(final_url)
+    if not note_id:
+        return NoteRecord.failure("无法解析小红书笔记ID")
+    
+    with profiling.profile_stage("parse"):
         # 获取页面内容
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = BeautifulSoup(html, 'html.parser')
         
         # 提取标题
         title = extract_title(soup)
@@ -79,25 +140,18 @@ def extract_xhs_content(url):
         
         # 提取作者信息
         author_info = extract_author_info(soup)
-        
-        result = {
-            "note_id": note_id,
-            "title": title,
-            "content": content,
-            "image_urls": image_urls,
-            "tags": tags,
-            "author": author_info,
-            "url": final_url,
-            "original_url": url,
-            "extraction_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
-        
-        return result
-        
-    except requests.RequestException as e:
-        return {"error": f"网络请求失败: {str(e)}"}
-    except Exception as e:
-        return {"error": f"解析失败: {str(e)}"}
+    
+    return NoteRecord(
+        note_id=note_id,
+        title=title,
+        content=content,
+        image_urls=tuple(image_urls),
+        tags=tuple(tags),
+        author=author_info,
+        url=final_url,
+        original_url=original_url or final_url,
+        extraction_time=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    )
 
 def extract_note_id(url):
     """从URL中提取小红书笔记ID"""
@@ -122,49 +176,62 @@ def extract_note_id(url):
     
     return None
 
+def _element_value(element):
+    """取元素的content属性或文本"""
+    return element.get('content') or element.get_text(strip=True)
+
 def extract_title(soup):
     """提取标题"""
-    # 尝试多种选择器
-    selectors = [
-        'meta[property="og:title"]',
-        'title',
-        '.note-title',
-        'h1',
-        '.title'
-    ]
-    
-    for selector in selectors:
-        element = soup.select_one(selector)
-        if element:
-            title = element.get('content') or element.get_text(strip=True)
-            if title and len(title) > 5:
-                return title
-    
-    return "未找到标题"
+    # 按命中率依次尝试配置的选择器
+    title = get_rule_set("xhs", "title").first_match(soup, _element_value)
+    return title or "未找到标题"
 
 def extract_content(soup):
     """提取内容"""
-    # 尝试多种选择器
-    selectors = [
-        '.note-content',
-        '.content',
-        '.desc',
-        'meta[property="og:description"]',
-        'meta[name="description"]',
-        'article'
-    ]
-    
-    for selector in selectors:
-        element = soup.select_one(selector)
-        if element:
-            content = element.get('content') or element.get_text(strip=True)
-            if content and len(content) > 10:
-                # 清理内容
-                content = re.sub(r'\s+', ' ', content)
-                return content.strip()
+    # 按命中率依次尝试配置的选择器
+    content = get_rule_set("xhs", "content").first_match(soup, _element_value)
+    if content:
+        # 清理内容
+        content = re.sub(r'\s+', ' ', content)
+        return content.strip()
     
     return "未找到内容"
 
+def _is_image_url(url):
+    """过滤掉可能不是图片的URL"""
+    url = url.lower()
+    if any(keyword in url for keyword in ['xiaohongshu', 'xhscdn', 'sns-img', 'alicdn', 'cdn']):
+        # 检查是否是图片URL（包含常见图片扩展名或图片关键词）
+        return any(ext in url for ext in ['.jpg', '.jpeg', '.png', '.gif', '.webp', 'image', 'img'])
+    return False
+
+def _element_image_urls(elements, attributes):
+    """从匹配的元素中取图片URL（含背景图片）"""
+    urls = []
+    for img in elements:
+        # 尝试多个属性
+        for attr in attributes:
+            src = img.get(attr)
+            if src and src.startswith(('http://', 'https://', '//')):
+                # 处理相对路径
+                if src.startswith('//'):
+                    src = 'https:' + src
+                urls.append(src)
+                break  # 找到一个有效URL就停止
+        
+        # 检查背景图片
+        style = img.get('style', '')
+        if 'background-image' in style:
+            bg_match = re.search(r'background-image:\s*url\(["\']?(.*?)["\']?\)', style)
+            if bg_match:
+                bg_url = bg_match.group(1)
+                if bg_url.startswith(('http://', 'https://', '//')):
+                    if bg_url.startswith('//'):
+                        bg_url = 'https:' + bg_url
+                    urls.append(bg_url)
+    
+    return [url for url in urls if _is_image_url(canonicalize_image_url(url, "xhs"))]
+
 def extract_image_urls(soup):
     """提取图片URL"""
     image_urls = []
@@ -174,10 +241,6 @@ def extract_image_urls(soup):
     for script in script_tags:
         script_content = script.string
         if script_content and 'imageList' in script_content:
-            # 尝试解析JSON数据
-            import json
-            import re
-            
             # 查找JSON数据
             json_pattern = r'\{"imageList":\[.*?\]\}'
             matches = re.findall(json_pattern, script_content, re.DOTALL)
@@ -193,57 +256,13 @@ def extract_image_urls(soup):
                 except:
                     pass
     
-    # 尝试多种选择器
-    selectors = [
-        'img[src*="xiaohongshu"]',
-        'img[src*="xhscdn"]',
-        'img[src*="sns-img"]',
-        '.note-image img',
-        '.image img',
-        '.content-image img',
-        'img[alt*="小红书"]',
-        'img[data-src*="xiaohongshu"]',
-        'img[data-src*="xhscdn"]',
-        'img[data-src*="sns-img"]',
-        'img',  # 所有图片
-        'div[style*="background-image"]'  # 背景图片
-    ]
+    # 合并所有具体选择器的结果（轮播图中的图片可能分别在 src 和 data-src 中）
+    rule_set = get_rule_set("xhs", "images")
+    image_urls.extend(rule_set.all_matches(
+        soup, lambda elements: _element_image_urls(elements, rule_set.attributes)))
     
-    for selector in selectors:
-        images = soup.select(selector)
-        for img in images:
-            # 尝试多个属性
-            for attr in ['src', 'data-src', 'data-original', 'original', 'url']:
-                src = img.get(attr)
-                if src and src.startswith(('http://', 'https://', '//')):
-                    # 处理相对路径
-                    if src.startswith('//'):
-                        src = 'https:' + src
-                    image_urls.append(src)
-                    break  # 找到一个有效URL就停止
-            
-            # 检查背景图片
-            style = img.get('style', '')
-            if 'background-image' in style:
-                import re
-                bg_match = re.search(r'background-image:\s*url\(["\']?(.*?)["\']?\)', style)
-                if bg_match:
-                    bg_url = bg_match.group(1)
-                    if bg_url.startswith(('http://', 'https://', '//')):
-                        if bg_url.startswith('//'):
-                            bg_url = 'https:' + bg_url
-                        image_urls.append(bg_url)
-    
-    # 去重并过滤无效URL
-    unique_urls = []
-    for url in set(image_urls):
-        # 过滤掉可能不是图片的URL
-        if any(keyword in url.lower() for keyword in ['xiaohongshu', 'xhscdn', 'sns-img', 'alicdn', 'cdn']):
-            # 检查是否是图片URL（包含常见图片扩展名或图片关键词）
-            if any(ext in url.lower() for ext in ['.jpg', '.jpeg', '.png', '.gif', '.webp', 'image', 'img']):
-                unique_urls.append(url)
-    
-    return unique_urls
+    # 规范化为原图URL后去重（保持页面中的顺序），并过滤无效URL
+    return [url for url in dedupe_image_urls(image_urls, platform="xhs") if _is_image_url(url)]
 
 def extract_tags(soup):
     """提取标签"""
@@ -266,127 +285,109 @@ def extract_tags(soup):
 
 def extract_author_info(soup):
     """提取作者信息"""
-    # 尝试提取作者名
-    selectors = [
-        '.author-name',
-        '.user-name',
-        '.nickname',
-        'meta[property="og:article:author"]'
-    ]
-    
-    for selector in selectors:
-        element = soup.select_one(selector)
-        if element:
-            author = element.get('content') or element.get_text(strip=True)
-            if author:
-                return author
-    
-    return "未知作者"
+    # 按命中率依次尝试配置的选择器
+    author = get_rule_set("xhs", "author").first_match(soup, _element_value)
+    return author or "未知作者"
 
-def save_xhs_content(content_data, account_name="AI知识账号", download_images=True):
+def save_xhs_content(record, account_name="AI知识账号", download_images=True, preflight=None,
+                     archive_root="文案生成"):
     """
     保存小红书内容到项目目录
     
     Args:
-        content_data: 提取的内容数据
+        record: 提取结果（NoteRecord）
         account_name: 账号名称
         download_images: 是否下载图片
+        preflight: 下载前是否预检图片，默认读取配置
+        archive_root: 归档根目录
     
     Returns:
         Path: 保存的目录路径
     """
-    if "error" in content_data:
-        print(f"❌ 保存失败: {content_data['error']}")
+    if record.error:
+        events.error("save_failed", f"❌ 保存失败: {record.error}", error=record.error)
         return None
     
-    # 创建内容管理器
-    manager = ContentManager()
-    
-    # 生成帖子标题
-    title = content_data.get('title', f"小红书笔记_{content_data.get('note_id', 'unknown')}")
-    
-    # 创建帖子目录
-    post_dir = manager.create_post_directory(
-        content_data.get('note_id', 'unknown'),
-        title,
-        account_name
-    )
-    
-    print(f"📁 创建目录: {post_dir}")
-    
-    # 准备帖子信息
-    post_info = {
-        "title": title,
-        "post_id": content_data.get('note_id', 'unknown'),
-        "url": content_data.get('url', ''),
-        "original_url": content_data.get('original_url', ''),
-        "author": content_data.get('author', '未知作者'),
-        "publish_time": datetime.now().strftime("%Y-%m-%d_%H:%M:%S"),
-        "tags": content_data.get('tags', []),
-        "description": content_data.get('content', ''),
-        "extraction_time": content_data.get('extraction_time', ''),
-        "image_urls": content_data.get('image_urls', [])
-    }
-    
-    # 保存帖子信息
-    info_path = manager.save_post_info(post_dir, post_info)
-    print(f"💾 保存帖子信息到: {info_path}")
-    
-    # 保存原始内容
-    raw_content_path = post_dir / "raw_content.json"
-    with open(raw_content_path, 'w', encoding='utf-8') as f:
-        json.dump(content_data, f, ensure_ascii=False, indent=2)
-    print(f"📄 保存原始内容到: {raw_content_path}")
-    
-    # 保存为Markdown格式
-    md_content = generate_markdown_content(content_data)
-    md_path = post_dir / "content.md"
-    with open(md_path, 'w', encoding='utf-8') as f:
-        f.write(md_content)
-    print(f"📝 保存Markdown内容到: {md_path}")
+    with profiling.profile_stage("save"):
+        # 创建内容管理器
+        manager = ContentManager(str(Path(archive_root) / "小红书自媒体帖子"))
+        
+        # 生成帖子标题
+        note_id = record.note_id or 'unknown'
+        title = record.title or f"小红书笔记_{note_id}"
+        
+        # 创建帖子目录
+        post_dir = manager.create_post_directory(note_id, title, account_name)
+        
+        events.info("post_dir_created", f"📁 创建目录: {post_dir}", path=str(post_dir))
+        
+        # 保存帖子信息（直接使用提取结果，不再拷贝成另一份字典）
+        info_path = manager.save_post_info(post_dir, record)
+        events.info("file_saved", f"💾 保存帖子信息到: {info_path}", path=str(info_path))
+        
+        # 保存原始内容
+        raw_content_path = post_dir / "raw_content.json"
+        with open(raw_content_path, 'w', encoding='utf-8') as f:
+            json.dump(record.to_dict(), f, ensure_ascii=False, indent=2)
+        events.info("file_saved", f"📄 保存原始内容到: {raw_content_path}", path=str(raw_content_path))
+        
+        # 保存为Markdown格式
+        md_content = generate_markdown_content(record)
+        md_path = post_dir / "content.md"
+        with open(md_path, 'w', encoding='utf-8') as f:
+            f.write(md_content)
+        events.info("file_saved", f"📝 保存Markdown内容到: {md_path}", path=str(md_path))
+        
+        # 更新标签索引（话题研究用）
+        archive_root = manager.base_path.parent
+        get_tag_index(str(archive_root)).add_post(
+            f"{manager.base_path.name}:{note_id}",
+            record.tags,
+            record.extraction_time,
+            title=title,
+            account=account_name,
+            path=str(post_dir.relative_to(archive_root))
+        )
     
     # 下载图片
-    if download_images and content_data.get('image_urls'):
+    if download_images and record.image_urls:
 
-        image_urls = content_data.get('image_urls', [])
+        image_urls = record.image_urls
         if image_urls:
-            print(f"\n📷 开始下载 {len(image_urls)} 张图片...")
+            events.info("images_start", f"\n📷 开始下载 {len(image_urls)} 张图片...", count=len(image_urls))
             downloads_dir = post_dir / "downloads"
-            results = download_multiple_files(image_urls, downloads_dir, "image_{:02d}")
+            with profiling.profile_stage("download"):
+                results = download_multiple_files(image_urls, downloads_dir, "image_{:02d}", preflight=preflight)
             
-            print(f"📊 图片下载完成:")
-            print(f"   成功: {results['success']}/{results['total']}")
-            print(f"   失败: {results['failed']}/{results['total']}")
-            
-            if results['failed_urls']:
-                print("\n❌ 下载失败的URL:")
-                for url in results['failed_urls']:
-                    print(f"  - {url}")
+            if results.failed_urls:
+                events.warning("images_failed",
+                               "\n❌ 下载失败的URL:\n" + "\n".join(f"  - {url}" for url in results.failed_urls),
+                               urls=results.failed_urls)
         else:
-            print("\nℹ️  未发现可下载的图片")
+            events.info("no_images", "\nℹ️  未发现可下载的图片")
     
     return post_dir
 
-def generate_markdown_content(content_data):
-    """生成Markdown格式的内容"""
+def generate_markdown_content(record):
+    """生成Markdown格式的内容（record 为 NoteRecord）"""
     lines = []
     
     # 标题
-    lines.append(f"# {content_data.get('title', '小红书笔记')}")
+    lines.append(f"# {record.title or '小红书笔记'}")
     lines.append("")
     
     # 元信息
     lines.append("## 基本信息")
-    lines.append(f"- **笔记ID**: {content_data.get('note_id', '未知')}")
-    lines.append(f"- **作者**: {content_data.get('author', '未知作者')}")
-    lines.append(f"- **提取时间**: {content_data.get('extraction_time', '未知')}")
-    lines.append(f"- **原始链接**: {content_data.get('original_url', '')}")
-    lines.append(f"- **重定向链接**: {content_data.get('url', '')}")
+    lines.append(f"- **笔记ID**: {record.note_id or '未知'}")
+    lines.append(f"- **作者**: {record.author or '未知作者'}")
+    lines.append(f"- **提取时间**: {record.extraction_time or '未知'}")
+    lines.append(f"- **原始链接**: {record.original_url}")
+    lines.append(f"- **重定向链接**: {record.url}")
     lines.append("")
     
     # 内容
     lines.append("## 内容")
-    content = content_data.get('content', '')
+    content = record.content
     if content:
         lines.append(content)
     else:
@@ -394,14 +395,14 @@ def generate_markdown_content(content_data):
     lines.append("")
     
     # 标签
-    tags = content_data.get('tags', [])
+    tags = record.tags
     if tags:
         lines.append("## 标签")
         lines.append(" ".join([f"#{tag}" for tag in tags]))
         lines.append("")
     
     # 图片信息
-    image_urls = content_data.get('image_urls', [])
+    image_urls = record.image_urls
     if image_urls:
         lines.append("## 图片")
         lines.append(f"共发现 {len(image_urls)} 张图片")
@@ -432,54 +433,72 @@ def main():
     parser.add_argument('--output', '-o', help='输出目录路径')
     parser.add_argument('--no-download', action='store_true',
                        help='不下载图片，仅提取内容')
+    parser.add_argument('--preflight', action='store_true', default=None,
+                       help='下载前预检图片类型、大小并按ETag去重')
+    events.add_event_arguments(parser)
+    profiling.add_profile_arguments(parser)
     
     args = parser.parse_args()
+    events.configure_from_args(args)
+    profiling.start_profiling_from_args(args)
+    
+    # 允许运行期间通过 kill -HUP 重新加载带宽配置
+    install_reload_signal()
     
-    print("=== 小红书内容获取工具 ===")
-    print(f"目标链接: {args.url}")
-    print(f"账号名称: {args.account}")
-    print(f"下载图片: {'否' if args.no_download else '是'}")
-    print("=" * 40)
+    events.info("start",
+                "=== 小红书内容获取工具 ===\n"
+                f"目标链接: {args.url}\n"
+                f"账号名称: {args.account}\n"
+                f"下载图片: {'否' if args.no_download else '是'}\n"
+                + "=" * 40,
+                url=args.url, account=args.account, download_images=not args.no_download)
     
     # 提取内容
-    content_data = extract_xhs_content(args.url)
+    record = extract_xhs_content(args.url)
     
-    if "error" in content_data:
-        print(f"❌ 提取失败: {content_data['error']}")
+    if record.error:
+        events.error("extract_failed", f"❌ 提取失败: {record.error}", error=record.error)
         return 1
     
     # 显示提取结果
-    print("\n✅ 内容提取成功!")
-    print(f"标题: {content_data.get('title', '未知')}")
-    print(f"作者: {content_data.get('author', '未知')}")
-    print(f"笔记ID: {content_data.get('note_id', '未知')}")
-    print(f"内容长度: {len(content_data.get('content', ''))} 字符")
-    print(f"图片数量: {len(content_data.get('image_urls', []))}")
-    print(f"标签数量: {len(content_data.get('tags', []))}")
+    events.info("extracted",
+                "\n✅ 内容提取成功!\n"
+                f"标题: {record.title or '未知'}\n"
+                f"作者: {record.author or '未知'}\n"
+                f"笔记ID: {record.note_id or '未知'}\n"
+                f"内容长度: {len(record.content)} 字符\n"
+                f"图片数量: {len(record.image_urls)}\n"
+                f"标签数量: {len(record.tags)}",
+                note_id=record.note_id, images=len(record.image_urls),
+                tags=len(record.tags))
     
     # 保存内容
-    save_dir = save_xhs_content(content_data, args.account, not args.no_download)
+    save_dir = save_xhs_content(record, args.account, not args.no_download, args.preflight)
     
     if save_dir:
-        print(f"\n🎉 内容已保存到: {save_dir}")
-        print("\n📁 生成的文件:")
-        print(f"  - post_info.json (帖子信息)")
-        print(f"  - raw_content.json (原始数据)")
-        print(f"  - content.md (Markdown格式)")
+        lines = [
+            f"\n🎉 内容已保存到: {save_dir}",
+            "\n📁 生成的文件:",
+            "  - post_info.json (帖子信息)",
+            "  - raw_content.json (原始数据)",
+            "  - content.md (Markdown格式)",
+        ]
         
         # 如果下载了图片，显示图片信息
-        if not args.no_download and content_data.get('image_urls'):
+        if not args.no_download and record.image_urls:
             downloads_dir = save_dir / "downloads"
             if downloads_dir.exists():
                 image_files = list(downloads_dir.glob("*"))
                 if image_files:
-                    print(f"  - downloads/ (图片目录，包含 {len(image_files)} 张图片)")
+                    lines.append(f"  - downloads/ (图片目录，包含 {len(image_files)} 张图片)")
         
         # 显示内容预览
-        content = content_data.get('content', '')
+        content = record.content
         if content:
             preview = content[:200] + "..." if len(content) > 200 else content
-            print(f"\n📝 内容预览: {preview}")
+            lines.append(f"\n📝 内容预览: {preview}")
+        
+        events.info("saved", "\n".join(lines), path=str(save_dir))
     
     return 0
 
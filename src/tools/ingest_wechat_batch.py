@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+公众号文章批量导入工具
+接收一批文章链接（命令行参数、链接列表文件，或本地保存的公众号历史消息页面），
+用有上限的线程池抓取、进程池解析，保存到 文案生成/微信公众号帖子/<公众号>/<文章> 目录；
+所有文章的图片进入同一个下载队列并发下载，不再逐篇等待
+"""
+
+import sys
+import os
+import re
+import html
+import json
+import multiprocessing
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from config.settings import WECHAT_BATCH_CONFIG
+from src.core.analytics import format_table
+from src.core.content_manager import find_raw_files
+from src.core.records import DownloadResult, ImageRef
+from src.tools.get_wechat_article import (WECHAT_PLATFORM_DIR, canonicalize_article_url, extract_article_id,
+                                          fetch_wechat_page, parse_wechat_html, save_wechat_article,
+                                          wechat_image_extension)
+from src.utils import events, profiling
+from src.utils.download_images_from_urls import download_file_with_retry, link_or_copy, record_download_sources
+
+# 文章链接：短链接 /s/<ID> 或带 __biz、mid、idx、sn 参数的长链接
+_ARTICLE_URL = re.compile(r'https?://mp\.weixin\.qq\.com/s[/?][^\s"\'<>\\]+')
+
+
+def load_article_urls(path):
+    """
+    从文件中读取文章链接（每行一条的列表，或保存的历史消息页面HTML/JSON）
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        list: 文件中出现的文章链接（未去重）
+    """
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        text = f.read()
+    # 历史消息页面中的链接常被转义多次（&amp;amp;、JSON中的\/）
+    text = html.unescape(html.unescape(text.replace('\\/', '/')))
+    return _ARTICLE_URL.findall(text)
+
+
+def collect_article_urls(urls, files=()):
+    """
+    合并命令行链接和文件中的链接，规范化后按文章ID去重（保持原有顺序）
+
+    Args:
+        urls: 命令行传入的链接
+        files: 链接列表文件或历史消息页面
+
+    Returns:
+        list: 规范化后的文章链接
+    """
+    found = list(urls)
+    for path in files:
+        found.extend(load_article_urls(path))
+
+    unique = {}
+    for url in found:
+        url = canonicalize_article_url(url)
+        unique.setdefault(extract_article_id(url) or url, url)
+    return list(unique.values())
+
+
+def archived_articles(root):
+    """归档中已保存的公众号文章：文章ID -> 文章目录"""
+    articles = {}
+    for raw_path in find_raw_files(root, WECHAT_PLATFORM_DIR):
+        try:
+            with open(raw_path, 'r', encoding='utf-8') as f:
+                article_id = json.load(f).get("article_id")
+        except (OSError, ValueError):
+            continue
+        if article_id:
+            articles.setdefault(article_id, Path(raw_path).parent)
+    return articles
+
+
+def fetch_article(url, root, parse_pool=None):
+    """
+    抓取并解析单篇文章（在抓取线程中运行）
+
+    Args:
+        url: 文章链接
+        root: 归档根目录
+        parse_pool: 解析进程池，None表示在当前线程中解析
+
+    Returns:
+        ArticleRecord: 提取结果
+
+    Raises:
+        ValueError: 未找到文章内容
+        requests.RequestException: 请求失败
+    """
+    with profiling.profile_item():
+        page, snapshot = fetch_wechat_page(url, root)
+        if parse_pool:
+            article = parse_pool.submit(parse_wechat_html, page.text, url).result()
+        else:
+            article = parse_wechat_html(page.text, url)
+    if not article:
+        raise ValueError("未找到文章内容")
+    article.snapshot = snapshot
+    return article
+
+
+def _download_image(url, filepath):
+    """下载一张图片，成功时返回 ImageRef"""
+    with profiling.profile_item(), profiling.profile_stage("download_file"):
+        if not download_file_with_retry(url, filepath):
+            return None
+    return ImageRef(url, filepath.name, filepath.stat().st_size)
+
+
+class ImageQueue:
+    """所有文章共享的图片下载队列：文章保存后立即加入，边抓取其他文章边下载"""
+
+    def __init__(self, workers):
+        """
+        初始化下载队列
+
+        Args:
+            workers: 下载线程数上限（实际并发仍受域名自适应限制）
+        """
+        self.executor = ThreadPoolExecutor(max(1, workers))
+        self.futures = {}
+        self.first = {}
+        self.duplicates = []
+
+    def add(self, article, post_dir):
+        """
+        把文章的图片加入队列（同一批次中已在队列中的图片只下载一次）
+
+        Args:
+            article: 提取结果（ArticleRecord）
+            post_dir: 文章目录
+
+        Returns:
+            int: 加入的图片数
+        """
+        for i, url in enumerate(article.image_urls, 1):
+            filepath = Path(post_dir) / "downloads" / f"image_{i:02d}.{wechat_image_extension(url)}"
+            if url in self.first:
+                self.duplicates.append((url, filepath))
+                continue
+            self.first[url] = filepath
+            self.futures[self.executor.submit(_download_image, url, filepath)] = url
+        return len(article.image_urls)
+
+    def join(self):
+        """
+        等待队列中的图片全部下载完成，并按目录记录图片来源
+
+        Returns:
+            DownloadResult: 下载结果统计
+        """
+        results = DownloadResult(total=len(self.futures) + len(self.duplicates))
+        downloaded = {}
+        with events.progress(len(self.futures), "下载图片") as progress:
+            for future in as_completed(self.futures):
+                url = self.futures[future]
+                try:
+                    ref = future.result()
+                except Exception as e:
+                    events.warning("download_failed", f"❌ 下载文件失败 {url}: {e}", url=url, error=str(e))
+                    ref = None
+                if ref:
+                    downloaded[url] = ref
+                    results.files.append(ref)
+                progress.advance()
+        self.executor.shutdown()
+
+        refs_by_dir = defaultdict(list)
+        for ref in results.files:
+            refs_by_dir[self.first[ref.url].parent].append(ref)
+        for url, filepath in self.duplicates:
+            if url in downloaded:
+                # 同一批次中重复出现的图片用硬链接复用
+                link_or_copy(self.first[url], filepath)
+                ref = ImageRef(url, filepath.name, downloaded[url].bytes)
+                refs_by_dir[filepath.parent].append(ref)
+                results.files.append(ref)
+        for output_dir, refs in refs_by_dir.items():
+            record_download_sources(output_dir, refs)
+
+        results.success = len(results.files)
+        results.failed_urls = [url for url in self.futures.values() if url not in downloaded]
+        results.failed = results.total - results.success
+        return results
+
+
+def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='公众号文章批量导入工具')
+    parser.add_argument('urls', nargs='*', help='文章链接')
+    parser.add_argument('--file', '-f', action='append', default=[],
+                        help='链接列表文件或本地保存的公众号历史消息页面（可重复指定）')
+    parser.add_argument('--account', help='账号目录名，默认为文章所属公众号')
+    parser.add_argument('--root', default='文案生成', help='归档根目录，默认为文案生成')
+    parser.add_argument('--force', action='store_true', help='重新导入归档中已有的文章')
+    parser.add_argument('--no-download', action='store_true', help='不下载图片')
+    parser.add_argument('--jobs', '-j', type=int, default=WECHAT_BATCH_CONFIG["fetch_workers"],
+                        help=f'抓取线程数，默认为{WECHAT_BATCH_CONFIG["fetch_workers"]}')
+    parser.add_argument('--parse-workers', type=int, default=WECHAT_BATCH_CONFIG["parse_workers"],
+                        help=f'解析进程数，0表示在抓取线程中解析，默认为{WECHAT_BATCH_CONFIG["parse_workers"]}')
+    parser.add_argument('--download-workers', type=int, default=WECHAT_BATCH_CONFIG["download_workers"],
+                        help=f'图片下载线程数，默认为{WECHAT_BATCH_CONFIG["download_workers"]}')
+    events.add_event_arguments(parser)
+    profiling.add_profile_arguments(parser)
+
+    args = parser.parse_args()
+    events.configure_from_args(args)
+    profiling.start_profiling_from_args(args)
+
+    urls = collect_article_urls(args.urls, args.file)
+    counts = {"articles": len(urls), "saved": 0, "failed": 0, "archived": 0}
+    archived = archived_articles(args.root)
+    if not args.force:
+        pending = [url for url in urls if extract_article_id(url) not in archived]
+        counts["archived"] = len(urls) - len(pending)
+        urls = pending
+    if not urls:
+        events.info("batch_empty", f"ℹ️ 没有需要导入的文章（已归档 {counts['archived']} 篇）", **counts)
+        return 0
+    events.info("batch_start", f"📰 共 {len(urls)} 篇文章，{args.jobs} 个抓取线程", articles=len(urls), jobs=args.jobs)
+
+    started = time.perf_counter()
+    images = ImageQueue(args.download_workers)
+    failures = []
+    # 解析进程使用spawn启动，避免fork继承事件输出线程等状态
+    parse_context = (ProcessPoolExecutor(args.parse_workers, mp_context=multiprocessing.get_context("spawn"))
+                     if args.parse_workers > 0 else nullcontext())
+    with parse_context as parse_pool, ThreadPoolExecutor(max(1, min(args.jobs, len(urls)))) as fetchers, \
+            events.progress(len(urls), "抓取文章") as progress:
+        futures = {fetchers.submit(fetch_article, url, args.root, parse_pool): url for url in urls}
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                article = future.result()
+                # --force 时覆盖归档中已有的文章目录，不再新建第二个目录
+                post_dir = save_wechat_article(article, args.account, args.root,
+                                               archived.get(article.article_id))
+            except Exception as e:
+                counts["failed"] += 1
+                failures.append({"url": url, "error": str(e)})
+                events.warning("article_failed", f"❌ {url}: {e}", url=url, error=str(e))
+                progress.advance()
+                continue
+            counts["saved"] += 1
+            queued = 0 if args.no_download else images.add(article, post_dir)
+            events.debug("article_saved", f"💾 {article.title} → {post_dir}（{queued} 张图片加入下载队列）",
+                         url=url, path=str(post_dir), images=queued)
+            progress.advance()
+
+    results = images.join()
+    counts.update(images=results.total, downloaded=results.success, image_failed=results.failed)
+    elapsed = time.perf_counter() - started
+    events.info("batch_done", f"\n📊 批量导入完成（用时 {elapsed:.1f} 秒）:\n{format_table([counts])}",
+                elapsed=round(elapsed, 2), **counts)
+    if failures:
+        events.warning("articles_failed", f"\n❌ 导入失败的文章:\n{format_table(failures)}", failures=failures)
+    if results.failed_urls:
+        events.warning("images_failed",
+                       "\n❌ 下载失败的URL:\n" + "\n".join(f"  - {url}" for url in results.failed_urls),
+                       urls=results.failed_urls)
+    return 0 if not counts["failed"] and not results.failed else 1
+
+if __name__ == "__main__":
+    exit(main())
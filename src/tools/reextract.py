@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+离线重新提取工具
+改进提取规则或解析逻辑后，用当前的解析器在本地页面快照上重新提取归档中的帖子，
+多进程并行解析，不访问网络
+"""
+
+import sys
+import os
+import json
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.core.analytics import format_table
+from src.core.content_manager import ContentManager, find_raw_files
+from src.core.records import ArticleRecord, NoteRecord
+from src.core.snapshot_store import get_snapshot_store
+from src.core.tag_index import get_tag_index
+from src.tools.get_wechat_article import generate_article_markdown, parse_wechat_html
+from src.tools.get_xhs_content import generate_markdown_content, parse_xhs_html
+from src.utils import events, profiling
+
+# 重新提取时更新的字段，其余字段（ID、链接、首次提取时间、快照引用）保持不变
+EXTRACTED_FIELDS = ("title", "content", "image_urls", "tags", "author")
+
+# 帖子信息.md 中的发布时间行，重新生成时保留原值
+_PUBLISH_TIME_LINE = re.compile(r"^- \*\*发布时间\*\*: (.+)$", re.MULTILINE)
+
+
+def parse_snapshot(html, data, platform):
+    """
+    用当前解析器解析快照
+
+    Args:
+        html: 快照页面文本
+        data: 原 raw_content.json 内容
+        platform: 快照平台（xhs / wechat）
+
+    Returns:
+        dict: 解析结果（与 raw_content.json 相同的字段）
+
+    Raises:
+        ValueError: 解析失败
+    """
+    if platform == "wechat":
+        parsed = parse_wechat_html(html, data.get("url", ""))
+        if not parsed:
+            raise ValueError("未找到文章内容")
+        return parsed.to_dict()
+    parsed = parse_xhs_html(html, data.get("url", ""), data.get("original_url"))
+    if parsed.error:
+        raise ValueError(parsed.error)
+    return parsed.to_dict()
+
+
+def read_publish_time(post_dir):
+    """读取帖子信息.md中记录的发布时间，文件不存在或没有该行时返回None"""
+    try:
+        with open(os.path.join(post_dir, "帖子信息.md"), 'r', encoding='utf-8') as f:
+            match = _PUBLISH_TIME_LINE.search(f.read())
+    except OSError:
+        return None
+    return match.group(1).strip() if match else None
+
+
+def reextract_post(raw_path, root, dry_run=False):
+    """
+    在快照上重新提取单篇帖子（在子进程中运行）
+
+    Args:
+        raw_path: raw_content.json 路径
+        root: 归档根目录
+        dry_run: 只比较，不写回
+
+    Returns:
+        dict: 处理结果，status 为 updated / unchanged / skipped
+    """
+    with open(raw_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    snapshot = data.get("snapshot")
+    if not snapshot:
+        return {"path": raw_path, "status": "skipped"}
+
+    platform = snapshot.get("platform") or "xhs"
+    html = get_snapshot_store(root).get_text(snapshot)
+    parsed = parse_snapshot(html, data, platform)
+    changed = [field for field in EXTRACTED_FIELDS if field in parsed and parsed[field] != data.get(field)]
+    if not changed:
+        return {"path": raw_path, "status": "unchanged"}
+
+    if not dry_run:
+        data.update({field: parsed[field] for field in changed})
+        data["reextraction_time"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        tmp_path = f"{raw_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, raw_path)
+        # content.md 和信息文件与 raw_content.json 同步重新生成
+        post_dir = Path(raw_path).parent
+        manager = ContentManager(str(post_dir.parent.parent))
+        if platform == "wechat":
+            record = ArticleRecord.from_dict(data)
+            markdown = generate_article_markdown(record)
+            manager.save_article_info(post_dir, record)
+        else:
+            record = NoteRecord.from_dict(data)
+            markdown = generate_markdown_content(record)
+            manager.save_post_info(post_dir, record, read_publish_time(post_dir) or data.get("extraction_time"))
+        with open(post_dir / "content.md", 'w', encoding='utf-8') as f:
+            f.write(markdown)
+
+    return {"path": raw_path, "status": "updated", "changed": changed, "tags": data.get("tags", []),
+            "title": data.get("title", ""), "extraction_time": data.get("extraction_time"),
+            "post_id": data.get("note_id") or data.get("article_id") or ""}
+
+
+def update_tag_index(root, result):
+    """把重新提取后的标签写入标签索引"""
+    post_dir = Path(result["path"]).parent
+    rel_dir = post_dir.relative_to(root)
+    platform, account = rel_dir.parts[:2]
+    get_tag_index(root).add_post(
+        f"{platform}:{result['post_id'] or rel_dir}",
+        result["tags"],
+        result["extraction_time"],
+        title=result["title"],
+        account=account,
+        path=str(rel_dir)
+    )
+
+
+def main():
+    """主函数"""
+    import argparse
+    import multiprocessing
+
+    parser = argparse.ArgumentParser(description='离线重新提取工具（基于本地页面快照）')
+    parser.add_argument('--root', default='文案生成', help='归档根目录，默认为文案生成')
+    parser.add_argument('--platform', help='只处理指定平台目录，如 小红书自媒体帖子')
+    parser.add_argument('--jobs', '-j', type=int, default=os.cpu_count(), help='解析进程数，默认为CPU核数')
+    parser.add_argument('--dry-run', action='store_true', help='只列出会变化的帖子，不写回')
+    events.add_event_arguments(parser)
+    profiling.add_profile_arguments(parser)
+
+    args = parser.parse_args()
+    events.configure_from_args(args)
+    profiling.start_profiling_from_args(args)
+
+    started = time.perf_counter()
+    with profiling.profile_stage("scan"):
+        raw_files = find_raw_files(args.root, args.platform)
+    events.info("reextract_start", f"🔁 共 {len(raw_files)} 篇帖子，使用 {args.jobs} 个进程重新提取",
+                posts=len(raw_files), jobs=args.jobs)
+
+    # 使用spawn启动子进程，避免fork继承事件输出线程等状态
+    counts = {"updated": 0, "unchanged": 0, "skipped": 0, "failed": 0}
+    with events.progress(len(raw_files), "重新提取") as progress, ProcessPoolExecutor(
+            args.jobs, mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = {executor.submit(reextract_post, path, args.root, args.dry_run): path for path in raw_files}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                counts["failed"] += 1
+                events.warning("reextract_failed", f"❌ {path}: {e}", path=path, error=str(e))
+                progress.advance()
+                continue
+            counts[result["status"]] += 1
+            if result["status"] == "updated":
+                events.debug("reextracted", f"✏️ {path}: {', '.join(result['changed'])}",
+                             path=path, changed=result["changed"])
+                if not args.dry_run and {"tags", "title"} & set(result["changed"]):
+                    update_tag_index(args.root, result)
+            progress.advance()
+
+    elapsed = time.perf_counter() - started
+    action = "将更新" if args.dry_run else "已更新"
+    events.info("reextract_done", f"\n📊 重新提取完成（用时 {elapsed:.1f} 秒，{action} {counts['updated']} 篇）:\n"
+                f"{format_table([counts])}", elapsed=round(elapsed, 2), dry_run=args.dry_run, **counts)
+    return 0 if not counts["failed"] else 1
+
+if __name__ == "__main__":
+    exit(main())
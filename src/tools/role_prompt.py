@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+角色Prompt工具
+列出角色和SOP，并基于角色设定渲染创作Prompt
+"""
+
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.core.role_library import get_role_library
+from src.utils import events, profiling
+
+
+def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='角色Prompt工具')
+    events.add_event_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('list', help='列出所有角色和SOP')
+    show = subparsers.add_parser('show', help='查看角色的结构化设定')
+    show.add_argument('role', help='角色名（支持部分匹配）')
+    render = subparsers.add_parser('render', help='渲染创作Prompt')
+    render.add_argument('role', help='角色名（支持部分匹配）')
+    render.add_argument('task', nargs='?', default='', help='本次创作任务')
+    render.add_argument('--sop', help='SOP名称（支持部分匹配）')
+    render.add_argument('--step', help='SOP步骤标题，其提示词会追加到任务中')
+
+    args = parser.parse_args()
+    events.configure_from_args(args)
+    profiling.start_profiling_from_args(args)
+
+    library = get_role_library()
+    try:
+        if args.command == 'list':
+            lines = ["📚 角色:"] + [f"  - {name} ({role.title})" for name, role in sorted(library.roles.items())]
+            lines.append("📋 SOP:")
+            for name, sop in sorted(library.sops.items()):
+                lines.append(f"  - {name}")
+                lines.extend(f"      · {title}" for title in sop.prompts)
+            output = "\n".join(lines)
+            events.debug("listed", roles=len(library.roles), sops=len(library.sops))
+        elif args.command == 'show':
+            role = library.get_role(args.role)
+            output = "\n".join([
+                f"# {role.title}",
+                f"\n## 核心身份\n{role.identity}",
+                "\n## 技能\n" + "\n".join(f"- {s}" for s in role.skills),
+                "\n## 内容规则\n" + "\n".join(f"- {r}" for r in role.style_rules),
+                f"\n## 人物形象\n{role.image}",
+            ])
+            events.debug("role", role=role.name)
+        else:
+            with profiling.profile_stage("render"):
+                output = library.render(args.role, args.task, args.sop, args.step)
+            events.debug("prompt", role=args.role, chars=len(output))
+    except KeyError as e:
+        events.error("not_found", f"❌ {e.args[0]}")
+        return 1
+
+    # 列表、设定和渲染出的Prompt是命令的输出（常用管道传给其他程序），直接写到标准输出
+    events.flush()
+    print(output)
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+话题研究工具
+基于标签索引查询本周上升的标签、与某标签共现的标签以及包含某标签的帖子
+"""
+
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.core.analytics import export_rows, format_table
+from src.core.tag_index import TagIndex
+from src.utils import events, profiling
+
+
+def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='话题研究工具')
+    parser.add_argument('--root', default='文案生成', help='归档根目录，默认为文案生成')
+    parser.add_argument('--top', type=int, default=20, help='只显示前N项，默认20')
+    parser.add_argument('--output', '-o', help='导出文件路径（.csv 或 .json）')
+    events.add_event_arguments(parser)
+    profiling.add_profile_arguments(parser)
+
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    rising = subparsers.add_parser('rising', help='本周上升最快的标签')
+    rising.add_argument('--week', help='ISO周，如 2025-W43，默认为本周')
+    rising.add_argument('--min-posts', type=int, default=2, help='本周至少出现的帖子数，默认2')
+    cooccur = subparsers.add_parser('cooccur', help='与某标签共同出现的标签')
+    cooccur.add_argument('tag', help='标签，如 #DeepSeek')
+    posts = subparsers.add_parser('posts', help='包含某标签的帖子')
+    posts.add_argument('tag', help='标签，如 #DeepSeek')
+    subparsers.add_parser('rebuild', help='从归档重建标签索引')
+
+    args = parser.parse_args()
+    events.configure_from_args(args)
+    profiling.start_profiling_from_args(args)
+
+    index = TagIndex(args.root)
+    if args.command == 'rebuild':
+        with profiling.profile_stage("rebuild"):
+            count = index.rebuild()
+        events.info("rebuilt", f"🔄 标签索引已重建，共 {count} 篇帖子", posts=count)
+        return 0
+
+    if args.command == 'rising':
+        rows = index.rising_tags(args.week, args.top, args.min_posts)
+    elif args.command == 'cooccur':
+        rows = index.cooccurring(args.tag, args.top)
+    else:
+        rows = [{"post": r["post"], "title": r.get("title", ""), "account": r.get("account", ""),
+                 "week": r.get("week", "")} for r in index.posts_for(args.tag)[:args.top]]
+
+    if args.output:
+        fmt = 'json' if args.output.endswith('.json') else 'csv'
+        path = export_rows(rows, args.output, fmt)
+        events.info("exported", f"💾 结果已导出到: {path}", path=str(path), rows=len(rows))
+    else:
+        # 查询结果是命令的输出，直接写到标准输出，不受 --quiet / --json-log 影响
+        events.debug("result", command=args.command, rows=len(rows))
+        events.flush()
+        print(format_table(rows))
+
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
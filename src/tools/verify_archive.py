@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+归档完整性校验工具
+多进程校验 文案生成 目录下已下载的图片（文件头、结束标记、下载时记录的大小），
+只读取自上次校验以来有变化的文件；损坏或缺失的文件写入修复队列，可按来源URL定向重新下载
+"""
+
+import sys
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from config.settings import INTEGRITY_CONFIG
+from src.core.analytics import format_table
+from src.core.integrity import ArchiveVerifier
+from src.core.records import ImageRef
+from src.utils import events, profiling
+from src.utils.download_images_from_urls import download_file, record_download_sources
+
+
+def run_check(verifier, args):
+    """
+    校验归档并输出损坏文件
+
+    Args:
+        verifier: 校验器
+        args: 命令行参数
+
+    Returns:
+        dict: 校验统计
+    """
+    started = time.perf_counter()
+    with events.progress(0, "校验") as progress, profiling.profile_stage("verify"):
+        def on_progress(items, total):
+            # 扫描完成后才知道需要读取的文件数
+            progress.total = total
+            progress.advance(items)
+
+        stats = verifier.verify(args.jobs, args.full, on_progress)
+    elapsed = time.perf_counter() - started
+
+    # 校验报告是命令的输出，直接写到标准输出，不受 --quiet / --json-log 影响；事件只保留结构化字段
+    events.debug("verify_done", elapsed=round(elapsed, 2), **stats)
+    broken = verifier.repair_queue()
+    if broken:
+        events.debug("broken_files", count=len(broken), path=str(verifier.repair_file))
+    events.flush()
+    print(f"\n📊 校验完成（用时 {elapsed:.1f} 秒，读取 {stats['bytes_hashed'] / 1024 / 1024:.1f} MB）:\n"
+          f"{format_table([stats])}")
+    if broken:
+        rows = [{"path": item["path"], "problem": item["problem"], "url": item["url"] or "（未知）"}
+                for item in broken]
+        print(f"\n❌ 损坏或缺失的文件（已写入 {verifier.repair_file}）:\n{format_table(rows)}")
+    return stats
+
+
+def run_repair(verifier, args):
+    """
+    按修复队列重新下载损坏或缺失的文件，然后重新校验
+
+    Args:
+        verifier: 校验器
+        args: 命令行参数
+
+    Returns:
+        dict: 重新下载成功、失败和无来源URL的文件数
+    """
+    queue = verifier.repair_queue()
+    counts = {"repaired": 0, "failed": 0, "no_source": 0}
+    items = [item for item in queue if item["url"]]
+    counts["no_source"] = len(queue) - len(items)
+
+    def repair_one(item):
+        filepath = verifier.root / item["path"]
+        with profiling.profile_item(), profiling.profile_stage("download_file"):
+            if not download_file(item["url"], filepath):
+                return False
+        record_download_sources(filepath.parent, [ImageRef(item["url"], filepath.name, filepath.stat().st_size)])
+        return True
+
+    if items:
+        events.info("repair_start", f"🔧 重新下载 {len(items)} 个文件", count=len(items))
+        workers = max(1, min(len(items), INTEGRITY_CONFIG["repair_workers"]))
+        with events.progress(len(items), "重新下载") as progress, ThreadPoolExecutor(workers) as executor:
+            futures = {executor.submit(repair_one, item): item for item in items}
+            for future in as_completed(futures):
+                item = futures[future]
+                if future.result():
+                    counts["repaired"] += 1
+                    events.debug("repaired", f"✅ {item['path']}", path=item["path"], url=item["url"])
+                else:
+                    counts["failed"] += 1
+                progress.advance()
+
+    events.debug("repair_done", **counts)
+    events.flush()
+    print(f"\n📊 重新下载完成:\n{format_table([counts])}")
+    # 重新下载的文件修改时间已变化，增量校验只会读取这些文件
+    run_check(verifier, args)
+    return counts
+
+
+def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='归档完整性校验工具')
+    parser.add_argument('command', nargs='?', choices=['check', 'repair'], default='check',
+                        help='check: 增量校验并生成修复队列（默认）；repair: 重新下载修复队列中的文件')
+    parser.add_argument('--root', default='文案生成', help='归档根目录，默认为文案生成')
+    parser.add_argument('--jobs', '-j', type=int, default=os.cpu_count(), help='校验进程数，默认为CPU核数')
+    parser.add_argument('--full', action='store_true', help='忽略清单重新读取所有文件（可发现内容静默损坏）')
+    events.add_event_arguments(parser)
+    profiling.add_profile_arguments(parser)
+
+    args = parser.parse_args()
+    events.configure_from_args(args)
+    profiling.start_profiling_from_args(args)
+
+    verifier = ArchiveVerifier(args.root)
+    if args.command == 'repair':
+        counts = run_repair(verifier, args)
+        return 0 if not counts["failed"] and not verifier.repair_queue() else 1
+
+    run_check(verifier, args)
+    return 0 if not verifier.repair_queue() else 1
+
+if __name__ == "__main__":
+    exit(main())
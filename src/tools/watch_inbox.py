@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+收件箱监听工具
+常驻进程监听收件箱（文本文件、目录或本地Unix套接字），收到链接后立即抓取保存。
+HTTP连接池、解析规则、标签索引和各类缓存在进程生命周期内保持温热，省去每次冷启动的开销。
+
+套接字协议（每行一条）：
+    <链接>      加入队列，返回 QUEUED / DUPLICATE
+    STATUS      返回一行JSON格式的运行状态
+    STOP        优雅退出（处理完正在抓取的链接，未处理的链接转存到抓取队列）
+"""
+
+import sys
+import os
+import json
+import queue
+import signal
+import socket
+import socketserver
+import threading
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from config.settings import CRAWL_QUEUE_CONFIG, WATCH_CONFIG
+from src.core.crawl_queue import CrawlQueue, worker_id
+from src.core.tag_index import get_tag_index
+from src.tools.get_xhs_content import extract_xhs_content, save_xhs_content
+from src.utils import events, profiling
+from src.utils.bandwidth import install_reload_signal
+from src.utils.concurrency import get_concurrency_controller
+from src.utils.extraction_rules import load_rules
+from src.utils.http_client import close_session, get_session
+from src.utils.preflight import get_etag_index
+from src.utils.short_link_resolver import get_short_link_cache
+
+
+def _extract_urls(text):
+    """从一段文本中取出链接（运营粘贴的分享文案中常夹带其他文字）"""
+    return [word for word in text.split() if word.startswith(("http://", "https://"))]
+
+
+class InboxDaemon:
+    """收件箱监听守护进程"""
+
+    def __init__(self, args):
+        """
+        初始化守护进程
+
+        Args:
+            args: 命令行参数
+        """
+        self.args = args
+        self.pending = queue.Queue()
+        self.stop_event = threading.Event()
+        self.started = time.time()
+        # 最近收到的链接 -> 收到时间（按时间顺序），超过去重时长或条数上限的最早链接被淘汰
+        self.seen = OrderedDict()
+        self.in_progress = {}
+        self.recent = deque(maxlen=WATCH_CONFIG["recent"])
+        self.counts = {"received": 0, "done": 0, "failed": 0, "duplicate": 0}
+        self._lock = threading.Lock()
+        self._file_offset = 0
+        self.spill_queue = CrawlQueue(args.root, "watch")
+        self.worker = worker_id()
+        self.resumed = set()
+        self._heartbeat_stop = threading.Event()
+
+    def warm_up(self) -> None:
+        """预先加载连接池、解析规则、索引和缓存"""
+        get_session()
+        load_rules("xhs")
+        get_tag_index(self.args.root)
+        get_short_link_cache()
+        get_etag_index()
+        get_concurrency_controller()
+        events.debug("warmed", "🔥 已预热连接池、解析规则、标签索引和缓存")
+
+    def submit(self, url: str, source: str) -> bool:
+        """
+        把链接加入队列（去重时长内已收到过的链接忽略）
+
+        Args:
+            url: 链接
+            source: 来源（file / dir / socket / resume）
+
+        Returns:
+            bool: 是否新加入
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._expire_seen(now)
+            if url in self.seen:
+                self.counts["duplicate"] += 1
+                return False
+            self.seen[url] = now
+            if len(self.seen) > WATCH_CONFIG["dedupe_max"]:
+                self.seen.popitem(last=False)
+            self.counts["received"] += 1
+            if self.stop_event.is_set():
+                # 停止过程中收到的链接直接转存，下次启动时处理
+                self.spill_queue.add([url])
+                return True
+            self.pending.put((url, time.perf_counter()))
+        events.debug("url_received", f"📥 [{source}] {url}", url=url, source=source)
+        return True
+
+    def _expire_seen(self, now: float) -> None:
+        """淘汰超过去重时长的链接（调用方需持有锁），之后再次收到时重新抓取"""
+        cutoff = now - WATCH_CONFIG["dedupe_seconds"]
+        while self.seen:
+            url, received = next(iter(self.seen.items()))
+            if received >= cutoff:
+                break
+            self.seen.popitem(last=False)
+
+    def _heartbeat_loop(self) -> None:
+        """续租线程：为从抓取队列恢复、尚未处理完的链接定期续租，避免积压较多时租约过期被重新分配"""
+        while not self._heartbeat_stop.wait(CRAWL_QUEUE_CONFIG["heartbeat_interval"]):
+            with self._lock:
+                urls = list(self.resumed)
+            if not urls:
+                continue
+            try:
+                renewed = self.spill_queue.renew(self.worker, urls)
+            except OSError as e:
+                events.warning("renew_failed", f"⚠️ 续租失败: {e}", error=str(e))
+                continue
+            events.debug("renewed", f"🔁 已续租 {len(renewed)}/{len(urls)} 个恢复的链接",
+                         renewed=len(renewed), total=len(urls))
+
+    def status(self) -> dict:
+        """运行状态"""
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "uptime": round(time.time() - self.started, 1),
+                "queued": self.pending.qsize(),
+                "in_progress": list(self.in_progress.values()),
+                **self.counts,
+                "recent": list(self.recent),
+                "concurrency": get_concurrency_controller().summary(),
+            }
+
+    def _ingest_loop(self) -> None:
+        """抓取线程：从队列取出链接，提取并保存"""
+        while True:
+            item = self.pending.get()
+            if item is None:
+                return
+            url, received = item
+            with self._lock:
+                self.in_progress[threading.get_ident()] = url
+            waited = time.perf_counter() - received
+            try:
+                with profiling.profile_item():
+                    record = extract_xhs_content(url, self.args.root)
+                    if record.error:
+                        raise RuntimeError(record.error)
+                    save_dir = save_xhs_content(record, self.args.account, not self.args.no_download,
+                                                archive_root=self.args.root)
+                if save_dir is None:
+                    raise RuntimeError("保存失败")
+                outcome = {"url": url, "ok": True, "path": str(save_dir)}
+            except Exception as e:
+                outcome = {"url": url, "ok": False, "error": str(e)}
+            outcome["seconds"] = round(time.perf_counter() - received, 3)
+            outcome["queue_wait"] = round(waited, 3)
+
+            with self._lock:
+                self.in_progress.pop(threading.get_ident(), None)
+                self.counts["done" if outcome["ok"] else "failed"] += 1
+                self.recent.append(outcome)
+            if url in self.resumed:
+                # 从上次转存的队列中恢复的链接，同步更新队列状态
+                if outcome["ok"]:
+                    self.spill_queue.complete(self.worker, url, outcome["path"])
+                else:
+                    self.spill_queue.fail(self.worker, url, outcome["error"])
+                with self._lock:
+                    self.resumed.discard(url)
+            if outcome["ok"]:
+                events.info("ingested", f"✅ {url} → {outcome['path']}（排队 {waited * 1000:.0f}ms，"
+                            f"共 {outcome['seconds']:.2f}s）", **outcome)
+            else:
+                events.warning("ingest_failed", f"❌ {url}: {outcome['error']}", **outcome)
+
+    def _poll_file(self, path: Path) -> None:
+        """读取收件箱文件新追加的行（文件被截断或替换时从头读取）"""
+        try:
+            size = path.stat().st_size
+        except OSError:
+            return
+        if size < self._file_offset:
+            self._file_offset = 0
+        if size == self._file_offset:
+            return
+        with open(path, 'rb') as f:
+            f.seek(self._file_offset)
+            data = f.read()
+        # 只处理完整的行，半行留到下次
+        complete = data[:data.rfind(b"\n") + 1]
+        self._file_offset += len(complete)
+        for url in _extract_urls(complete.decode('utf-8', 'replace')):
+            self.submit(url, "file")
+
+    def _poll_dir(self, path: Path) -> None:
+        """读取收件箱目录中的新文件，处理后移入 processed 子目录"""
+        processed = path / "processed"
+        try:
+            entries = [e for e in os.scandir(path) if e.is_file() and not e.name.startswith('.')]
+        except OSError:
+            return
+        for entry in sorted(entries, key=lambda e: e.stat().st_mtime_ns):
+            try:
+                with open(entry.path, 'r', encoding='utf-8') as f:
+                    text = f.read()
+                processed.mkdir(exist_ok=True)
+                os.replace(entry.path, processed / entry.name)
+            except (OSError, UnicodeDecodeError) as e:
+                events.warning("inbox_file_failed", f"⚠️ 无法读取 {entry.path}: {e}", path=entry.path)
+                continue
+            for url in _extract_urls(text):
+                self.submit(url, "dir")
+
+    def _serve_socket(self, path: str) -> socketserver.BaseServer:
+        """启动本地Unix套接字服务"""
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for raw in self.rfile:
+                    line = raw.decode('utf-8', 'replace').strip()
+                    if not line:
+                        continue
+                    command = line.upper()
+                    if command == "STATUS":
+                        reply = json.dumps(daemon.status(), ensure_ascii=False)
+                    elif command == "STOP":
+                        daemon.stop_event.set()
+                        reply = "STOPPING"
+                    else:
+                        urls = _extract_urls(line)
+                        reply = " ".join("QUEUED" if daemon.submit(url, "socket") else "DUPLICATE"
+                                         for url in urls) or "ERROR 未识别的命令或链接"
+                    self.wfile.write((reply + "\n").encode('utf-8'))
+
+        if os.path.exists(path):
+            # 上次异常退出留下的套接字文件；仍有进程在监听时拒绝启动
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(path)
+                raise RuntimeError(f"已有守护进程在监听 {path}")
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.unlink(path)
+            finally:
+                probe.close()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        server = socketserver.ThreadingUnixStreamServer(path, Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="inbox-socket", daemon=True).start()
+        return server
+
+    def run(self) -> int:
+        """运行直到收到 SIGINT / SIGTERM / STOP"""
+        args = self.args
+        self.warm_up()
+
+        # 上次退出时未处理的链接
+        self.resumed = set(self.spill_queue.lease(self.worker, count=1 << 30))
+        for url in self.resumed:
+            self.submit(url, "resume")
+        heartbeat = threading.Thread(target=self._heartbeat_loop, name="inbox-heartbeat", daemon=True)
+        heartbeat.start()
+
+        server = self._serve_socket(args.socket) if args.socket else None
+        threads = [threading.Thread(target=self._ingest_loop, name=f"ingest-{i}", daemon=True)
+                   for i in range(args.workers)]
+        for thread in threads:
+            thread.start()
+
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: self.stop_event.set())
+
+        if args.inbox_file and Path(args.inbox_file).exists() and not args.replay:
+            # 默认只处理启动后新追加的链接
+            self._file_offset = Path(args.inbox_file).stat().st_size
+
+        sources = [s for s in (args.inbox_file and f"文件 {args.inbox_file}",
+                               args.inbox_dir and f"目录 {args.inbox_dir}",
+                               args.socket and f"套接字 {args.socket}") if s]
+        events.info("watching", f"👀 正在监听: {'，'.join(sources)}（{args.workers} 个抓取线程）",
+                    sources=sources, workers=args.workers)
+
+        while not self.stop_event.wait(WATCH_CONFIG["poll_interval"]):
+            if args.inbox_file:
+                self._poll_file(Path(args.inbox_file))
+            if args.inbox_dir:
+                self._poll_dir(Path(args.inbox_dir))
+
+        return self.shutdown(server, threads)
+
+    def shutdown(self, server, threads) -> int:
+        """停止接收新链接，等待正在抓取的链接完成，未处理的链接转存到抓取队列"""
+        events.info("stopping", "🛑 正在停止：等待正在抓取的链接完成...")
+        # 先取走尚未开始的链接，抓取线程处理完手头的链接后即退出
+        leftover = []
+        with self._lock:
+            while True:
+                try:
+                    leftover.append(self.pending.get_nowait()[0])
+                except queue.Empty:
+                    break
+            for _ in threads:
+                self.pending.put(None)
+        if server:
+            server.shutdown()
+            server.server_close()
+            try:
+                os.unlink(self.args.socket)
+            except OSError:
+                pass
+        for thread in threads:
+            thread.join()
+        self._heartbeat_stop.set()
+
+        if leftover:
+            self.spill_queue.release(self.worker, [url for url in leftover if url in self.resumed])
+            self.spill_queue.add(leftover)
+            events.info("spilled", f"💾 {len(leftover)} 个未处理的链接已转存，下次启动时继续处理",
+                        count=len(leftover), queue=str(self.spill_queue.path))
+        close_session()
+        status = self.status()
+        events.info("stopped", f"👋 已停止：成功 {status['done']}，失败 {status['failed']}，"
+                    f"重复 {status['duplicate']}", **{k: status[k] for k in ("done", "failed", "duplicate")})
+        return 0
+
+
+def send_command(path: str, lines) -> list:
+    """
+    向守护进程的套接字发送命令
+
+    Args:
+        path: 套接字路径
+        lines: 命令或链接列表
+
+    Returns:
+        list: 每条命令的回复
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        reader = sock.makefile('r', encoding='utf-8')
+        replies = []
+        for line in lines:
+            sock.sendall((line + "\n").encode('utf-8'))
+            replies.append(reader.readline().strip())
+        return replies
+
+
+def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='收件箱监听工具')
+    parser.add_argument('--socket', '-s', default=WATCH_CONFIG["socket_path"],
+                        help=f'Unix套接字路径，默认为{WATCH_CONFIG["socket_path"]}')
+    events.add_event_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run = subparsers.add_parser('run', help='启动守护进程')
+    run.add_argument('--inbox-file', help='监听的文本文件（每行一个链接，追加写入）')
+    run.add_argument('--inbox-dir', help='监听的目录（放入的每个文件中的链接都会被处理）')
+    run.add_argument('--no-socket', action='store_true', help='不监听Unix套接字')
+    run.add_argument('--replay', action='store_true', help='启动时处理收件箱文件中已有的链接')
+    run.add_argument('--workers', '-w', type=int, default=WATCH_CONFIG["workers"], help='抓取线程数')
+    run.add_argument('--root', default='文案生成', help='归档根目录，默认为文案生成')
+    run.add_argument('--account', '-a', default='AI知识账号', help='账号名称，默认为AI知识账号')
+    run.add_argument('--no-download', action='store_true', help='不下载图片，仅提取内容')
+
+    send = subparsers.add_parser('send', help='向运行中的守护进程发送链接')
+    send.add_argument('urls', nargs='+', help='链接')
+    subparsers.add_parser('status', help='查看守护进程状态')
+    subparsers.add_parser('stop', help='优雅停止守护进程')
+
+    args = parser.parse_args()
+    events.configure_from_args(args)
+
+    if args.command != 'run':
+        lines = args.urls if args.command == 'send' else [args.command.upper()]
+        try:
+            replies = send_command(args.socket, lines)
+        except OSError as e:
+            events.error("connect_failed", f"❌ 无法连接守护进程 {args.socket}: {e}", error=str(e))
+            return 1
+        # 守护进程的回复是命令的输出，直接写到标准输出，不受 --quiet / --json-log 影响
+        if args.command == 'status':
+            status = json.loads(replies[0])
+            events.debug("status", **status)
+            output = json.dumps(status, ensure_ascii=False, indent=2)
+        else:
+            events.debug("reply", replies=len(replies))
+            output = "\n".join(f"{line} → {reply}" for line, reply in zip(lines, replies))
+        events.flush()
+        print(output)
+        return 0
+
+    if args.no_socket:
+        args.socket = None
+    if not (args.inbox_file or args.inbox_dir or args.socket):
+        parser.error('至少需要一个收件箱来源')
+
+    profiling.start_profiling_from_args(args)
+    install_reload_signal()
+    try:
+        return InboxDaemon(args).run()
+    except RuntimeError as e:
+        events.error("start_failed", f"❌ {e}", error=str(e))
+        return 1
+
+if __name__ == "__main__":
+    exit(main())
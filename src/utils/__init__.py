@@ -6,5 +6,75 @@ from .download_images_from_urls import (
     download_file,
     download_file_with_retry,
     download_multiple_files,
-    get_file_extension_from_url
-)
\ No newline at end of file
+    get_file_extension_from_url,
+    link_or_copy
+)
+from .short_link_resolver import (
+    ShortLinkCache,
+    is_short_link,
+    resolve_short_link
+)
+
+from .bandwidth import (
+    BandwidthLimiter,
+    get_bandwidth_limiter,
+    install_reload_signal,
+    reload_bandwidth_config
+)
+
+from .preflight import (
+    ETagIndex,
+    preflight_check,
+    sniff_content_type
+)
+
+from .url_canonical import (
+    canonicalize_image_url,
+    dedupe_image_urls,
+    detect_platform
+)
+
+from .extraction_rules import (
+    get_rule_set,
+    reload_extraction_rules,
+    rule_stats
+)
+
+from .events import (
+    EventReporter,
+    add_event_arguments,
+    configure_from_args,
+    get_reporter
+)
+
+from .profiling import (
+    Profiler,
+    add_profile_arguments,
+    profile_item,
+    profile_stage,
+    start_profiling
+)
+
+from .file_lock import (
+    locked
+)
+
+from .journal import (
+    Journal
+)
+
+from .concurrency import (
+    ConcurrencyController,
+    get_concurrency_controller
+)
+
+from .http_client import (
+    close_session,
+    get_session
+)
+
+from .page_fetch import (
+    FetchedPage,
+    PageBlock,
+    fetch_page
+)
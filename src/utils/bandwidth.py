@@ -0,0 +1,185 @@
+"""
+带宽整形模块
+为所有并发下载提供共享的全局及单域名 字节/秒 预算
+"""
+
+import signal
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from . import events
+
+
+class RateLimiter:
+    """
+    字节速率限制器
+
+    按请求到达顺序排队分配发送时间，多个并发传输轮流占用带宽，不会出现某个下载饿死其他下载的情况
+    """
+
+    def __init__(self, bytes_per_second: float = 0):
+        """
+        初始化速率限制器
+
+        Args:
+            bytes_per_second: 每秒允许的字节数，0表示不限速
+        """
+        self._lock = threading.Lock()
+        self._next_free = 0.0
+        self.bytes_per_second = bytes_per_second
+
+    def set_rate(self, bytes_per_second: float) -> None:
+        """运行时调整速率"""
+        with self._lock:
+            self.bytes_per_second = bytes_per_second
+            self._next_free = min(self._next_free, time.monotonic())
+
+    def reserve(self, nbytes: int) -> float:
+        """
+        预约发送 nbytes 字节所需的时间片
+
+        Args:
+            nbytes: 字节数
+
+        Returns:
+            float: 调用方需要等待的秒数
+        """
+        if self.bytes_per_second <= 0:
+            return 0.0
+
+        with self._lock:
+            now = time.monotonic()
+            start = max(self._next_free, now)
+            self._next_free = start + nbytes / self.bytes_per_second
+            return start - now
+
+
+class BandwidthLimiter:
+    """带宽限制器，组合全局限速和按域名限速"""
+
+    def __init__(self, max_bytes_per_second: float = 0,
+                 per_host_bytes_per_second: float = 0,
+                 host_limits: Optional[Dict[str, float]] = None):
+        """
+        初始化带宽限制器
+
+        Args:
+            max_bytes_per_second: 全局带宽上限，0表示不限
+            per_host_bytes_per_second: 未单独配置的域名的默认上限，0表示不限
+            host_limits: 指定域名（含子域名）的上限
+        """
+        self._lock = threading.Lock()
+        self._global = RateLimiter(max_bytes_per_second)
+        self._hosts: Dict[str, RateLimiter] = {}
+        self.per_host_bytes_per_second = per_host_bytes_per_second
+        self.host_limits = dict(host_limits or {})
+        # 信号处理函数只设置该标志，由下一次 throttle() 在普通上下文中重新加载
+        self._reload_requested = threading.Event()
+
+    def request_reload(self) -> None:
+        """请求重新加载配置（可在信号处理函数中安全调用，不获取任何锁）"""
+        self._reload_requested.set()
+
+    @property
+    def enabled(self) -> bool:
+        """是否配置了任何限速"""
+        return (self._global.bytes_per_second > 0 or self.per_host_bytes_per_second > 0
+                or any(v > 0 for v in self.host_limits.values()))
+
+    def configure(self, max_bytes_per_second: float = 0,
+                  per_host_bytes_per_second: float = 0,
+                  host_limits: Optional[Dict[str, float]] = None) -> None:
+        """运行时更新限速配置，正在进行的下载从下一个数据块开始生效"""
+        with self._lock:
+            self._global.set_rate(max_bytes_per_second)
+            self.per_host_bytes_per_second = per_host_bytes_per_second
+            self.host_limits = dict(host_limits or {})
+            for host, limiter in self._hosts.items():
+                limiter.set_rate(self._host_rate(host))
+
+    def _host_rate(self, host: str) -> float:
+        """查找域名对应的速率，按最长后缀匹配"""
+        matched = None
+        for pattern in self.host_limits:
+            if host == pattern or host.endswith("." + pattern):
+                if matched is None or len(pattern) > len(matched):
+                    matched = pattern
+        if matched is not None:
+            return self.host_limits[matched]
+        return self.per_host_bytes_per_second
+
+    def _host_limiter(self, host: str) -> RateLimiter:
+        """获取（必要时创建）域名对应的限制器"""
+        with self._lock:
+            limiter = self._hosts.get(host)
+            if limiter is None:
+                limiter = self._hosts[host] = RateLimiter(self._host_rate(host))
+            return limiter
+
+    def throttle(self, url: str, nbytes: int) -> None:
+        """
+        在下载循环中每收到一个数据块调用一次，按预算阻塞
+
+        Args:
+            url: 正在下载的URL（用于按域名限速）
+            nbytes: 本次数据块字节数
+        """
+        if self._reload_requested.is_set():
+            self._reload_requested.clear()
+            reload_bandwidth_config()
+        if not self.enabled:
+            return
+
+        host = (urlparse(url).hostname or "").lower()
+        wait = max(self._global.reserve(nbytes), self._host_limiter(host).reserve(nbytes))
+        if wait > 0:
+            time.sleep(wait)
+
+
+_limiter = None
+
+
+def get_bandwidth_limiter() -> BandwidthLimiter:
+    """获取进程内所有下载共享的带宽限制器"""
+    global _limiter
+    if _limiter is None:
+        from config.settings import BANDWIDTH_CONFIG
+        _limiter = BandwidthLimiter(**BANDWIDTH_CONFIG)
+    return _limiter
+
+
+def reload_bandwidth_config() -> dict:
+    """
+    重新读取带宽配置（环境变量和 .env），原地更新 BANDWIDTH_CONFIG 并应用到共享限制器
+
+    Returns:
+        dict: 生效的带宽配置
+    """
+    from config.settings import BANDWIDTH_CONFIG, load_bandwidth_config
+    config = load_bandwidth_config()
+    BANDWIDTH_CONFIG.clear()
+    BANDWIDTH_CONFIG.update(config)
+    get_bandwidth_limiter().configure(**BANDWIDTH_CONFIG)
+    events.info("bandwidth_reloaded", f"🔄 已重新加载带宽配置: {BANDWIDTH_CONFIG}", config=BANDWIDTH_CONFIG)
+    return BANDWIDTH_CONFIG
+
+
+def install_reload_signal(signum: Optional[int] = None) -> None:
+    """
+    注册信号处理函数，收到信号（默认SIGHUP）时重新加载带宽配置
+
+    信号在主线程上执行，可能打断正持有限速锁的 throttle()，因此处理函数只登记请求，
+    配置在下一个数据块时生效。例如: kill -HUP <pid>
+
+    Args:
+        signum: 信号编号
+    """
+    if signum is None:
+        signum = getattr(signal, "SIGHUP", None)
+        if signum is None:
+            # Windows 没有 SIGHUP
+            return
+
+    signal.signal(signum, lambda *_: get_bandwidth_limiter().request_reload())
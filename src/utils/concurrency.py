@@ -0,0 +1,208 @@
+"""
+自适应并发模块
+按域名限制同时进行的请求数，并根据观测到的延迟和429/5xx比例自动调整（AIMD）：
+请求顺利时每轮加性增加并发，遇到限流、服务端错误、连接失败或延迟明显高于基线时乘性减少
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+import requests
+
+
+# 视为服务端过载的状态码
+OVERLOAD_STATUS = (429, 502, 503, 504)
+
+
+class AdaptiveLimit:
+    """单个域名的自适应并发限制"""
+
+    def __init__(self, initial_concurrency: int = 2, min_concurrency: int = 1, max_concurrency: int = 4,
+                 increase: float = 1, backoff_factor: float = 0.5, latency_tolerance: float = 2.0):
+        """
+        初始化并发限制
+
+        Args:
+            initial_concurrency: 初始并发数
+            min_concurrency: 并发下限
+            max_concurrency: 并发上限
+            increase: 每轮（约等于当前并发数个成功请求）增加的并发数
+            backoff_factor: 过载时并发数乘以该系数
+            latency_tolerance: 延迟超过基线的倍数时视为拥塞
+        """
+        self.min = max(1, min_concurrency)
+        self.max = max(self.min, max_concurrency)
+        self.limit = float(min(max(initial_concurrency, self.min), self.max))
+        self.increase = increase
+        self.backoff_factor = backoff_factor
+        self.latency_tolerance = latency_tolerance
+
+        self._cond = threading.Condition()
+        self.in_flight = 0
+        self.baseline = None        # 观测到的最低延迟（缓慢上浮，适应网络变化）
+        self.latency = None         # 延迟的指数移动平均
+        self._last_backoff = 0.0
+        self.stats = {"requests": 0, "overloaded": 0, "peak": int(self.limit)}
+
+    def acquire(self) -> None:
+        """等待直到在途请求数低于当前限制"""
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self, latency: float, overloaded: bool) -> None:
+        """
+        请求结束后释放并调整限制
+
+        Args:
+            latency: 请求延迟（秒）
+            overloaded: 是否观测到过载（429/5xx/连接失败）
+        """
+        with self._cond:
+            self.in_flight -= 1
+            self.stats["requests"] += 1
+            now = time.monotonic()
+            if not overloaded:
+                self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+                self.baseline = latency if self.baseline is None else min(latency, self.baseline * 1.001)
+                congested = self.latency > self.baseline * self.latency_tolerance
+            else:
+                self.stats["overloaded"] += 1
+                congested = True
+
+            if congested:
+                # 同一轮中并发失败的请求只减一次，避免一次拥塞把并发压到下限
+                window = self.latency or latency
+                if now - self._last_backoff >= window:
+                    self.limit = max(self.min, self.limit * self.backoff_factor)
+                    self._last_backoff = now
+            else:
+                self.limit = min(self.max, self.limit + self.increase / self.limit)
+                self.stats["peak"] = max(self.stats["peak"], int(self.limit))
+            self._cond.notify_all()
+
+    def summary(self) -> dict:
+        """当前状态"""
+        return {"limit": int(self.limit), "min": self.min, "max": self.max, "peak": self.stats["peak"],
+                "requests": self.stats["requests"], "overloaded": self.stats["overloaded"],
+                "latency_ms": round((self.latency or 0) * 1000)}
+
+
+class Slot:
+    """一次请求占用的并发名额，调用方在收到响应头时调用 mark_response"""
+
+    __slots__ = ("started", "first_byte", "status")
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.first_byte = None
+        self.status = None
+
+    def mark_response(self, status: int) -> None:
+        """记录状态码和首字节延迟（大文件的总耗时不代表服务器压力）"""
+        self.status = status
+        self.first_byte = time.monotonic()
+
+
+class ConcurrencyController:
+    """按域名管理自适应并发限制"""
+
+    def __init__(self, config: Optional[dict] = None, profile: str = ""):
+        """
+        初始化并发控制器
+
+        Args:
+            config: 并发配置（见 config/settings.py 中的 PERFORMANCE_PROFILES）
+            profile: 档位名称（用于报告）
+        """
+        config = dict(config or {})
+        self.host_overrides = config.pop("host_overrides", {}) or {}
+        self.defaults = config
+        self.profile = profile
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, AdaptiveLimit] = {}
+
+    def _host_config(self, host: str) -> dict:
+        """合并默认配置和按最长后缀匹配到的域名覆盖值"""
+        matched = None
+        for pattern in self.host_overrides:
+            if host == pattern or host.endswith("." + pattern):
+                if matched is None or len(pattern) > len(matched):
+                    matched = pattern
+        return {**self.defaults, **(self.host_overrides[matched] if matched else {})}
+
+    def limit_for(self, url: str) -> AdaptiveLimit:
+        """获取（必要时创建）URL所属域名的并发限制"""
+        host = (urlparse(url).hostname or "").lower()
+        with self._lock:
+            limit = self._hosts.get(host)
+            if limit is None:
+                limit = self._hosts[host] = AdaptiveLimit(**self._host_config(host))
+            return limit
+
+    @contextmanager
+    def slot(self, url: str):
+        """
+        占用一个并发名额执行请求
+
+        Args:
+            url: 请求URL
+
+        Yields:
+            Slot: 收到响应时调用 slot.mark_response(status)
+        """
+        limit = self.limit_for(url)
+        limit.acquire()
+        slot = Slot()
+        overloaded = False
+        try:
+            yield slot
+        except requests.HTTPError as e:
+            status = e.response.status_code if e.response is not None else None
+            overloaded = status is None or status in OVERLOAD_STATUS or status >= 500
+            raise
+        except (requests.ConnectionError, requests.Timeout):
+            overloaded = True
+            raise
+        finally:
+            if slot.status is not None and (slot.status in OVERLOAD_STATUS or slot.status >= 500):
+                overloaded = True
+            latency = (slot.first_byte or time.monotonic()) - slot.started
+            limit.release(latency, overloaded)
+
+    def summary(self) -> List[dict]:
+        """
+        各域名当前的并发限制和统计
+
+        Returns:
+            List[dict]: 每个域名一行
+        """
+        with self._lock:
+            hosts = dict(self._hosts)
+        return [{"host": host, **limit.summary()} for host, limit in sorted(hosts.items())]
+
+
+_controller = None
+
+
+def get_concurrency_controller() -> ConcurrencyController:
+    """获取进程内共享的并发控制器"""
+    global _controller
+    if _controller is None:
+        from config.settings import CONCURRENCY_CONFIG, PERFORMANCE_PROFILE
+        _controller = ConcurrencyController(CONCURRENCY_CONFIG, PERFORMANCE_PROFILE)
+    return _controller
+
+
+def format_limits() -> str:
+    """把各域名的并发限制格式化为运行汇总中的文本"""
+    controller = get_concurrency_controller()
+    lines = [f"   并发档位: {controller.profile}"]
+    for row in controller.summary():
+        lines.append(f"   {row['host']}: 并发 {row['limit']}（{row['min']}–{row['max']}，峰值 {row['peak']}），"
+                     f"请求 {row['requests']}，过载 {row['overloaded']}，延迟 {row['latency_ms']}ms")
+    return "\n".join(lines)
@@ -3,14 +3,95 @@
 提供通用的下载功能
 """
 
+import json
 import os
+import shutil
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Optional
-from config.settings import DOWNLOAD_CONFIG
+from typing import Dict, Iterable, Optional
+from config.settings import DOWNLOAD_CONFIG, PREFLIGHT_CONFIG
+from src.core.records import DownloadResult, ImageRef
+from . import events, profiling
+from .bandwidth import get_bandwidth_limiter
+from .concurrency import format_limits, get_concurrency_controller
+from .file_lock import locked
+from .http_client import get_session
+from .preflight import get_etag_index, preflight_check
 
 
-def download_file(url: str, filepath: Path, timeout: Optional[int] = None) -> bool:
+# 下载目录中记录每个文件来源URL和字节数的文件
+SOURCES_FILE = ".sources.json"
+
+# 每个线程复用一块读缓冲区，避免每个数据块都分配新的bytes对象
+_buffers = threading.local()
+
+
+def _get_buffer(size: int) -> memoryview:
+    """获取当前线程的读缓冲区"""
+    buffer = getattr(_buffers, "buffer", None)
+    if buffer is None or len(buffer) != size:
+        buffer = _buffers.buffer = memoryview(bytearray(size))
+    return buffer
+
+
+def write_response_to_file(response: requests.Response, filepath: Path, url: str = "",
+                           buffer_size: Optional[int] = None) -> int:
+    """
+    把流式响应写入文件
+
+    用一块可复用的大缓冲区 readinto 读取响应体，按 memoryview 切片直接写入无缓冲文件，
+    并在已知 Content-Length 时用 posix_fallocate 预分配文件空间
+
+    Args:
+        response: 以 stream=True 发起的响应
+        filepath: 保存路径
+        url: 文件URL（用于带宽限速）
+        buffer_size: 缓冲区大小（字节），默认读取配置
+
+    Returns:
+        int: 写入的字节数
+
+    Raises:
+        IOError: 响应体比Content-Length短
+    """
+    buffer = _get_buffer(buffer_size or DOWNLOAD_CONFIG["buffer_size"])
+    raw = response.raw
+    # 与 iter_content 一致，透明解压 gzip/deflate 编码的响应体
+    raw.decode_content = True
+    encoded = bool(response.headers.get('Content-Encoding'))
+    expected = int(response.headers.get('Content-Length') or 0) if not encoded else 0
+
+    # 所有并发下载共享同一个带宽预算
+    limiter = get_bandwidth_limiter()
+    written = 0
+    with open(filepath, 'wb', buffering=0) as f:
+        if expected and DOWNLOAD_CONFIG.get("preallocate", True) and hasattr(os, 'posix_fallocate'):
+            try:
+                os.posix_fallocate(f.fileno(), 0, expected)
+            except OSError:
+                pass  # 文件系统不支持时退回普通写入
+        try:
+            while True:
+                n = raw.readinto(buffer)
+                if not n:
+                    break
+                limiter.throttle(url, n)
+                f.write(buffer[:n])
+                written += n
+                events.add_bytes(n)
+        finally:
+            if expected and written != expected:
+                # 连接中断时截掉预分配的空间，避免留下以0填充的残缺文件
+                f.truncate(written)
+        if expected and written != expected:
+            raise IOError(f"响应体不完整: {written}/{expected} 字节")
+    return written
+
+
+def download_file(url: str, filepath: Path, timeout: Optional[int] = None,
+                  headers: Optional[dict] = None) -> bool:
     """
     下载文件到指定路径
     
@@ -18,6 +99,7 @@ def download_file(url: str, filepath: Path, timeout: Optional[int] = None) -> bo
         url: 文件URL
         filepath: 保存路径
         timeout: 超时时间（秒）
+        headers: 请求头
     
     Returns:
         bool: 下载是否成功
@@ -26,25 +108,93 @@ def download_file(url: str, filepath: Path, timeout: Optional[int] = None) -> bo
         timeout = DOWNLOAD_CONFIG["timeout"]
     
     try:
-        response = requests.get(url, stream=True, timeout=timeout)
-        response.raise_for_status()
-        
-        # 确保目录存在
-        filepath.parent.mkdir(parents=True, exist_ok=True)
-        
-        with open(filepath, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
+        # 按域名自适应限制同时进行的下载数
+        with get_concurrency_controller().slot(url) as slot, \
+                get_session().get(url, headers=headers, stream=True, timeout=timeout) as response:
+            slot.mark_response(response.status_code)
+            response.raise_for_status()
+            
+            # 确保目录存在
+            filepath.parent.mkdir(parents=True, exist_ok=True)
+            
+            # 先写入同目录下的临时文件，完整下载后再替换，中断时不会留下残缺文件
+            tmp_path = filepath.with_name(f".{filepath.name}.{os.getpid()}.{threading.get_ident()}.part")
+            try:
+                size = write_response_to_file(response, tmp_path, url)
+                os.replace(tmp_path, filepath)
+            finally:
+                if tmp_path.exists():
+                    tmp_path.unlink()
         
-        print(f"✅ 成功下载文件: {filepath.name}")
+        events.debug("download_ok", f"✅ 成功下载文件: {filepath.name} ({size} bytes)",
+                     url=url, path=str(filepath), bytes=size)
         return True
         
     except Exception as e:
-        print(f"❌ 下载文件失败 {url}: {str(e)}")
+        events.warning("download_failed", f"❌ 下载文件失败 {url}: {str(e)}", url=url, error=str(e))
         return False
 
 
+def _read_sources(path: Path) -> dict:
+    """读取下载记录文件（文件名 -> {"url", "bytes"}）"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def load_download_sources(output_dir: Path) -> Dict[str, ImageRef]:
+    """
+    读取下载目录中的下载记录，供完整性校验和定向重新下载使用
+
+    Args:
+        output_dir: 下载目录
+
+    Returns:
+        Dict[str, ImageRef]: 文件名 -> 图片（来源URL和字节数），不存在时为空
+    """
+    return {name: ImageRef(entry["url"], name, entry.get("bytes", 0))
+            for name, entry in _read_sources(Path(output_dir) / SOURCES_FILE).items()}
+
+
+def record_download_sources(output_dir: Path, refs: Iterable[ImageRef]) -> None:
+    """
+    合并写入下载记录（先写临时文件再替换）
+
+    Args:
+        output_dir: 下载目录
+        refs: 已下载的图片
+    """
+    entries = {ref.filename: {"url": ref.url, "bytes": ref.bytes} for ref in refs}
+    if not entries:
+        return
+    path = Path(output_dir) / SOURCES_FILE
+    with locked(path):
+        merged = {**_read_sources(path), **entries}
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(merged, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+
+def link_or_copy(source, target) -> None:
+    """
+    用硬链接复用已下载的文件（跨文件系统等不支持时复制）
+
+    Args:
+        source: 已有文件
+        target: 目标路径（已存在时覆盖）
+    """
+    target = Path(target)
+    tmp_path = target.with_name(f".{target.name}.{os.getpid()}.{threading.get_ident()}.part")
+    try:
+        os.link(source, tmp_path)
+    except OSError:
+        shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, target)
+
+
 def download_file_with_retry(url: str, filepath: Path, max_retries: Optional[int] = None) -> bool:
     """
     带重试机制的文件下载
@@ -65,14 +215,16 @@ def download_file_with_retry(url: str, filepath: Path, max_retries: Optional[int
             return True
         
         if attempt < max_retries:
-            print(f"⚠️ 第{attempt + 1}次下载失败，{DOWNLOAD_CONFIG['timeout']}秒后重试...")
+            events.warning("download_retry", f"⚠️ 第{attempt + 1}次下载失败，{DOWNLOAD_CONFIG['timeout']}秒后重试...",
+                           url=url, attempt=attempt + 1)
             import time
             time.sleep(DOWNLOAD_CONFIG['timeout'])
     
     return False
 
 
-def download_multiple_files(urls: list, output_dir: Path, filename_template: str = "file_{:03d}") -> dict:
+def download_multiple_files(urls: list, output_dir: Path, filename_template: str = "file_{:03d}",
+                            preflight: Optional[bool] = None) -> DownloadResult:
     """
     批量下载多个文件
     
@@ -80,21 +232,20 @@ def download_multiple_files(urls: list, output_dir: Path, filename_template: str
         urls: 文件URL列表
         output_dir: 输出目录
         filename_template: 文件名模板
+        preflight: 是否先做预检（类型、大小、ETag去重），默认读取配置
     
     Returns:
-        dict: 下载结果统计
+        DownloadResult: 下载结果统计
     """
-    results = {
-        "total": len(urls),
-        "success": 0,
-        "failed": 0,
-        "failed_urls": []
-    }
+    if preflight is None:
+        preflight = PREFLIGHT_CONFIG["enabled"]
+    
+    results = DownloadResult(total=len(urls))
     
     # 确保输出目录存在
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    for i, url in enumerate(urls):
+    def download_one(i, url):
         # 从URL推断文件扩展名
         parsed_url = requests.utils.urlparse(url)
         path = parsed_url.path
@@ -111,15 +262,69 @@ def download_multiple_files(urls: list, output_dir: Path, filename_template: str
         filename = f"{filename_template.format(i+1)}.{ext}"
         filepath = output_dir / filename
         
-        if download_file_with_retry(url, filepath):
-            results["success"] += 1
-        else:
-            results["failed"] += 1
-            results["failed_urls"].append(url)
+        # 预检不通过的资源不占用带宽
+        check = preflight_check(url) if preflight else None
+        if check and check["duplicate_of"]:
+            # 已下载过的相同资源：复用已有文件，帖子目录中的图片编号保持完整
+            link_or_copy(check["duplicate_of"], filepath)
+            events.info("download_reused", f"🔗 复用已下载的文件 {check['duplicate_of']}: {url}",
+                        url=url, source=check["duplicate_of"])
+            results.files.append(ImageRef(url, filename, filepath.stat().st_size))
+            return "success"
+        if check and not check["ok"]:
+            events.info("download_skipped", f"⏭️ 跳过 {url}: {check['reason']}", url=url, reason=check['reason'])
+            return "skipped"
+        
+        strong_etag = check["etag"] if check and check["etag"] and not check["etag"].startswith('W/') else None
+        downloaded = False
+        try:
+            # 批量模式下按采样比例分析单个文件的下载
+            with profiling.profile_item(), profiling.profile_stage("download_file"):
+                downloaded = download_file_with_retry(url, filepath)
+        finally:
+            if strong_etag and not downloaded:
+                get_etag_index().release(url, strong_etag)
+        
+        if not downloaded:
+            return "failed"
+        results.files.append(ImageRef(url, filename, filepath.stat().st_size))
+        if strong_etag:
+            get_etag_index().add(url, strong_etag, filepath)
+        return "success"
+    
+    # 线程数只是上限，实际同时进行的下载数由各域名的自适应并发限制决定
+    workers = max(1, min(len(urls), get_concurrency_controller().defaults.get("max_concurrency", 1)))
+    with events.progress(len(urls), "下载") as progress, ThreadPoolExecutor(workers) as executor:
+        futures = {executor.submit(download_one, i, url): url for i, url in enumerate(urls)}
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                outcome = future.result()
+            except Exception as e:
+                events.warning("download_failed", f"❌ 下载文件失败 {url}: {str(e)}", url=url, error=str(e))
+                outcome = "failed"
+            if outcome == "success":
+                results.success += 1
+            elif outcome == "skipped":
+                results.skipped += 1
+                results.skipped_urls.append(url)
+            else:
+                results.failed += 1
+                results.failed_urls.append(url)
+            progress.advance()
+    
+    record_download_sources(output_dir, results.files)
     
-    print(f"\n📊 批量下载完成:")
-    print(f"   成功: {results['success']}/{results['total']}")
-    print(f"   失败: {results['failed']}/{results['total']}")
+    summary = (f"\n📊 批量下载完成:\n"
+               f"   成功: {results.success}/{results.total}\n"
+               f"   失败: {results.failed}/{results.total}")
+    if results.skipped:
+        summary += f"\n   跳过: {results.skipped}/{results.total}"
+    # 报告各域名最终选定的并发数
+    results.concurrency = get_concurrency_controller().summary()
+    summary += "\n" + format_limits()
+    events.info("batch_done", summary, total=results.total, success=results.success,
+                failed=results.failed, skipped=results.skipped, concurrency=results.concurrency)
     
     return results
 
@@ -159,4 +364,5 @@ if __name__ == "__main__":
     
     test_dir = Path("/tmp/test_download")
     results = download_multiple_files(test_urls, test_dir)
+    events.flush()
     print("测试结果:", results)
\ No newline at end of file
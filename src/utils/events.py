@@ -0,0 +1,356 @@
+"""
+事件与进度报告模块
+替代热点循环中的print：事件进入队列，由后台线程统一写出（人类可读文本 / JSON Lines），
+并在终端上显示紧凑的实时进度（条目/秒、字节/秒、预计剩余时间）
+"""
+
+import atexit
+import json
+import queue
+import sys
+import threading
+import time
+from typing import Optional, TextIO
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+LEVEL_NAMES = {DEBUG: "debug", INFO: "info", WARNING: "warning", ERROR: "error"}
+
+# 进程退出时等待事件写出的最长时间（秒），输出被阻塞时不让进程挂起
+EXIT_FLUSH_TIMEOUT = 10
+
+
+def format_bytes(nbytes: float) -> str:
+    """把字节数格式化为易读的字符串"""
+    for unit in ("B", "KB", "MB", "GB"):
+        if nbytes < 1024 or unit == "GB":
+            return f"{nbytes:.0f}{unit}" if unit == "B" else f"{nbytes:.1f}{unit}"
+        nbytes /= 1024
+
+
+class TextSink:
+    """人类可读输出，直接写出事件消息"""
+
+    def __init__(self, stream: Optional[TextIO] = None):
+        self.stream = stream or sys.stdout
+
+    def write(self, record: dict) -> None:
+        if record["message"]:
+            try:
+                self.stream.write(record["message"] + "\n")
+            except UnicodeEncodeError:
+                # 非UTF-8终端无法显示emoji等字符时替换输出，不丢弃整条消息
+                encoding = getattr(self.stream, "encoding", None) or "ascii"
+                self.stream.write((record["message"] + "\n").encode(encoding, "replace").decode(encoding))
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+
+class JsonLinesSink:
+    """机器可读输出，每个事件一行JSON"""
+
+    def __init__(self, path: str):
+        self.stream = sys.stdout if path == "-" else open(path, 'a', encoding='utf-8')
+
+    def write(self, record: dict) -> None:
+        self.stream.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+
+class Progress:
+    """批量任务进度，计数只做整数累加，渲染由后台线程完成"""
+
+    def __init__(self, reporter: "EventReporter", total: int, label: str):
+        self.reporter = reporter
+        self.total = total
+        self.label = label
+        self.done = 0
+        self.start_time = time.monotonic()
+        self.start_bytes = reporter.bytes_total
+
+    @property
+    def bytes(self) -> int:
+        """进度开始以来传输的字节数"""
+        return self.reporter.bytes_total - self.start_bytes
+
+    def advance(self, items: int = 1) -> None:
+        """完成若干条目"""
+        self.done += items
+
+    def render(self) -> str:
+        """生成一行进度文本"""
+        elapsed = max(time.monotonic() - self.start_time, 1e-6)
+        rate = self.done / elapsed
+        line = (f"{self.label} {self.done}/{self.total} "
+                f"{rate:.1f} 项/秒 {format_bytes(self.bytes / elapsed)}/秒")
+        if rate > 0 and self.total > self.done:
+            line += f" 剩余约 {(self.total - self.done) / rate:.0f}秒"
+        return line
+
+    def summary(self) -> dict:
+        """进度结束时的统计"""
+        elapsed = time.monotonic() - self.start_time
+        return {"label": self.label, "total": self.total, "done": self.done,
+                "bytes": self.bytes, "elapsed": round(elapsed, 3)}
+
+    def __enter__(self) -> "Progress":
+        self.reporter._progress.append(self)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self in self.reporter._progress:
+            self.reporter._progress.remove(self)
+        self.reporter.emit(DEBUG, "progress_done", "", **self.summary())
+
+
+class EventReporter:
+    """事件报告器，调用方只负责入队，格式化和IO都在后台线程中进行"""
+
+    def __init__(self, level: int = INFO):
+        """
+        初始化事件报告器
+
+        Args:
+            level: 最低输出级别，低于该级别的事件在入队前直接丢弃
+        """
+        self.level = level
+        self.bytes_total = 0
+        self.write_errors = 0
+        self.show_progress = True
+        self._sinks = [TextSink()]
+        self._queue = queue.SimpleQueue()
+        self._progress = []
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._bytes_lock = threading.Lock()
+
+    def configure(self, level: Optional[int] = None, quiet: bool = False,
+                  json_log: Optional[str] = None, show_progress: Optional[bool] = None) -> None:
+        """
+        调整输出方式
+
+        Args:
+            level: 最低输出级别
+            quiet: 安静模式，只输出错误且不显示进度
+            json_log: JSON Lines输出路径，"-"表示标准输出（此时不再输出文本）
+            show_progress: 是否显示实时进度
+        """
+        self.flush()
+        if level is not None:
+            self.level = level
+        if show_progress is not None:
+            self.show_progress = show_progress
+        if quiet:
+            self.level = ERROR
+            self.show_progress = False
+        if json_log:
+            sink = JsonLinesSink(json_log)
+            self._sinks = [sink] if json_log == "-" else [TextSink(), sink]
+
+    def emit(self, level: int, event: str, message: str = "", **fields) -> None:
+        """
+        报告一个事件
+
+        Args:
+            level: 事件级别
+            event: 事件名（机器可读）
+            message: 给人看的消息
+            **fields: 结构化字段
+        """
+        if level < self.level:
+            return
+        if self._thread is None:
+            self._start()
+        self._queue.put({"ts": time.time(), "level": LEVEL_NAMES.get(level, level),
+                         "event": event, "message": message,
+                         "thread": threading.current_thread().name, **fields})
+
+    def add_bytes(self, nbytes: int) -> None:
+        """累计传输字节数（供进度显示使用，多个下载线程同时调用）"""
+        with self._bytes_lock:
+            self.bytes_total += nbytes
+
+    def progress(self, total: int, label: str) -> Progress:
+        """
+        创建进度对象，配合with语句使用
+
+        Args:
+            total: 条目总数
+            label: 进度标签
+
+        Returns:
+            Progress: 进度对象
+        """
+        return Progress(self, total, label)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待已入队的事件全部写出
+
+        Args:
+            timeout: 最长等待时间（秒），None表示一直等待（后台线程已退出时立即返回）
+
+        Returns:
+            bool: 事件是否已全部写出
+        """
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return thread is None
+        done = threading.Event()
+        self._queue.put(done)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not done.wait(0.5):
+            if not thread.is_alive() or (deadline is not None and time.monotonic() >= deadline):
+                return False
+        return True
+
+    def _flush_at_exit(self) -> None:
+        """进程退出时写出剩余事件（最多等待 EXIT_FLUSH_TIMEOUT 秒）"""
+        self.flush(EXIT_FLUSH_TIMEOUT)
+
+    def _start(self) -> None:
+        """启动后台写出线程"""
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="event-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self._flush_at_exit)
+
+    def _run(self) -> None:
+        """后台线程：批量写出事件，空闲时刷新进度行"""
+        progress_stream = sys.stderr
+        progress_visible = False
+        while True:
+            try:
+                item = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                item = None
+
+            try:
+                can_render = self.show_progress and self._progress and progress_stream.isatty()
+            except ValueError:
+                # 标准错误已关闭
+                can_render = False
+            if progress_visible and (item is not None or not can_render):
+                self._guarded(progress_stream.write, "\r\033[K")
+                progress_visible = False
+
+            while item is not None:
+                if isinstance(item, threading.Event):
+                    self._flush_sinks()
+                    item.set()
+                else:
+                    for sink in self._sinks:
+                        self._guarded(sink.write, item)
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    item = None
+
+            self._flush_sinks()
+
+            if can_render and self._progress:
+                self._guarded(progress_stream.write,
+                              "\r\033[K" + " | ".join(p.render() for p in list(self._progress)))
+                self._guarded(progress_stream.flush)
+                progress_visible = True
+
+    def _flush_sinks(self) -> None:
+        """刷新所有输出"""
+        for sink in self._sinks:
+            self._guarded(sink.flush)
+
+    def _guarded(self, func, *args) -> None:
+        """
+        执行一次写出，出错（如管道已关闭、终端编码不支持）时只计数并丢弃本次写出，
+        后台线程不能退出，否则之后的 flush() 永远等不到结果
+        """
+        try:
+            func(*args)
+        except Exception:
+            self.write_errors += 1
+
+
+_reporter = EventReporter()
+
+
+def get_reporter() -> EventReporter:
+    """获取进程内共享的事件报告器"""
+    return _reporter
+
+
+def configure(level: Optional[int] = None, quiet: bool = False,
+              json_log: Optional[str] = None, show_progress: Optional[bool] = None) -> None:
+    """调整输出方式（见 EventReporter.configure）"""
+    _reporter.configure(level, quiet, json_log, show_progress)
+
+
+def emit(level: int, event: str, message: str = "", **fields) -> None:
+    """报告事件（见 EventReporter.emit）"""
+    _reporter.emit(level, event, message, **fields)
+
+
+def debug(event: str, message: str = "", **fields) -> None:
+    """报告调试级事件"""
+    _reporter.emit(DEBUG, event, message, **fields)
+
+
+def info(event: str, message: str = "", **fields) -> None:
+    """报告普通事件"""
+    _reporter.emit(INFO, event, message, **fields)
+
+
+def warning(event: str, message: str = "", **fields) -> None:
+    """报告警告事件"""
+    _reporter.emit(WARNING, event, message, **fields)
+
+
+def error(event: str, message: str = "", **fields) -> None:
+    """报告错误事件"""
+    _reporter.emit(ERROR, event, message, **fields)
+
+
+def add_bytes(nbytes: int) -> None:
+    """累计传输字节数"""
+    _reporter.add_bytes(nbytes)
+
+
+def progress(total: int, label: str) -> Progress:
+    """创建进度对象（见 EventReporter.progress）"""
+    return _reporter.progress(total, label)
+
+
+def flush(timeout: Optional[float] = None) -> bool:
+    """等待已入队的事件全部写出（见 EventReporter.flush）"""
+    return _reporter.flush(timeout)
+
+
+def add_event_arguments(parser) -> None:
+    """
+    为命令行工具添加输出相关参数
+
+    Args:
+        parser: argparse.ArgumentParser
+    """
+    group = parser.add_argument_group('输出')
+    group.add_argument('--quiet', '-q', action='store_true', help='安静模式，只输出错误')
+    group.add_argument('--verbose', '-v', action='store_true', help='输出每个文件的详细信息')
+    group.add_argument('--json-log', metavar='PATH', help='以JSON Lines格式输出事件，"-"表示标准输出')
+    group.add_argument('--no-progress', action='store_true', help='不显示实时进度')
+
+
+def configure_from_args(args) -> None:
+    """
+    根据 add_event_arguments 添加的参数配置事件报告器
+
+    Args:
+        args: argparse解析结果
+    """
+    configure(level=DEBUG if args.verbose else INFO, quiet=args.quiet,
+              json_log=args.json_log, show_progress=not args.no_progress)
@@ -0,0 +1,200 @@
+"""
+数据驱动的提取规则模块
+从 config/extraction_rules/<平台>.json 加载选择器规则，每个进程只编译一次，
+单值字段（标题、正文、作者）按命中率定期调整规则顺序，常见情况下只需执行一次选择器；
+列表字段（图片）按配置顺序执行全部具体规则并合并结果；
+标记为 fallback 的通用规则（如 img、title）固定排在最后，只在具体规则都未命中时使用
+"""
+
+import json
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Union
+
+import soupsieve
+
+from config.settings import EXTRACTION_RULES_DIR
+
+# 每记录多少次命中/未命中重新排序一次规则
+REORDER_INTERVAL = 32
+
+
+class ExtractionRule:
+    """单条提取规则（预编译的CSS选择器及其命中统计）"""
+
+    __slots__ = ("selector", "compiled", "fallback", "hits", "misses")
+
+    def __init__(self, selector: str, fallback: bool = False):
+        """
+        初始化规则
+
+        Args:
+            selector: CSS选择器
+            fallback: 是否为兜底规则（固定排在最后，不参与按命中率排序）
+        """
+        self.selector = selector
+        self.compiled = soupsieve.compile(selector)
+        self.fallback = fallback
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """平滑后的命中率，未使用过的规则为0.5"""
+        return (self.hits + 1) / (self.hits + self.misses + 2)
+
+
+class RuleSet:
+    """某个平台某个字段的一组提取规则"""
+
+    def __init__(self, field: str, selectors: List[Union[str, dict]], min_length: int = 1,
+                 attributes: Optional[List[str]] = None, reorder_interval: int = REORDER_INTERVAL):
+        """
+        初始化规则集
+
+        Args:
+            field: 字段名
+            selectors: CSS选择器列表（初始顺序），元素为选择器字符串或 {"selector": ..., "fallback": true}
+            min_length: 提取结果的最小长度，不足视为未命中
+            attributes: 取值时依次尝试的属性（图片规则使用）
+            reorder_interval: 每记录多少次命中/未命中重新排序一次
+        """
+        self.field = field
+        self.min_length = min_length
+        self.attributes = attributes or []
+        self.reorder_interval = max(1, reorder_interval)
+        rules = [ExtractionRule(spec) if isinstance(spec, str)
+                 else ExtractionRule(spec["selector"], spec.get("fallback", False))
+                 for spec in selectors]
+        self._specific = [rule for rule in rules if not rule.fallback]
+        self._ranked = list(self._specific)
+        self._fallbacks = [rule for rule in rules if rule.fallback]
+        self.rules = self._ranked + self._fallbacks
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _record(self, rule: ExtractionRule, hit: bool) -> None:
+        """
+        记录命中情况，每 reorder_interval 次按命中率重新排序具体规则
+
+        兜底规则只在具体规则都未命中时执行，其命中率不能与具体规则比较，始终按配置顺序排在最后；
+        排序稳定，命中率相同时保持配置顺序
+        """
+        with self._lock:
+            if hit:
+                rule.hits += 1
+            else:
+                rule.misses += 1
+            self._pending += 1
+            if self._pending < self.reorder_interval:
+                return
+            self._pending = 0
+            self._ranked = sorted(self._ranked, key=lambda r: r.hit_rate, reverse=True)
+            self.rules = self._ranked + self._fallbacks
+
+    def _record_hit(self, rule: ExtractionRule, hit: bool) -> None:
+        """只记录命中统计，不调整顺序（列表字段使用）"""
+        with self._lock:
+            if hit:
+                rule.hits += 1
+            else:
+                rule.misses += 1
+
+    def first_match(self, soup, get_value: Callable) -> Optional[object]:
+        """
+        按当前顺序依次执行规则，返回第一个有效结果
+
+        Args:
+            soup: BeautifulSoup对象
+            get_value: 从匹配元素取值的函数，返回假值表示无效
+
+        Returns:
+            Optional[object]: 第一个有效结果，全部未命中时返回None
+        """
+        for rule in list(self.rules):
+            element = rule.compiled.select_one(soup)
+            value = get_value(element) if element is not None else None
+            if value and len(value) >= self.min_length:
+                self._record(rule, True)
+                return value
+            self._record(rule, False)
+        return None
+
+    def all_matches(self, soup, get_values: Callable) -> list:
+        """
+        按配置顺序执行全部具体规则并合并结果（列表字段，不参与重新排序）；
+        具体规则都未取到结果时再依次执行兜底规则
+
+        Args:
+            soup: BeautifulSoup对象
+            get_values: 从匹配元素列表取值的函数，返回列表
+
+        Returns:
+            list: 合并后的结果列表（可能有重复，由调用方去重）
+        """
+        merged = []
+        for rule in self._specific:
+            values = get_values(rule.compiled.select(soup))
+            self._record_hit(rule, bool(values))
+            merged.extend(values)
+        if merged:
+            return merged
+        for rule in self._fallbacks:
+            values = get_values(rule.compiled.select(soup))
+            self._record_hit(rule, bool(values))
+            if values:
+                return values
+        return []
+
+    def stats(self) -> List[dict]:
+        """返回当前顺序下各规则的命中统计"""
+        return [
+            {"selector": r.selector, "fallback": r.fallback, "hits": r.hits, "misses": r.misses,
+             "hit_rate": round(r.hit_rate, 3)}
+            for r in self.rules
+        ]
+
+
+@lru_cache(maxsize=None)
+def load_rules(platform: str) -> Dict[str, RuleSet]:
+    """
+    加载并编译平台的提取规则（每个进程只加载一次）
+
+    Args:
+        platform: 平台名，对应规则文件名
+
+    Returns:
+        Dict[str, RuleSet]: 字段名到规则集的映射
+    """
+    rules_file = Path(EXTRACTION_RULES_DIR) / f"{platform}.json"
+    with open(rules_file, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    return {
+        field: RuleSet(field, spec["rules"], spec.get("min_length", 1), spec.get("attributes"))
+        for field, spec in config.items()
+    }
+
+
+def get_rule_set(platform: str, field: str) -> RuleSet:
+    """获取平台某个字段的规则集"""
+    return load_rules(platform)[field]
+
+
+def reload_extraction_rules() -> None:
+    """丢弃已加载的规则（及其统计），下次使用时重新读取规则文件"""
+    load_rules.cache_clear()
+
+
+def rule_stats(platform: str) -> Dict[str, List[dict]]:
+    """
+    获取平台所有规则的命中统计
+
+    Args:
+        platform: 平台名
+
+    Returns:
+        Dict[str, List[dict]]: 字段名到规则统计的映射
+    """
+    return {field: rule_set.stats() for field, rule_set in load_rules(platform).items()}
@@ -0,0 +1,74 @@
+"""
+跨进程文件锁
+基于 fcntl.lockf（POSIX记录锁，NFS上由lockd支持），让多个进程、多台主机可以安全地读改写同一个状态文件；
+Windows 上使用 msvcrt.locking（只支持独占锁，共享锁按独占锁处理）
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    # Windows 没有 fcntl
+    fcntl = None
+    import msvcrt
+
+# 同一进程内的线程先在这里排队，fcntl锁只在进程之间互斥
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+
+def _thread_lock(path: str) -> threading.Lock:
+    with _thread_locks_guard:
+        return _thread_locks.setdefault(path, threading.Lock())
+
+
+@contextmanager
+def locked(path, shared: bool = False):
+    """
+    持有 <path>.lock 上的文件锁
+
+    Args:
+        path: 被保护的文件路径
+        shared: 是否只获取共享锁（只读时使用）
+    """
+    lock_path = str(Path(path)) + ".lock"
+    os.makedirs(os.path.dirname(lock_path) or ".", exist_ok=True)
+    with _thread_lock(lock_path):
+        # lockf的共享锁要求以读方式打开，独占锁要求以写方式打开
+        fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            _lock_fd(fd, shared)
+            try:
+                yield
+            finally:
+                _unlock_fd(fd)
+        finally:
+            os.close(fd)
+
+
+def _lock_fd(fd: int, shared: bool) -> None:
+    """阻塞直到获得文件锁"""
+    if fcntl is not None:
+        fcntl.lockf(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        return
+    # msvcrt.locking 锁定从当前位置开始的字节，LK_LOCK 重试约10秒后抛出 OSError，继续等待
+    os.lseek(fd, 0, os.SEEK_SET)
+    while True:
+        try:
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            continue
+
+
+def _unlock_fd(fd: int) -> None:
+    """释放文件锁"""
+    if fcntl is not None:
+        fcntl.lockf(fd, fcntl.LOCK_UN)
+        return
+    os.lseek(fd, 0, os.SEEK_SET)
+    msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
@@ -0,0 +1,51 @@
+"""
+共享HTTP会话
+进程内所有请求复用同一个 requests.Session 的连接池，长时间运行的进程中TLS连接保持温热。
+会话被多个线程共用、处理互不相关的链接，因此不保存Cookie（单个请求的重定向过程中仍会携带）
+"""
+
+import os
+import threading
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config.settings import HTTP_CONFIG
+
+_lock = threading.Lock()
+
+# 拒绝所有Cookie：上一个链接的响应设置的Cookie不会带到下一个无关的链接
+_NO_COOKIES = DefaultCookiePolicy(allowed_domains=[])
+_session = None
+_session_pid = None
+
+
+def get_session() -> requests.Session:
+    """
+    获取进程内共享的HTTP会话（fork出的子进程会新建会话，不与父进程共用连接）
+
+    Returns:
+        requests.Session: 会话
+    """
+    global _session, _session_pid
+    if _session is None or _session_pid != os.getpid():
+        with _lock:
+            if _session is None or _session_pid != os.getpid():
+                session = requests.Session()
+                session.cookies.set_policy(_NO_COOKIES)
+                adapter = HTTPAdapter(pool_connections=HTTP_CONFIG["pool_connections"],
+                                      pool_maxsize=HTTP_CONFIG["pool_maxsize"])
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session, _session_pid = session, os.getpid()
+    return _session
+
+
+def close_session() -> None:
+    """关闭共享会话及其连接池（进程退出前调用）"""
+    global _session
+    with _lock:
+        if _session is not None:
+            _session.close()
+            _session = None
@@ -0,0 +1,138 @@
+"""
+快照 + 追加日志的状态文件
+多个进程共享的状态保存为 <名称>.json 快照和 <名称>.<代>.log 追加日志（每行一条变化记录）。
+每次修改只向日志追加一行，各进程在内存中缓存状态，只读取上次之后新增的日志；
+日志行数超过压缩阈值（且超过状态条目数）时压缩成新一代快照，平均每次修改的开销与状态大小无关。
+所有方法都要求调用方持有 file_lock.locked(journal.path)
+"""
+
+import json
+import os
+import socket
+from pathlib import Path
+from typing import Callable, Iterable
+
+# 内存状态需要从快照重新加载（与"快照不存在"区分）
+_STALE = object()
+
+
+class Journal:
+    """快照 + 追加日志"""
+
+    def __init__(self, path, compact_lines: int = 1000):
+        """
+        初始化
+
+        Args:
+            path: 快照文件路径，日志与其位于同一目录
+            compact_lines: 日志至少达到该行数才压缩
+        """
+        self.path = Path(path)
+        self.compact_lines = compact_lines
+        self.generation = 0
+        self._snapshot_key = _STALE
+        self._log_offset = 0
+        self._log_lines = 0
+
+    def _log_path(self) -> Path:
+        """当前一代快照对应的追加日志"""
+        return self.path.with_name(f"{self.path.stem}.{self.generation}.log")
+
+    def sync(self, load: Callable[[dict], None], apply: Callable[[dict], None]) -> None:
+        """
+        把内存中的状态更新到磁盘上的最新状态
+
+        快照未变化时只读取上次之后追加的日志；快照被其他进程压缩替换（或首次读取）时先重新加载快照
+
+        Args:
+            load: 用快照内容（不存在或损坏时为空字典）重置内存状态的函数
+            apply: 把一条日志记录应用到内存状态的函数
+        """
+        try:
+            stat = os.stat(self.path)
+            key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            key = None
+        if key != self._snapshot_key:
+            state = {}
+            if key is not None:
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        state = json.load(f)
+                except ValueError:
+                    state = {}
+            self.generation = state.get("generation", 0)
+            load(state)
+            self._snapshot_key = key
+            self._log_offset = self._log_lines = 0
+
+        try:
+            with open(self._log_path(), 'rb') as f:
+                f.seek(self._log_offset)
+                data = f.read()
+        except FileNotFoundError:
+            data = b""
+        # 只读取完整的行，崩溃的写入者留下的半行由下一次写入截断
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            apply(json.loads(line))
+            self._log_lines += 1
+        self._log_offset += end
+
+    def append(self, records: Iterable[dict], size: int, snapshot: Callable[[], dict]) -> None:
+        """
+        把变化记录追加到日志（调用方需持有独占锁，并已调用 sync），必要时压缩
+
+        Args:
+            records: 变化记录
+            size: 当前状态的条目数（日志超过该行数时才压缩）
+            snapshot: 生成快照内容的函数（压缩时调用）
+        """
+        data = "".join(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n"
+                       for record in records).encode('utf-8')
+        if not data:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self._log_path(), 'ab') as f:
+                f.truncate(self._log_offset)
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+        except BaseException:
+            # 内存中的状态已修改但未写入，下次重新从磁盘加载
+            self.invalidate()
+            raise
+        self._log_offset += len(data)
+        self._log_lines += data.count(b"\n")
+        if self._log_lines >= max(self.compact_lines, size):
+            self.compact(snapshot())
+
+    def compact(self, state: dict) -> None:
+        """
+        把当前状态写成新一代快照并删除旧日志（调用方需持有独占锁）
+
+        Args:
+            state: 快照内容（generation 字段由这里填写）
+        """
+        old_log = self._log_path()
+        self.generation += 1
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # 先写临时文件再替换，NFS上同样是原子的
+        tmp_path = self.path.with_name(f"{self.path.name}.{socket.gethostname()}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({**state, "generation": self.generation}, f, ensure_ascii=False, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        stat = os.stat(self.path)
+        self._snapshot_key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        self._log_offset = self._log_lines = 0
+        try:
+            os.unlink(old_log)
+        except FileNotFoundError:
+            pass
+
+    def invalidate(self) -> None:
+        """丢弃缓存的位置，下次 sync 时重新加载快照"""
+        self._snapshot_key = _STALE
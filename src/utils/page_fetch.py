@@ -0,0 +1,197 @@
+"""
+流式页面抓取模块
+边下载边用轻量扫描器检查页面中需要的区块（如页面状态JSON、正文容器、og元信息），
+全部到齐后立即停止读取，不再下载页面末尾大段的内联脚本；同时限制单个页面的最大字节数
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Iterable, Optional, Tuple
+
+from config.settings import PAGE_FETCH_CONFIG
+
+from .concurrency import get_concurrency_controller
+from .http_client import get_session
+
+# 查找区块起始标记时，保留上次扫描末尾的字节数（标记可能跨越两个数据块）
+_OVERLAP = 4096
+
+_META_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.I)
+
+
+class PageBlock:
+    """页面中需要的一个区块"""
+
+    __slots__ = ("name", "start", "end", "tag")
+
+    def __init__(self, name: str, start: Optional[bytes] = None, end: Optional[bytes] = None,
+                 tag: Optional[str] = None):
+        """
+        定义区块
+
+        Args:
+            name: 区块名称
+            start: 起始标记（字节正则），None表示从页面开头开始
+            end: 结束标记（字节正则）
+            tag: 起始标记是该标签的开始标签时，按同名标签的嵌套层数找到对应的结束标签（用于正文容器）
+        """
+        self.name = name
+        self.start = re.compile(start, re.I) if start else None
+        self.end = re.compile(end, re.I) if end else None
+        self.tag = re.compile(rb'<(/?)%s\b[^>]*>' % tag.encode(), re.I) if tag else None
+
+
+class BlockScanner:
+    """增量扫描器：累积读取到的字节，记录每个区块的扫描位置，避免重复扫描"""
+
+    def __init__(self, blocks: Iterable[PageBlock]):
+        """
+        初始化扫描器
+
+        Args:
+            blocks: 需要的区块
+        """
+        self.buffer = bytearray()
+        self.found = []
+        # 每个未完成区块的状态：[区块, 扫描位置, 是否已找到起始标记, 标签嵌套层数]
+        self._pending = [[block, 0, block.start is None, 0] for block in blocks]
+
+    @property
+    def done(self) -> bool:
+        """需要的区块是否都已到齐（没有要求任何区块时始终为False，即读完整个页面）"""
+        return bool(self.found) and not self._pending
+
+    def feed(self, chunk: bytes) -> bool:
+        """
+        追加一段数据并继续扫描
+
+        Args:
+            chunk: 新读到的字节
+
+        Returns:
+            bool: 需要的区块是否都已到齐
+        """
+        self.buffer += chunk
+        self._pending = [state for state in self._pending if not self._advance(state)]
+        return self.done
+
+    def _advance(self, state: list) -> bool:
+        """继续扫描单个区块，找到完整区块时返回True"""
+        block, pos, started, depth = state
+        buffer = self.buffer
+        if not started:
+            match = block.start.search(buffer, pos)
+            if not match:
+                state[1] = max(pos, len(buffer) - _OVERLAP)
+                return False
+            pos, started = match.end(), True
+            depth = 1 if block.tag else 0
+
+        if block.tag:
+            for match in block.tag.finditer(buffer, pos):
+                pos = match.end()
+                if match.group(1):
+                    depth -= 1
+                elif not match.group(0).endswith(b'/>'):
+                    depth += 1
+                if depth == 0:
+                    self.found.append(block.name)
+                    return True
+            # 最后一个'<'之后可能是尚未读完的标签，下次从那里继续
+            last_open = buffer.rfind(b'<', pos)
+            state[1:] = [last_open if last_open >= 0 else len(buffer), started, depth]
+            return False
+
+        if block.end is None or block.end.search(buffer, pos):
+            self.found.append(block.name)
+            return True
+        state[1:] = [max(pos, len(buffer) - _OVERLAP), started, depth]
+        return False
+
+
+@dataclass(slots=True)
+class FetchedPage:
+    """流式抓取到的页面"""
+
+    url: str
+    status_code: int
+    encoding: str
+    content: bytes
+    complete: bool               # 是否读到了页面末尾
+    truncated: bool              # 是否因超过最大字节数而停止
+    blocks: Tuple[str, ...]      # 已到齐的区块
+    content_length: Optional[int] = None
+
+    @property
+    def text(self) -> str:
+        """页面文本"""
+        return self.content.decode(self.encoding, errors="replace")
+
+
+def _detect_encoding(content_type: str, head: bytes) -> str:
+    """按响应头的charset、页面开头的<meta charset>顺序确定编码，默认utf-8"""
+    match = re.search(r'charset=["\']?([\w-]+)', content_type or '', re.I)
+    if match:
+        return match.group(1)
+    match = _META_CHARSET.search(head)
+    return match.group(1).decode('ascii') if match else 'utf-8'
+
+
+def fetch_page(url: str, blocks: Iterable[PageBlock] = (), headers: Optional[dict] = None,
+               timeout: Optional[int] = None, max_bytes: Optional[int] = None,
+               encoding: Optional[str] = None) -> FetchedPage:
+    """
+    在URL所属域名的并发限制内流式抓取页面，需要的区块到齐后停止读取
+
+    Args:
+        url: 页面URL
+        blocks: 需要的区块，为空时读取整个页面
+        headers: 请求头
+        timeout: 超时时间（秒）
+        max_bytes: 最多读取的字节数，默认读取配置
+        encoding: 强制使用的文本编码，默认按响应头和<meta charset>判断
+
+    Returns:
+        FetchedPage: 页面
+
+    Raises:
+        requests.RequestException: 请求失败
+    """
+    if max_bytes is None:
+        max_bytes = PAGE_FETCH_CONFIG["max_bytes"]
+    early_stop = PAGE_FETCH_CONFIG["early_stop"]
+    scanner = BlockScanner(blocks)
+
+    with get_concurrency_controller().slot(url) as slot, \
+            get_session().get(url, headers=headers, stream=True, timeout=timeout, allow_redirects=True) as response:
+        slot.mark_response(response.status_code)
+        response.raise_for_status()
+
+        encoded = bool(response.headers.get('Content-Encoding'))
+        content_length = int(response.headers.get('Content-Length') or 0) or None
+        complete, truncated = True, False
+        chunks = response.iter_content(chunk_size=PAGE_FETCH_CONFIG["chunk_size"])
+        for chunk in chunks:
+            if len(scanner.buffer) + len(chunk) > max_bytes:
+                scanner.feed(chunk[:max_bytes - len(scanner.buffer)])
+                complete, truncated = False, True
+                break
+            if scanner.feed(chunk) and early_stop:
+                # 剩余部分很少时读完，连接可以放回连接池复用
+                remaining = content_length - response.raw.tell() if content_length and not encoded else None
+                if remaining is not None and remaining <= PAGE_FETCH_CONFIG["drain_bytes"]:
+                    continue
+                complete = False
+                break
+
+        content = bytes(scanner.buffer)
+        return FetchedPage(
+            url=response.url,
+            status_code=response.status_code,
+            encoding=encoding or _detect_encoding(response.headers.get('Content-Type', ''), content[:4096]),
+            content=content,
+            complete=complete,
+            truncated=truncated,
+            blocks=tuple(scanner.found),
+            content_length=content_length,
+        )
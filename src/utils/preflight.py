@@ -0,0 +1,269 @@
+"""
+下载预检模块
+在真正下载前通过HEAD请求（或只读取前几个字节）检查类型、大小和ETag，过滤掉不需要的资源
+"""
+
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlparse
+
+import requests
+
+from config.settings import DOWNLOAD_CONFIG, PREFLIGHT_CONFIG
+
+from .file_lock import locked
+from .http_client import get_session
+from .journal import Journal
+
+
+# 常见图片格式的文件头
+IMAGE_SIGNATURES = [
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'BM', 'image/bmp'),
+]
+
+# 无法说明真实类型的Content-Type，需要读取文件头判断
+GENERIC_CONTENT_TYPES = ('', 'application/octet-stream', 'binary/octet-stream')
+
+
+def sniff_content_type(head: bytes) -> Optional[str]:
+    """
+    根据文件头判断图片类型
+
+    Args:
+        head: 文件开头的字节
+
+    Returns:
+        Optional[str]: 识别出的MIME类型，无法识别时返回None
+    """
+    for signature, mime in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return mime
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    if head[4:8] == b'ftyp' and head[8:12] in (b'avif', b'avis', b'heic', b'heix', b'mif1'):
+        return 'image/avif' if head[8:11] == b'avi' else 'image/heic'
+    return None
+
+
+class ETagIndex:
+    """
+    ETag索引类，记录已下载资源的ETag及其本地路径
+
+    ETag只在同一个服务器内有意义（nginx等按 修改时间-大小 生成的ETag在不同服务器之间会重复），
+    因此按 (域名, ETag) 索引。多个进程共享索引文件：每次下载只追加一行日志，定期压缩成快照
+    """
+
+    def __init__(self, index_file: Optional[str] = None):
+        """
+        初始化ETag索引
+
+        Args:
+            index_file: 索引文件路径
+        """
+        self.index_file = Path(index_file or PREFLIGHT_CONFIG["etag_index_file"])
+        self._lock = threading.Lock()
+        self._journal = Journal(self.index_file)
+        self._entries = {}
+        # 正在下载的 (域名, ETag)：并发批次中相同资源只下载一次，其余等待下载完成
+        self._pending = {}
+
+    @staticmethod
+    def key(url: str, etag: str) -> str:
+        """索引键：域名 + ETag"""
+        return f"{(urlparse(url).hostname or '').lower()} {etag}"
+
+    def _load(self, state: dict) -> None:
+        """用快照内容重置内存中的索引（兼容旧版本的 {键: 路径} 格式）"""
+        entries = state.get("entries", state)
+        self._entries = {key: path for key, path in entries.items() if isinstance(path, str)}
+
+    def _replay(self, record: dict) -> None:
+        """应用一条日志记录"""
+        self._entries[record["key"]] = record["path"]
+
+    def _sync(self) -> dict:
+        """读取其他进程追加的记录（调用方需持有文件锁和 self._lock）"""
+        self._journal.sync(self._load, self._replay)
+        return self._entries
+
+    def lookup(self, url: str, etag: str) -> Optional[str]:
+        """
+        查询ETag对应的本地文件
+
+        Args:
+            url: 资源URL
+            etag: 资源ETag
+
+        Returns:
+            Optional[str]: 本地文件仍存在时返回其路径，否则返回None
+        """
+        with locked(self.index_file, shared=True), self._lock:
+            path = self._sync().get(self.key(url, etag))
+        if path and os.path.exists(path):
+            return path
+        return None
+
+    def claim(self, url: str, etag: str) -> Optional[threading.Event]:
+        """
+        登记即将下载该资源
+
+        Args:
+            url: 资源URL
+            etag: 资源ETag
+
+        Returns:
+            Optional[threading.Event]: 登记成功返回None（调用方下载后调用 add 或 release）；
+            已有其他线程在下载时返回其完成事件
+        """
+        key = self.key(url, etag)
+        with self._lock:
+            event = self._pending.get(key)
+            if event is None:
+                self._pending[key] = threading.Event()
+            return event
+
+    def release(self, url: str, etag: str) -> None:
+        """放弃登记（下载失败时调用），唤醒等待的线程"""
+        with self._lock:
+            event = self._pending.pop(self.key(url, etag), None)
+        if event:
+            event.set()
+
+    def add(self, url: str, etag: str, filepath: Path) -> None:
+        """
+        记录ETag并持久化
+
+        Args:
+            url: 资源URL
+            etag: 资源ETag
+            filepath: 本地文件路径
+        """
+        record = {"key": self.key(url, etag), "path": str(filepath)}
+        try:
+            # 先读取其他进程追加的记录再追加，互不覆盖
+            with locked(self.index_file), self._lock:
+                self._sync()
+                self._replay(record)
+                self._journal.append([record], len(self._entries), lambda: {"entries": self._entries})
+        finally:
+            self.release(url, etag)
+
+
+_etag_index = None
+
+
+def get_etag_index() -> ETagIndex:
+    """获取进程内共享的ETag索引"""
+    global _etag_index
+    if _etag_index is None:
+        _etag_index = ETagIndex()
+    return _etag_index
+
+
+def _probe_head_bytes(url: str, timeout: int, headers: Optional[dict]) -> dict:
+    """用Range请求只读取资源开头的若干字节"""
+    range_headers = dict(headers or {})
+    range_headers['Range'] = f"bytes=0-{PREFLIGHT_CONFIG['sniff_bytes'] - 1}"
+    response = get_session().get(url, headers=range_headers, stream=True, timeout=timeout)
+    try:
+        response.raise_for_status()
+        # 按Content-Encoding解压后再判断文件头
+        head = response.raw.read(PREFLIGHT_CONFIG['sniff_bytes'], decode_content=True)
+        info = {
+            "content_type": sniff_content_type(head),
+            "etag": response.headers.get('ETag'),
+            "content_length": None,
+        }
+        # 206响应的总长度在Content-Range中，如 "bytes 0-31/12345"
+        total = re.search(r'/(\d+)$', response.headers.get('Content-Range', ''))
+        if total:
+            info["content_length"] = int(total.group(1))
+        elif response.status_code == 200 and response.headers.get('Content-Length'):
+            info["content_length"] = int(response.headers['Content-Length'])
+        return info
+    finally:
+        response.close()
+
+
+def preflight_check(url: str, timeout: Optional[int] = None,
+                    headers: Optional[dict] = None,
+                    etag_index: Optional[ETagIndex] = None) -> dict:
+    """
+    下载前检查资源是否值得下载
+
+    信息不足时默认放行，预检失败不会阻止下载
+
+    Args:
+        url: 资源URL
+        timeout: 超时时间（秒）
+        headers: 请求头
+        etag_index: ETag索引，默认使用共享索引
+
+    Returns:
+        dict: 包含 ok、reason、content_type、content_length、etag、duplicate_of 的检查结果；
+        放行且带强ETag时已在索引中登记下载，调用方下载成功后调用 add，失败时调用 release
+    """
+    if timeout is None:
+        timeout = DOWNLOAD_CONFIG["timeout"]
+    if etag_index is None:
+        etag_index = get_etag_index()
+
+    result = {"ok": True, "reason": "", "content_type": None, "content_length": None, "etag": None,
+              "duplicate_of": None}
+
+    try:
+        response = get_session().head(url, headers=headers, allow_redirects=True, timeout=timeout)
+        if response.status_code < 400:
+            content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+            length = response.headers.get('Content-Length')
+            result.update({
+                "content_type": content_type or None,
+                "content_length": int(length) if length and length.isdigit() else None,
+                "etag": response.headers.get('ETag'),
+            })
+
+        if response.status_code >= 400 or (result["content_type"] or '') in GENERIC_CONTENT_TYPES:
+            probed = _probe_head_bytes(url, timeout, headers)
+            for key, value in probed.items():
+                if value is not None:
+                    result[key] = value
+    except (requests.RequestException, OSError):
+        return result
+
+    content_type = result["content_type"]
+    if content_type and not content_type.startswith(tuple(PREFLIGHT_CONFIG["allowed_types"])):
+        result.update(ok=False, reason=f"非图片类型 {content_type}")
+        return result
+
+    length = result["content_length"]
+    if length is not None:
+        if length < PREFLIGHT_CONFIG["min_bytes"]:
+            result.update(ok=False, reason=f"文件过小 ({length} bytes)")
+            return result
+        if PREFLIGHT_CONFIG["max_bytes"] and length > PREFLIGHT_CONFIG["max_bytes"]:
+            result.update(ok=False, reason=f"文件过大 ({length} bytes)")
+            return result
+
+    # 弱ETag（W/前缀）不保证字节一致，不用于去重
+    etag = result["etag"]
+    if etag and not etag.startswith('W/'):
+        while True:
+            existing = etag_index.lookup(url, etag)
+            if existing:
+                # 不重复下载，由调用方链接或复制已有文件
+                result.update(ok=False, reason=f"已存在相同文件 {existing}", duplicate_of=existing)
+                break
+            pending = etag_index.claim(url, etag)
+            if pending is None:
+                break
+            # 同一批次中相同资源正在下载，等待完成后再查询；对方下载失败时由本线程下载
+            pending.wait(timeout)
+
+    return result
@@ -0,0 +1,309 @@
+"""
+性能分析模块
+为任意工具提供 --profile 选项：按流水线阶段收集 cProfile 统计和 tracemalloc 内存分配，
+并输出可直接用于火焰图（flamegraph.pl / speedscope）的折叠调用栈文件。
+批量模式下可以只对一定比例的条目采样：内存跟踪和调用栈采样只在采样条目执行期间开启，
+内存快照只在采样条目结束时获取，未采样的条目几乎没有额外开销，便于在生产环境中长期开启
+"""
+
+import atexit
+import cProfile
+import io
+import pstats
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Optional
+
+from . import events
+
+
+class Profiler:
+    """按阶段统计的性能分析器"""
+
+    def __init__(self, output_dir: str = "profile_output", sample_rate: float = 1.0,
+                 sample_interval: float = 0.005, top_allocations: int = 15):
+        """
+        初始化性能分析器
+
+        Args:
+            output_dir: 报告输出目录
+            sample_rate: 批量模式下被分析条目的比例（0~1）
+            sample_interval: 调用栈采样间隔（秒）
+            top_allocations: 每个阶段保留的内存分配条目数
+        """
+        self.output_dir = Path(output_dir)
+        self.sample_rate = sample_rate
+        self.sample_interval = sample_interval
+        self.top_allocations = top_allocations
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._profiles = defaultdict(cProfile.Profile)
+        self._allocations = defaultdict(Counter)
+        self._stage_times = defaultdict(float)
+        self._stage_calls = Counter()
+        self._stacks = Counter()
+        self._active_threads = {}
+        self._items = Counter()
+        self._item_allocations = Counter()
+        self._cprofile_busy = False
+        self._sampled_active = 0
+        self._window_stages = {}
+        self._window_items = 0
+        self._stop = None
+        self._sampler = None
+
+    def start(self) -> None:
+        """开始分析（内存跟踪和调用栈采样在第一个采样条目开始时才开启，这里无需启动任何组件）"""
+
+    def _begin_sampled(self) -> None:
+        """采样条目开始：没有其他采样条目时开启内存跟踪和调用栈采样"""
+        with self._lock:
+            self._sampled_active += 1
+            if self._sampled_active == 1:
+                # 报告只按分配所在的代码行汇总，只记录一层调用栈
+                tracemalloc.start(1)
+                self._stop = threading.Event()
+                self._sampler = threading.Thread(target=self._sample_stacks, args=(self._stop,),
+                                                 name="profiler-sampler", daemon=True)
+                self._sampler.start()
+
+    def _end_sampled(self, stages: list) -> None:
+        """
+        采样条目结束：最后一个并发的采样条目结束时获取一次内存快照，
+        跟踪期间分配且仍未释放的内存归入这些条目包含的阶段，然后停止跟踪和采样
+        """
+        with self._lock:
+            self._window_stages.update(dict.fromkeys(stages or ["item"]))
+            self._window_items += 1
+            self._sampled_active -= 1
+            if self._sampled_active:
+                return
+            self._stop.set()
+            self._sampler = None
+            label = "+".join(self._window_stages)
+            self._item_allocations[label] += self._window_items
+            # 跟踪在本窗口开始时才开启，快照中的分配都发生在采样条目执行期间
+            for stat in tracemalloc.take_snapshot().statistics("lineno")[:self.top_allocations]:
+                frame = stat.traceback[0]
+                self._allocations[label][f"{frame.filename}:{frame.lineno}"] += stat.size
+            tracemalloc.stop()
+            self._window_stages = {}
+            self._window_items = 0
+
+    @contextmanager
+    def item(self):
+        """
+        批量模式下包裹单个条目，按采样比例决定该条目内的阶段是否被分析
+        """
+        sampled = random.random() < self.sample_rate
+        with self._lock:
+            self._items["sampled" if sampled else "skipped"] += 1
+        previous = (getattr(self._local, "sampled", None), getattr(self._local, "item_stages", None))
+        self._local.sampled = sampled
+        self._local.item_stages = []
+        if sampled:
+            self._begin_sampled()
+        try:
+            yield sampled
+        finally:
+            if sampled:
+                self._end_sampled(self._local.item_stages)
+            self._local.sampled, self._local.item_stages = previous
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        分析一个流水线阶段（条目之外的阶段本身作为一个条目按比例采样）
+
+        Args:
+            name: 阶段名，如 fetch、parse、save、download
+        """
+        sampled = getattr(self._local, "sampled", None)
+        if sampled is None:
+            with self.item(), self.stage(name):
+                yield
+            return
+        if sampled is False:
+            yield
+            return
+
+        stack = getattr(self._local, "stages", None)
+        if stack is None:
+            stack = self._local.stages = []
+        nested = bool(stack)
+        if not nested and name not in self._local.item_stages:
+            self._local.item_stages.append(name)
+        stack.append(name)
+        thread_id = threading.get_ident()
+        self._active_threads[thread_id] = ";".join(stack)
+
+        # 同一时刻只能有一个cProfile处于启用状态，嵌套阶段和其他线程的并发阶段只计时和采样
+        profile = None
+        if not nested:
+            with self._lock:
+                if not self._cprofile_busy:
+                    self._cprofile_busy = True
+                    profile = self._profiles[name]
+        started = time.perf_counter()
+        if profile:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile:
+                profile.disable()
+                with self._lock:
+                    self._cprofile_busy = False
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._stage_times[name] += elapsed
+                self._stage_calls[name] += 1
+            stack.pop()
+            if stack:
+                self._active_threads[thread_id] = ";".join(stack)
+            else:
+                self._active_threads.pop(thread_id, None)
+
+    def _sample_stacks(self, stop: threading.Event) -> None:
+        """采样线程：采样条目执行期间定期记录处于分析阶段的线程的调用栈"""
+        while not stop.wait(self.sample_interval):
+            frames = sys._current_frames()
+            for thread_id, stage_path in list(self._active_threads.items()):
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+                    frame = frame.f_back
+                names.reverse()
+                self._stacks[stage_path + ";" + ";".join(names)] += 1
+
+    def write_report(self) -> Path:
+        """
+        停止分析并写出报告
+
+        输出文件：
+            <阶段>.prof        cProfile原始数据（可用 snakeviz / pstats 查看）
+            summary.txt        各阶段耗时、热点函数和内存分配
+            stacks.collapsed   折叠调用栈，可用 flamegraph.pl 或 speedscope 生成火焰图
+
+        Returns:
+            Path: 报告目录
+        """
+        with self._lock:
+            sampler = self._sampler
+            if self._stop:
+                self._stop.set()
+        if sampler:
+            sampler.join()
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        lines = ["# 性能分析报告", ""]
+        if self._items:
+            lines.append(f"采样条目: {self._items['sampled']}，跳过条目: {self._items['skipped']}")
+            lines.append("")
+
+        for name in sorted(self._stage_times, key=self._stage_times.get, reverse=True):
+            lines.append(f"## 阶段 {name}: {self._stage_calls[name]} 次，共 {self._stage_times[name]:.3f} 秒")
+            profile = self._profiles.get(name)
+            if profile is not None:
+                profile.dump_stats(str(self.output_dir / f"{name}.prof"))
+                buffer = io.StringIO()
+                pstats.Stats(profile, stream=buffer).sort_stats("cumulative").print_stats(15)
+                lines.append(buffer.getvalue())
+            lines.append("")
+
+        # 内存快照只在采样条目结束时获取，按条目包含的阶段汇总
+        for label, count in self._item_allocations.most_common():
+            if self._allocations[label]:
+                lines.append(f"## 内存分配（未释放字节）{label}: {count} 个采样条目")
+                for location, size in self._allocations[label].most_common(self.top_allocations):
+                    lines.append(f"  {size:>12,}  {location}")
+                lines.append("")
+
+        with open(self.output_dir / "summary.txt", 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines))
+
+        with open(self.output_dir / "stacks.collapsed", 'w', encoding='utf-8') as f:
+            for stack, count in self._stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        events.info("profile_written", f"📈 性能分析报告已保存到: {self.output_dir}", path=str(self.output_dir))
+        events.flush()
+        return self.output_dir
+
+
+_profiler = None
+
+
+def get_profiler() -> Optional[Profiler]:
+    """获取当前启用的性能分析器，未启用时返回None"""
+    return _profiler
+
+
+def start_profiling(output_dir: str = "profile_output", sample_rate: float = 1.0) -> Profiler:
+    """
+    启用全局性能分析，进程退出时自动写出报告
+
+    Args:
+        output_dir: 报告输出目录
+        sample_rate: 批量模式下被分析条目的比例（0~1）
+
+    Returns:
+        Profiler: 性能分析器
+    """
+    global _profiler
+    _profiler = Profiler(output_dir, sample_rate)
+    _profiler.start()
+    atexit.register(_profiler.write_report)
+    return _profiler
+
+
+def profile_stage(name: str):
+    """分析一个流水线阶段，未启用分析时开销可以忽略"""
+    return _profiler.stage(name) if _profiler else nullcontext()
+
+
+def profile_item():
+    """包裹批量模式中的单个条目，未启用分析时开销可以忽略"""
+    return _profiler.item() if _profiler else nullcontext()
+
+
+def add_profile_arguments(parser) -> None:
+    """
+    为命令行工具添加性能分析参数
+
+    Args:
+        parser: argparse.ArgumentParser
+    """
+    group = parser.add_argument_group('性能分析')
+    group.add_argument('--profile', nargs='?', const='profile_output', metavar='DIR',
+                       help='启用性能分析并将报告写入DIR（默认 profile_output）')
+    group.add_argument('--profile-sample', type=float, default=100, metavar='PERCENT',
+                       help='批量模式下被分析条目的百分比，默认100')
+
+
+def start_profiling_from_args(args) -> Optional[Profiler]:
+    """
+    根据 add_profile_arguments 添加的参数启用性能分析
+
+    Args:
+        args: argparse解析结果
+
+    Returns:
+        Optional[Profiler]: 启用时返回性能分析器
+    """
+    if not args.profile:
+        return None
+    return start_profiling(args.profile, max(0.0, min(args.profile_sample, 100)) / 100)
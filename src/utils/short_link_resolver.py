@@ -0,0 +1,164 @@
+"""
+短链接解析模块
+使用HEAD请求逐跳跟随重定向（不读取响应体），并将短链接到规范链接的映射缓存到磁盘
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+from urllib.parse import urljoin, urlparse
+
+import requests
+
+from config.settings import DOWNLOAD_CONFIG, SHORT_LINK_CONFIG
+
+from .http_client import get_session
+
+
+class ShortLinkCache:
+    """短链接缓存类，带过期时间的 短链接 -> 规范链接 磁盘映射"""
+
+    def __init__(self, cache_file: Optional[str] = None, ttl: Optional[int] = None):
+        """
+        初始化短链接缓存
+
+        Args:
+            cache_file: 缓存文件路径
+            ttl: 缓存有效期（秒）
+        """
+        self.cache_file = Path(cache_file or SHORT_LINK_CONFIG["cache_file"])
+        self.ttl = SHORT_LINK_CONFIG["ttl"] if ttl is None else ttl
+        self._lock = threading.Lock()
+        self._entries = None
+
+    def _load(self) -> dict:
+        """按需从磁盘加载缓存"""
+        if self._entries is None:
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def get(self, short_url: str) -> Optional[str]:
+        """
+        查询缓存
+
+        Args:
+            short_url: 短链接
+
+        Returns:
+            Optional[str]: 未过期的规范链接，未命中时返回None
+        """
+        with self._lock:
+            entry = self._load().get(short_url)
+            if entry and time.time() - entry.get("resolved_at", 0) < self.ttl:
+                return entry.get("url")
+        return None
+
+    def set(self, short_url: str, canonical_url: str) -> None:
+        """
+        写入缓存并持久化（先写临时文件再替换，避免写出半截文件）
+
+        Args:
+            short_url: 短链接
+            canonical_url: 解析得到的规范链接
+        """
+        with self._lock:
+            entries = self._load()
+            now = time.time()
+            # 顺便清理过期条目，防止缓存文件无限增长
+            for key in [k for k, v in entries.items() if now - v.get("resolved_at", 0) >= self.ttl]:
+                del entries[key]
+            entries[short_url] = {"url": canonical_url, "resolved_at": now}
+
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_file.with_name(self.cache_file.name + f".{os.getpid()}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entries, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.cache_file)
+
+
+_default_cache = None
+
+
+def get_short_link_cache() -> ShortLinkCache:
+    """获取进程内共享的短链接缓存"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ShortLinkCache()
+    return _default_cache
+
+
+def is_short_link(url: str) -> bool:
+    """
+    判断是否为需要解析的短链接
+
+    Args:
+        url: 链接
+
+    Returns:
+        bool: 域名属于配置的短链接域名时返回True
+    """
+    host = (urlparse(url).hostname or "").lower()
+    return any(host == h or host.endswith("." + h) for h in SHORT_LINK_CONFIG["hosts"])
+
+
+def _fetch_redirect(url: str, headers: Optional[dict], timeout: int) -> requests.Response:
+    """发起不读取响应体的单跳请求，服务器不支持HEAD时退回流式GET"""
+    response = get_session().head(url, headers=headers, allow_redirects=False, timeout=timeout)
+    if response.status_code in (405, 501):
+        response = get_session().get(url, headers=headers, allow_redirects=False, timeout=timeout, stream=True)
+        # 只需要响应头，直接关闭连接不读取响应体
+        response.close()
+    return response
+
+
+def resolve_short_link(url: str,
+                       headers: Optional[dict] = None,
+                       timeout: Optional[int] = None,
+                       is_resolved: Optional[Callable[[str], object]] = None,
+                       use_cache: bool = True) -> str:
+    """
+    解析短链接得到规范链接
+
+    逐跳跟随重定向，一旦某一跳的链接已满足 is_resolved（例如已能解析出笔记ID）就立即停止
+
+    Args:
+        url: 短链接
+        headers: 请求头
+        timeout: 单跳超时时间（秒）
+        is_resolved: 判断链接是否已可用的函数，返回真值即停止跟随
+        use_cache: 是否使用磁盘缓存
+
+    Returns:
+        str: 规范链接
+    """
+    if timeout is None:
+        timeout = DOWNLOAD_CONFIG["timeout"]
+
+    cache = get_short_link_cache() if use_cache else None
+    if cache:
+        cached = cache.get(url)
+        if cached:
+            return cached
+
+    current = url
+    for _ in range(SHORT_LINK_CONFIG["max_hops"]):
+        response = _fetch_redirect(current, headers, timeout)
+        location = response.headers.get('Location')
+        if not response.is_redirect or not location:
+            break
+
+        current = urljoin(current, location)
+        if is_resolved and is_resolved(current):
+            break
+
+    if cache and current != url:
+        cache.set(url, current)
+
+    return current
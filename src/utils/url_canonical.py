@@ -0,0 +1,123 @@
+"""
+图片URL规范化模块
+把同一张图片在不同CDN域名、尺寸/格式后缀、统计参数下的变体映射为唯一的原图URL
+"""
+
+import re
+from typing import Iterable, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+from config.settings import CANONICAL_URL_CONFIG
+
+
+# 小红书图片CDN路径开头的 时间戳/签名 两段，如 /202410211234/0123...cdef/
+_XHS_SIGNED_PREFIX = re.compile(r'^/\d{12}/[0-9a-f]{32}(?=/)')
+
+
+def detect_platform(url: str) -> Optional[str]:
+    """
+    根据域名判断图片所属平台
+
+    Args:
+        url: 图片URL
+
+    Returns:
+        Optional[str]: "xhs"、"wechat"，无法识别时返回None
+    """
+    host = (urlparse(url).hostname or "").lower()
+    if host.endswith(("xhscdn.com", "xiaohongshu.com")):
+        return "xhs"
+    if host.endswith(("qpic.cn", "qlogo.cn")) and "mmbiz" in host:
+        return "wechat"
+    return None
+
+
+def canonicalize_xhs_image_url(url: str) -> str:
+    """
+    规范化小红书图片URL
+
+    去掉 !nd_dft_wlteh_webp_3 一类的样式后缀、imageView2 处理参数和签名前缀，
+    统一到配置的原图域名
+
+    Args:
+        url: 图片URL
+
+    Returns:
+        str: 原图URL
+    """
+    parsed = urlparse(url)
+    host = (parsed.hostname or "").lower()
+    path = parsed.path.split('!', 1)[0]
+
+    if not host.startswith(tuple(CANONICAL_URL_CONFIG["xhs_image_host_prefixes"])):
+        # 头像等其他资源只去掉样式后缀
+        return urlunparse(('https', parsed.netloc, path, '', parsed.query, ''))
+
+    path = _XHS_SIGNED_PREFIX.sub('', path)
+    return urlunparse(('https', CANONICAL_URL_CONFIG["xhs_origin_host"], path, '', '', ''))
+
+
+def canonicalize_wechat_image_url(url: str) -> str:
+    """
+    规范化微信公众号图片URL
+
+    尺寸段统一为 /0（原图），只保留决定格式的参数（wx_fmt）
+
+    Args:
+        url: 图片URL
+
+    Returns:
+        str: 原图URL
+    """
+    parsed = urlparse(url)
+    parts = parsed.path.rstrip('/').split('/')
+    # /mmbiz_png/<id>/640 -> /mmbiz_png/<id>/0
+    if len(parts) >= 4 and parts[-1].isdigit():
+        parts[-1] = '0'
+    keep = CANONICAL_URL_CONFIG["wechat_keep_params"]
+    query = urlencode([(k, v) for k, v in parse_qsl(parsed.query) if k in keep])
+    return urlunparse(('https', parsed.netloc.lower(), '/'.join(parts), '', query, ''))
+
+
+def canonicalize_image_url(url: str, platform: Optional[str] = None) -> str:
+    """
+    按平台规范化图片URL
+
+    Args:
+        url: 图片URL
+        platform: 平台（"xhs"/"wechat"），默认按域名自动判断
+
+    Returns:
+        str: 规范化后的URL，无法识别平台时原样返回（协议相对URL补全为https）
+    """
+    if url.startswith('//'):
+        url = 'https:' + url
+    detected = detect_platform(url)
+    if platform and detected != platform:
+        return url
+    if detected == "xhs":
+        return canonicalize_xhs_image_url(url)
+    if detected == "wechat":
+        return canonicalize_wechat_image_url(url)
+    return url
+
+
+def dedupe_image_urls(urls: Iterable[str], platform: Optional[str] = None) -> List[str]:
+    """
+    规范化并去重图片URL，保持首次出现的顺序
+
+    Args:
+        urls: 图片URL列表
+        platform: 平台，默认按域名自动判断
+
+    Returns:
+        List[str]: 去重后的规范URL列表
+    """
+    seen = set()
+    result = []
+    for url in urls:
+        canonical = canonicalize_image_url(url, platform)
+        if canonical not in seen:
+            seen.add(canonical)
+            result.append(canonical)
+    return result
@@ -0,0 +1,114 @@
+"""
+提取规则排序测试
+"""
+
+import os
+import sys
+import unittest
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.extraction_rules import RuleSet, load_rules
+
+
+def _values(elements):
+    return [e.get("src") for e in elements if e.get("src")]
+
+
+NOTE_PAGE = BeautifulSoup(
+    '<img class="avatar" src="avatar.png">'
+    '<div class="note-image"><img src="note-1.jpg"><img src="note-2.jpg"></div>',
+    "html.parser",
+)
+ICON_PAGE = BeautifulSoup('<img class="avatar" src="avatar.png">', "html.parser")
+
+
+def _text(element):
+    return element.get("content") or element.get_text(strip=True)
+
+
+TITLE_PAGE = BeautifulSoup('<h2 class="note-title">笔记标题很长</h2>', "html.parser")
+
+
+class RuleSetOrderTest(unittest.TestCase):
+    """规则顺序"""
+
+    def _title_rules(self, interval=1):
+        return RuleSet("title", [".missing", ".note-title", {"selector": "h2", "fallback": True}],
+                       reorder_interval=interval)
+
+    def test_fallback_stays_last_after_many_hits(self):
+        rules = self._title_rules()
+        # 只有兜底规则能命中的页面：兜底规则命中率升高，但仍排在最后
+        page = BeautifulSoup("<h2>只有二级标题</h2>", "html.parser")
+        for _ in range(50):
+            self.assertEqual(rules.first_match(page, _text), "只有二级标题")
+        self.assertEqual(rules.rules[-1].selector, "h2")
+        self.assertEqual(rules.first_match(TITLE_PAGE, _text), "笔记标题很长")
+
+    def test_specific_rules_reordered_by_hit_rate(self):
+        rules = self._title_rules()
+        for _ in range(5):
+            rules.first_match(TITLE_PAGE, _text)
+        self.assertEqual([r.selector for r in rules.rules], [".note-title", ".missing", "h2"])
+
+    def test_reorder_only_every_interval(self):
+        rules = self._title_rules(interval=10)
+        rules.first_match(TITLE_PAGE, _text)
+        # 2次记录未达到间隔，保持配置顺序
+        self.assertEqual(rules.rules[0].selector, ".missing")
+        for _ in range(4):
+            rules.first_match(TITLE_PAGE, _text)
+        self.assertEqual(rules.rules[0].selector, ".note-title")
+
+    def test_first_match_respects_min_length(self):
+        rules = RuleSet("title", ["h2", {"selector": "title", "fallback": True}], min_length=6)
+        soup = BeautifulSoup("<title>小红书 - 笔记标题</title><h2>短</h2>", "html.parser")
+        self.assertEqual(rules.first_match(soup, lambda e: e.get_text(strip=True)), "小红书 - 笔记标题")
+        self.assertEqual(rules.rules[0].misses, 1)
+
+    def test_xhs_config_pins_generic_selectors(self):
+        load_rules.cache_clear()
+        rules = load_rules("xhs")
+        self.assertTrue(all(r.fallback for r in rules["images"].rules[-2:]))
+        # 通用标题选择器保持原有的相对顺序
+        self.assertEqual([r.selector for r in rules["title"].rules if r.fallback], ["title", "h1", ".title"])
+
+
+class AllMatchesTest(unittest.TestCase):
+    """列表字段合并所有具体规则的结果"""
+
+    def _image_rules(self):
+        return RuleSet("images", [".missing img", ".note-image img", {"selector": "img", "fallback": True}],
+                       reorder_interval=1)
+
+    def test_fallback_only_when_specific_rules_miss(self):
+        rules = self._image_rules()
+        self.assertEqual(rules.all_matches(ICON_PAGE, _values), ["avatar.png"])
+        self.assertEqual(rules.all_matches(NOTE_PAGE, _values), ["note-1.jpg", "note-2.jpg"])
+
+    def test_order_not_changed_by_hits(self):
+        rules = self._image_rules()
+        for _ in range(5):
+            rules.all_matches(NOTE_PAGE, _values)
+        self.assertEqual([r.selector for r in rules.rules], [".missing img", ".note-image img", "img"])
+
+    def test_mixed_src_and_data_src_carousel(self):
+        from src.tools.get_xhs_content import extract_image_urls
+        load_rules.cache_clear()
+        # 轮播图：第1张已加载（src），其余懒加载（只有 data-src）
+        soup = BeautifulSoup(
+            '<div class="swiper">'
+            '<img src="https://sns-img-qc.xhscdn.com/a1.jpg">'
+            '<img data-src="https://sns-img-qc.xhscdn.com/a2.jpg">'
+            '<img data-src="https://sns-img-qc.xhscdn.com/a3.jpg">'
+            '</div>', "html.parser")
+        urls = extract_image_urls(soup)
+        self.assertEqual(len(urls), 3)
+        self.assertTrue(all(name in " ".join(urls) for name in ("a1", "a2", "a3")))
+
+
+if __name__ == "__main__":
+    unittest.main()
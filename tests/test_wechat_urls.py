@@ -0,0 +1,50 @@
+"""
+公众号文章链接规范化测试
+"""
+
+import os
+import sys
+import unittest
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.content_manager import clean_name
+from src.tools.get_wechat_article import canonicalize_article_url, extract_article_id
+
+
+def _biz(url):
+    return parse_qs(urlparse(url).query)["__biz"]
+
+
+class CanonicalizeArticleUrlTest(unittest.TestCase):
+    def test_short_link_drops_query(self):
+        url = "https://mp.weixin.qq.com/s/AbC-123?scene=1#rd"
+        self.assertEqual(canonicalize_article_url(url), "https://mp.weixin.qq.com/s/AbC-123")
+
+    def test_keeps_only_article_params(self):
+        url = "https://mp.weixin.qq.com/s?__biz=MzA1&mid=2&idx=1&sn=ab&chksm=x&scene=7#rd"
+        self.assertEqual(canonicalize_article_url(url), "https://mp.weixin.qq.com/s?__biz=MzA1&mid=2&idx=1&sn=ab")
+
+    def test_reserved_characters_keep_meaning(self):
+        for url in ("https://mp.weixin.qq.com/s?__biz=MzA+NjY/Nw==&mid=2&idx=1&sn=ab",
+                    "https://mp.weixin.qq.com/s?__biz=MzA%2BNjY%3D&mid=2&idx=1&sn=ab"):
+            canonical = canonicalize_article_url(url)
+            self.assertEqual(_biz(canonical), _biz(url))
+            self.assertEqual(extract_article_id(canonical), extract_article_id(url))
+            self.assertEqual(canonicalize_article_url(canonical), canonical)
+
+    def test_plus_and_encoded_plus_differ(self):
+        plus = canonicalize_article_url("https://mp.weixin.qq.com/s?__biz=MzA+NjY&mid=2&idx=1")
+        encoded = canonicalize_article_url("https://mp.weixin.qq.com/s?__biz=MzA%2BNjY&mid=2&idx=1")
+        self.assertNotEqual(plus, encoded)
+
+
+class CleanNameTest(unittest.TestCase):
+    def test_removes_path_separators(self):
+        self.assertEqual(clean_name("../坏/公众号"), "坏公众号")
+        self.assertEqual(clean_name(" /.. "), "")
+
+
+if __name__ == "__main__":
+    unittest.main()